@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Report the memory taken by the AST of large generated DL programs,
+as objects (dl.ast) and in an arena (dl.arena).
+
+Each program is parsed in a fresh interpreter, which reports:
+
+    nodes        -- number of AST nodes
+    node bytes   -- average size of a node: the node object, including its
+                    __dict__ if it has one, or its share of the arena arrays
+    RSS bytes    -- growth of the resident set per node while the AST is
+                    alive, which also counts lists, names and constants
+    peak MiB     -- peak RSS while lexing and parsing, measured after the
+                    imports where Linux allows it
+    tracked      -- objects tracked by the garbage collector afterwards
+    gc ms        -- time of a full collection with the AST alive
+
+Run from the repository root:
+
+    python benchmarks/bench_ast_memory.py [statements]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from programs import straight_line, many_declarations, expressions
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEASURE_SCRIPT = """
+import gc, resource, sys, time
+from dl.ast import ASTNode
+from dl.arena import ASTArena
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+
+def status_kib(field):
+    try:
+        for line in open('/proc/self/status'):
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def node_size(node):
+    size = sys.getsizeof(node)
+    if hasattr(node, '__dict__'):
+        size += sys.getsizeof(node.__dict__)
+    return size
+
+try:
+    # Reset the peak RSS, so import time allocations don't count
+    open('/proc/self/clear_refs', 'w').write('5')
+except OSError:
+    pass
+
+mode, filename = sys.argv[1:]
+DLParser.direct_parser()
+gc.collect()
+before = status_kib('VmRSS')
+if mode == 'arena':
+    arena = ASTArena()
+    ast = DLParser(nodes=arena).parse_direct(DLLexer().tokenize_file(filename))
+else:
+    ast = DLParser().parse_direct(DLLexer().tokenize_file(filename))
+gc.collect()
+after = status_kib('VmRSS')
+peak = status_kib('VmHWM')
+start = time.perf_counter()
+gc.collect()
+gc_time = time.perf_counter() - start
+tracked = len(gc.get_objects())
+
+if mode == 'arena':
+    count, size = len(arena), arena.nbytes()
+else:
+    nodes = [obj for obj in gc.get_objects() if isinstance(obj, ASTNode)]
+    count, size = len(nodes), sum(node_size(node) for node in nodes)
+print(count, size, (after - before) * 1024, peak, tracked, gc_time)
+"""
+
+def measure(mode, filename):
+    output = subprocess.run([sys.executable, '-c', MEASURE_SCRIPT, mode, filename],
+                            cwd=ROOT, stdout=subprocess.PIPE, check=True).stdout
+    nodes, size, grown, peak, tracked, gc_time = output.split()
+    nodes = int(nodes)
+    return nodes, int(size) / nodes, int(grown) / nodes, int(peak) / 1024, int(tracked), float(gc_time) * 1000
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+
+    print("%-14s %-7s %10s %12s %12s %10s %10s %8s" %
+          ("program", "AST", "nodes", "node bytes", "RSS bytes", "peak MiB", "tracked", "gc ms"))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for label, source in (("straight line", straight_line(statements)),
+                              ("declarations", many_declarations(statements // 10)),
+                              ("expressions", expressions(statements // 3))):
+            filename = os.path.join(tmpdir, 'big.dl')
+            with open(filename, 'w') as f:
+                f.write(source)
+            for mode in ('objects', 'arena'):
+                print("%-14s %-7s %10d %12.1f %12.1f %10.1f %10d %8.1f" % ((label, mode) + measure(mode, filename)))
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Measure what bounds checks cost a program looping over an array,
+with and without BoundsCheckElimination.
+
+The program is compiled without checks, with checks, and with the
+checks the range analysis proves redundant removed, all after Mem2Reg,
+and each is run with lli, when it is installed. Run from the
+repository root:
+
+    python benchmarks/bench_bounds.py [size] [passes]
+"""
+
+import os
+import sys
+import time
+import shutil
+import subprocess
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+from dl.mem2reg import Mem2Reg
+from dl.bounds import BoundsCheckElimination
+from programs import array_loops
+
+def compile_program(source, check_bounds, eliminate):
+    ast = DLSemanticAnalyzer().analyze(DLParser().parse_direct(DLLexer().tokenize(source)))
+    module = DLGenerator(check_bounds=check_bounds).build(ast)
+    Mem2Reg().run(module)
+    eliminator = BoundsCheckElimination()
+    start = time.perf_counter()
+    if eliminate:
+        eliminator.run(module)
+    return str(module), eliminator, time.perf_counter() - start
+
+def run(lli, ir):
+    with tempfile.NamedTemporaryFile("w", suffix=".ll", delete=False) as outfile:
+        outfile.write(ir)
+    try:
+        start = time.perf_counter()
+        output = subprocess.run([lli, outfile.name], stdout=subprocess.PIPE, check=True).stdout
+        return output.decode().strip(), time.perf_counter() - start
+    finally:
+        os.remove(outfile.name)
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    passes = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    source = array_loops(size, passes)
+    lli = shutil.which("lli")
+    for label, check_bounds, eliminate in (("unchecked", False, False),
+                                           ("checked", True, False),
+                                           ("checked, eliminated", True, True)):
+        ir, eliminator, eliminate_time = compile_program(source, check_bounds, eliminate)
+        print(label)
+        if eliminate:
+            print("  eliminated %d of %d checks in %.1f ms" %
+                  (eliminator.eliminated, eliminator.checks, eliminate_time * 1000))
+        if lli:
+            output, run_time = run(lli, ir)
+            print("  lli %8.1f ms   prints %s" % (run_time * 1000, output))
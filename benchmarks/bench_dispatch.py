@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Measure visitor dispatch, in visits per second over the nodes of
+large generated DL programs.
+
+    by name  -- building 'visit_' + class name and looking it up with
+                getattr() for each node, as visitors dispatched before
+                the per-class dispatch tables
+    table    -- ASTVisitor.dispatch(), a lookup in the class's table
+    analyze  -- a full DLSemanticAnalyzer pass with ASTVisitor.visit()
+
+The handlers of the first two only count the node, so the rates show
+the cost of dispatch itself. Run from the repository root:
+
+    python benchmarks/bench_dispatch.py [statements]
+"""
+
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dl import ast
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.visitor import ASTVisitor
+from programs import straight_line, many_declarations, expressions
+
+REPEAT = 3
+
+def count_node(self, node):
+    self.visits += 1
+
+# A visitor with a counting handler for every node class
+CountingVisitor = type('CountingVisitor', (ASTVisitor,), { 'visits': 0 } | {
+    'visit_' + name: count_node for name in dir(ast)
+    if isinstance(getattr(ast, name), type) and issubclass(getattr(ast, name), ast.ASTNode)
+    })
+
+def collect(node, nodes):
+    """Append node and its descendants to nodes."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ast.ASTNode):
+            nodes.append(node)
+            stack.extend(getattr(node, name) for name in slot_names(node.__class__))
+        elif isinstance(node, list):
+            stack.extend(node)
+    return nodes
+
+def slot_names(cls):
+    return [name for base in cls.__mro__ for name in getattr(base, '__slots__', ())
+            if name not in ('itype', 'symbol')]
+
+def by_name(visitor, nodes):
+    for node in nodes:
+        getattr(visitor, 'visit_' + node.__class__.__name__, visitor.missing)(node)
+
+def by_table(visitor, nodes):
+    dispatch = visitor.dispatch
+    for node in nodes:
+        dispatch(node)
+
+def rate(func, *args):
+    best = None
+    for n in range(REPEAT):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def bench(label, source):
+    program = DLParser().parse_direct(DLLexer().tokenize(source))
+    nodes = collect(program, [])
+    name_time = rate(by_name, CountingVisitor(), nodes)
+    table_time = rate(by_table, CountingVisitor(), nodes)
+    analyze_time = rate(lambda: DLSemanticAnalyzer().analyze(program))
+
+    print("%s: %d nodes" % (label, len(nodes)))
+    print("  by name  %12.0f visits/s" % (len(nodes) / name_time))
+    print("  table    %12.0f visits/s  (%.2fx)" % (len(nodes) / table_time, name_time / table_time))
+    print("  analyze  %12.0f visits/s" % (len(nodes) / analyze_time))
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    bench("straight line", straight_line(statements))
+    bench("declarations", many_declarations(statements // 10))
+    bench("expressions", expressions(statements // 3))
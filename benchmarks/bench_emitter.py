@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Compare writing the LLVM IR of large generated DL programs to a file
+by collecting it in memory (DLGenerator().generate) and by streaming it
+to the file a function at a time, as each is finished
+(DLGenerator(outfile).generate).  Only the functions program gains from
+streaming, since the others are a single main function.
+
+Each program is generated in a fresh interpreter, after lexing,
+parsing and semantic analysis, which reports:
+
+    bytes        -- size of the .ll file written
+    peak MiB     -- growth of the peak RSS while generating and writing
+                    the file, over the RSS with the checked AST alive
+    seconds      -- time to generate and write the file
+
+Run from the repository root:
+
+    python benchmarks/bench_emitter.py [statements]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from programs import straight_line, expressions, many_functions
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEASURE_SCRIPT = """
+import gc, os, resource, sys, time
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+
+def status_kib(field):
+    try:
+        for line in open('/proc/self/status'):
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+mode, filename, outname = sys.argv[1:]
+lexer = DLLexer()
+ast = DLParser().parse_direct(lexer.tokenize_file(filename))
+checked = DLSemanticAnalyzer(lexer.names).analyze(ast)
+gc.collect()
+try:
+    # Reset the peak RSS, so parsing and analysis don't count
+    open('/proc/self/clear_refs', 'w').write('5')
+except OSError:
+    pass
+before = status_kib('VmRSS')
+start = time.perf_counter()
+if mode == 'collect':
+    ir = DLGenerator().generate(checked)
+    with open(outname, 'w') as outfile:
+        outfile.write(ir)
+else:
+    with open(outname, 'w') as outfile:
+        DLGenerator(outfile).generate(checked)
+elapsed = time.perf_counter() - start
+peak = status_kib('VmHWM')
+print(os.path.getsize(outname), (peak - before) * 1024, elapsed)
+"""
+
+def measure(mode, filename):
+    outname = filename.replace('.dl', '.ll')
+    output = subprocess.run([sys.executable, '-c', MEASURE_SCRIPT, mode, filename, outname],
+                            cwd=ROOT, stdout=subprocess.PIPE, check=True).stdout
+    size, peak, elapsed = output.split()
+    return int(size), int(peak) / (1024 * 1024), float(elapsed)
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    print("%-14s %-8s %12s %10s %10s" % ("program", "mode", "bytes", "peak MiB", "seconds"))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for label, source in (("straight line", straight_line(statements)),
+                              ("expressions", expressions(statements // 3)),
+                              ("functions", many_functions(statements))):
+            filename = os.path.join(tmpdir, 'big.dl')
+            with open(filename, 'w') as f:
+                f.write(source)
+            for mode in ('collect', 'stream'):
+                print("%-14s %-8s %12d %10.1f %10.2f" % ((label, mode) + measure(mode, filename)))
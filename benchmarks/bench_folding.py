@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Report what DLConstantFolder removes from large generated DL programs,
+and what it costs.
+
+For each program, the checked AST is folded, and the instructions the
+folder reports removed are checked against the instructions of the
+modules built with and without folding. Run from the repository root:
+
+    python benchmarks/bench_folding.py [statements]
+"""
+
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+from dl.folding import DLConstantFolder
+from programs import straight_line, expressions, constant_expressions
+
+def checked(source):
+    return DLSemanticAnalyzer().analyze(DLParser().parse_direct(DLLexer().tokenize(source)))
+
+def count_instructions(module):
+    return sum(len(block.instructions) for function in module.functions for block in function.blocks)
+
+def bench(label, source):
+    ast = checked(source)
+    start = time.perf_counter()
+    before = count_instructions(DLGenerator().build(ast))
+    unfolded_time = time.perf_counter() - start
+
+    ast = checked(source)
+    folder = DLConstantFolder()
+    start = time.perf_counter()
+    folder.fold(ast)
+    fold_time = time.perf_counter() - start
+    start = time.perf_counter()
+    after = count_instructions(DLGenerator().build(ast))
+    generate_time = time.perf_counter() - start
+    assert before - after == folder.removed_count()
+
+    removed = ", ".join("%s %d" % item for item in sorted(folder.removed.items()))
+    print(label)
+    print("  instructions %8d -> %8d  (%.1f%% removed: %s)" %
+          (before, after, 100.0 * (before - after) / before, removed or "none"))
+    print("  generate %8.1f ms   fold %8.1f ms + generate %8.1f ms" %
+          (unfolded_time * 1000, fold_time * 1000, generate_time * 1000))
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    bench("constant expressions", constant_expressions(statements))
+    bench("expressions", expressions(statements // 3))
+    bench("straight line", straight_line(statements))
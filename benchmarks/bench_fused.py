@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Compare compiling large generated DL programs with separate semantic
+analysis and code generation passes, and with the fused single pass of
+DLFusedGenerator.
+
+Each program is compiled end to end, from the source file to the IR
+text as generator.py does, and the analysis and generation passes are
+also timed on their own with the AST parsed up front. Run from the
+repository root:
+
+    python benchmarks/bench_fused.py [statements]
+"""
+
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+from dl.fused import DLFusedGenerator
+from programs import straight_line, many_declarations, expressions
+
+REPEAT = 3
+
+def best_time(func, *args):
+    best = None
+    for n in range(REPEAT):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def parse(filename):
+    return DLParser().parse_direct(DLLexer().tokenize_file(filename))
+
+def two_passes(ast):
+    checked = DLSemanticAnalyzer().analyze(ast)
+    return DLGenerator().generate(checked)
+
+def fused(ast):
+    return DLFusedGenerator().generate(ast)
+
+def bench(label, filename):
+    expected, separate_time = best_time(lambda: two_passes(parse(filename)))
+    result, fused_time = best_time(lambda: fused(parse(filename)))
+    assert result == expected
+    ast = parse(filename)
+    expected, separate_passes = best_time(two_passes, ast)
+    result, fused_passes = best_time(fused, ast)
+    assert result == expected
+
+    print(label)
+    print("  end to end   two passes %8.1f ms   fused %8.1f ms  (%.2fx)" %
+          (separate_time * 1000, fused_time * 1000, separate_time / fused_time))
+    print("  passes only  two passes %8.1f ms   fused %8.1f ms  (%.2fx)" %
+          (separate_passes * 1000, fused_passes * 1000, separate_passes / fused_passes))
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    DLParser.direct_parser()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for label, source in (("straight line", straight_line(statements)),
+                              ("declarations", many_declarations(statements // 10)),
+                              ("expressions", expressions(statements // 3))):
+            filename = os.path.join(tmpdir, 'big.dl')
+            with open(filename, 'w') as f:
+                f.write(source)
+            bench(label, filename)
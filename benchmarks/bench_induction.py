@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Measure what StrengthReduction saves matrix-style and polynomial
+evaluation programs.
+
+Each program is compiled with Mem2Reg and LoopInvariantCodeMotion,
+without and with the multiplications by induction variables reduced,
+and DeadCodeElimination after. The instructions run are counted from
+the trip counts of the loops, which are all constant here, and each
+program is run with lli, when it is installed. Run from the repository
+root:
+
+    python benchmarks/bench_induction.py [size] [points]
+"""
+
+import os
+import sys
+import time
+import shutil
+import subprocess
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+from dl.mem2reg import Mem2Reg
+from dl.licm import LoopInvariantCodeMotion
+from dl.induction import StrengthReduction, induction_variables
+from dl.deadcode import DeadCodeElimination
+from programs import matrix_multiply, polynomial
+
+def compile_program(source, reduce):
+    ast = DLSemanticAnalyzer().analyze(DLParser().parse_direct(DLLexer().tokenize(source)))
+    module = DLGenerator().build(ast)
+    Mem2Reg().run(module)
+    LoopInvariantCodeMotion().run(module)
+    reducer = StrengthReduction()
+    start = time.perf_counter()
+    if reduce:
+        reducer.run(module)
+    reduce_time = time.perf_counter() - start
+    DeadCodeElimination().run(module)
+    return module, reducer, reduce_time
+
+def executed(function):
+    """Return the number of instructions of function run, by opcode,
+    given that every loop has a trip count and every block of a loop
+    body runs on each iteration."""
+    runs = {block: 1 for block in function.blocks}
+    for variables in induction_variables(function):
+        for block in variables.loop.blocks:
+            iterations = variables.trip_count
+            runs[block] *= iterations + 1 if block is variables.loop.header else iterations
+    counts = {}
+    for block in function.blocks:
+        for instruction in block.instructions:
+            counts[instruction.opcode] = counts.get(instruction.opcode, 0) + runs[block]
+    return counts
+
+def run(lli, ir):
+    with tempfile.NamedTemporaryFile("w", suffix=".ll", delete=False) as outfile:
+        outfile.write(ir)
+    try:
+        start = time.perf_counter()
+        output = subprocess.run([lli, outfile.name], stdout=subprocess.PIPE, check=True).stdout
+        return output.decode().strip(), time.perf_counter() - start
+    finally:
+        os.remove(outfile.name)
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    points = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+    lli = shutil.which("lli")
+    for name, source in (("matrix %d x %d" % (size, size), matrix_multiply(size)),
+                         ("polynomial of degree 5 at %d points" % points, polynomial(points, 5))):
+        print(name)
+        for reduce in (False, True):
+            module, reducer, reduce_time = compile_program(source, reduce)
+            counts = executed(module.get_function("main"))
+            print("  %s" % ("strength reduced" if reduce else "not reduced"))
+            if reduce:
+                print("    reduced %d multiplications in %.2f ms" % (reducer.reduced, reduce_time * 1000))
+            # Phis are not counted, as they cost no instruction of their own
+            phis = counts.pop("phi", 0)
+            print("    %d instructions run, %d mul, %d add, and %d phis" %
+                  (sum(counts.values()), counts.get("mul", 0), counts.get("add", 0), phis))
+            if lli:
+                output, run_time = run(lli, str(module))
+                print("    lli %8.1f ms   prints %s" % (run_time * 1000, output))
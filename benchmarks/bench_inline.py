@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Measure what inlining small helper functions called in a loop saves,
+at several thresholds of the Inliner cost model.
+
+The program is compiled without inlining and with each threshold,
+then promoted to registers and cleaned up by DeadCodeElimination, and
+each is run with lli, when it is installed. Run from the repository
+root:
+
+    python benchmarks/bench_inline.py [iterations]
+"""
+
+import os
+import sys
+import time
+import shutil
+import subprocess
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+from dl.mem2reg import Mem2Reg
+from dl.inline import Inliner
+from dl.deadcode import DeadCodeElimination
+from generator import format_counts
+from programs import helper_calls
+
+def compile_program(source, threshold):
+    ast = DLSemanticAnalyzer().analyze(DLParser().parse_direct(DLLexer().tokenize(source)))
+    module = DLGenerator().build(ast)
+    inliner = Inliner(threshold)
+    start = time.perf_counter()
+    if threshold is not None:
+        inliner.run(module)
+    inline_time = time.perf_counter() - start
+    Mem2Reg().run(module)
+    DeadCodeElimination().run(module)
+    return module, inliner, inline_time
+
+def run(lli, ir):
+    with tempfile.NamedTemporaryFile("w", suffix=".ll", delete=False) as outfile:
+        outfile.write(ir)
+    try:
+        start = time.perf_counter()
+        output = subprocess.run([lli, outfile.name], stdout=subprocess.PIPE, check=True).stdout
+        return output.decode().strip(), time.perf_counter() - start
+    finally:
+        os.remove(outfile.name)
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+    source = helper_calls(iterations)
+    lli = shutil.which("lli")
+    for threshold in (None, -20, 0, 20):
+        module, inliner, inline_time = compile_program(source, threshold)
+        instructions = sum(len(list(function.instructions())) for function in module.functions)
+        print("no inlining" if threshold is None else "threshold %d" % threshold)
+        if threshold is not None:
+            print("  inlined %d calls in %.2f ms: %s" %
+                  (inliner.inlined_count(), inline_time * 1000, format_counts(inliner.inlined)))
+            print("  not inlined: %s" % format_counts(inliner.refused))
+        print("  %d functions, %d instructions" % (len([function for function in module.functions if function.blocks]), instructions))
+        if lli:
+            output, run_time = run(lli, str(module))
+            print("  lli %8.1f ms   prints %s" % (run_time * 1000, output))
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Compare token throughput of DLLexer.tokenize() and DLLexer.tokenize_arrays().
+
+Run from the repository root:
+
+    python benchmarks/bench_lexer.py [statements]
+"""
+
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from programs import straight_line, many_declarations
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+def bench(label, source):
+    lexer = DLLexer()
+    count, generator_time = timed(lambda: sum(1 for tok in lexer.tokenize(source)))
+    arrays, arrays_time = timed(lambda: lexer.tokenize_arrays(source))
+    assert len(arrays) == count
+    adapted, adapter_time = timed(lambda: sum(1 for tok in arrays.tokens()))
+
+    parser = DLParser()
+    ast, parse_generator = timed(lambda: parser.parse(lexer.tokenize(source)))
+    ast, parse_arrays = timed(lambda: parser.parse(lexer.tokenize_arrays(source).tokens()))
+
+    array_bytes = sum(a.itemsize * len(a) for a in (arrays.types, arrays.starts, arrays.ends, arrays.linenos))
+
+    print("%s: %d tokens, %d bytes of source" % (label, count, len(source)))
+    print("  tokenize()              %10.0f tokens/s" % (count / generator_time))
+    print("  tokenize_arrays()       %10.0f tokens/s  (%.1f bytes/token)" % (count / arrays_time, array_bytes / count))
+    print("  tokenize_arrays()+tokens() %7.0f tokens/s" % (count / (arrays_time + adapter_time)))
+    print("  parse via tokenize()    %10.2f s" % parse_generator)
+    print("  parse via arrays        %10.2f s" % parse_arrays)
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    bench("straight line", straight_line(statements))
+    bench("declarations", many_declarations(statements // 10))
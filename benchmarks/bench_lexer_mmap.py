@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Compare peak memory of lexing and parsing a large DL file from a str
+and from a memory-mapped file.
+
+Each measurement runs in a fresh interpreter and reports its peak RSS,
+measured after dl.parser has been imported where Linux allows it.
+Run from the repository root:
+
+    python benchmarks/bench_lexer_mmap.py [statements]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from programs import straight_line
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEASURE_SCRIPT = """
+import resource, sys, time
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+
+def peak_kib():
+    try:
+        for line in open('/proc/self/status'):
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+try:
+    # Reset the peak RSS, so import time allocations don't count
+    open('/proc/self/clear_refs', 'w').write('5')
+except OSError:
+    pass
+
+mode, stage, filename = sys.argv[1:]
+baseline = peak_kib()
+start = time.perf_counter()
+lexer = DLLexer()
+if mode == 'str':
+    infile = open(filename, 'r')
+    text = infile.read()
+    infile.close()
+    tokens = lexer.tokenize(text)
+else:
+    tokens = lexer.tokenize_file(filename)
+if stage == 'lex':
+    count = sum(1 for tok in tokens)
+else:
+    ast = DLParser().parse(tokens)
+elapsed = time.perf_counter() - start
+peak = peak_kib()
+print(baseline, peak, elapsed)
+"""
+
+def measure(mode, stage, filename):
+    output = subprocess.run([sys.executable, '-c', MEASURE_SCRIPT, mode, stage, filename],
+                            cwd=ROOT, stdout=subprocess.PIPE, check=True).stdout
+    baseline, peak, elapsed = output.split()
+    return int(baseline) / 1024, int(peak) / 1024, float(elapsed)
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, 'big.dl')
+        with open(filename, 'w') as f:
+            f.write(straight_line(statements))
+        size = os.path.getsize(filename) / (1024 * 1024)
+
+        print("%d statements, %.1f MiB of source" % (statements, size))
+        print("%-14s %-6s %12s %12s %10s" % ("input", "stage", "start MiB", "peak MiB", "seconds"))
+        for stage in ('lex', 'parse'):
+            for mode in ('str', 'mmap'):
+                baseline, peak, elapsed = measure(mode, stage, filename)
+                print("%-14s %-6s %12.1f %12.1f %10.2f" % (mode, stage, baseline, peak, elapsed))
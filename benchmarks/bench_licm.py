@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Measure what LoopInvariantCodeMotion saves a program of nested loops.
+
+The program is compiled with its variables in memory and promoted to
+registers by Mem2Reg, each without and with the invariant code hoisted.
+For each, the instructions of the inner loop, which run on every
+iteration, are counted, and the program is run with lli, when it is
+installed. Run from the repository root:
+
+    python benchmarks/bench_licm.py [outer] [inner]
+"""
+
+import os
+import sys
+import time
+import shutil
+import subprocess
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+from dl.mem2reg import Mem2Reg
+from dl.licm import LoopInvariantCodeMotion
+from dl.cfg import immediate_dominators, natural_loops
+from programs import nested_loops
+
+def compile_program(source, promote, hoist):
+    ast = DLSemanticAnalyzer().analyze(DLParser().parse_direct(DLLexer().tokenize(source)))
+    module = DLGenerator().build(ast)
+    if promote:
+        Mem2Reg().run(module)
+    mover = LoopInvariantCodeMotion()
+    start = time.perf_counter()
+    if hoist:
+        mover.run(module)
+    return module, mover, time.perf_counter() - start
+
+def inner_loop_size(module):
+    innermost = natural_loops(immediate_dominators(module.get_function("main")))[0]
+    return sum(len(block.instructions) for block in innermost.blocks)
+
+def run(lli, ir):
+    with tempfile.NamedTemporaryFile("w", suffix=".ll", delete=False) as outfile:
+        outfile.write(ir)
+    try:
+        start = time.perf_counter()
+        output = subprocess.run([lli, outfile.name], stdout=subprocess.PIPE, check=True).stdout
+        return output.decode().strip(), time.perf_counter() - start
+    finally:
+        os.remove(outfile.name)
+
+if __name__ == '__main__':
+    outer = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    inner = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    source = nested_loops(outer, inner)
+    lli = shutil.which("lli")
+    for label, promote in (("in memory", False), ("mem2reg", True)):
+        for hoist in (False, True):
+            module, mover, hoist_time = compile_program(source, promote, hoist)
+            print("%s%s" % (label, ", licm" if hoist else ""))
+            print("  inner loop %d instructions" % inner_loop_size(module))
+            if hoist:
+                print("  hoisted %d instructions in %.2f ms" % (mover.hoisted_count(), hoist_time * 1000))
+            if lli:
+                output, run_time = run(lli, str(module))
+                print("  lli %8.1f ms   prints %s" % (run_time * 1000, output))
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Report what Mem2Reg removes from large generated DL programs, and
+what the pass costs next to building the module.
+
+Run from the repository root:
+
+    python benchmarks/bench_mem2reg.py [statements]
+"""
+
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+from dl.mem2reg import Mem2Reg
+from programs import straight_line, expressions, deep_nesting
+
+def checked(source):
+    return DLSemanticAnalyzer().analyze(DLParser().parse_direct(DLLexer().tokenize(source)))
+
+def count_instructions(module):
+    return sum(len(block.instructions) for function in module.functions for block in function.blocks)
+
+def bench(label, source):
+    ast = checked(source)
+    start = time.perf_counter()
+    module = DLGenerator().build(ast)
+    build_time = time.perf_counter() - start
+    before = count_instructions(module)
+
+    promoter = Mem2Reg()
+    start = time.perf_counter()
+    promoter.run(module)
+    promote_time = time.perf_counter() - start
+    after = count_instructions(module)
+
+    removed = ", ".join("%s %d" % item for item in sorted(promoter.removed.items()))
+    print(label)
+    print("  instructions %8d -> %8d  (%.1f%% removed: %s; %d phis added)" %
+          (before, after, 100.0 * (before - after) / before, removed or "none", promoter.phis))
+    print("  build %8.1f ms   mem2reg %8.1f ms" % (build_time * 1000, promote_time * 1000))
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    bench("straight line", straight_line(statements))
+    bench("expressions", expressions(statements // 3))
+    bench("deep nesting", deep_nesting(statements // 30))
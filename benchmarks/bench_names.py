@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Time each compiler phase on generated DL programs with many
+identifiers, with the identifiers interned in one NameTable shared by
+the lexer and the symbol table, and with a separate table for the
+symbol table, which then looks every name up by its text.
+
+Also counts the distinct identifier string objects in the AST. Run
+from the repository root:
+
+    python benchmarks/bench_names.py [statements]
+"""
+
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+from programs import many_declarations, many_scopes
+
+REPEAT = 3
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def compile_phases(filename, shared):
+    """Compile filename, and return the time of each phase."""
+    lexer = DLLexer()
+    tokens, lex_time = timed(list, lexer.tokenize_file(filename))
+    ast, parse_time = timed(DLParser().parse_direct, iter(tokens))
+    analyzer = DLSemanticAnalyzer(lexer.names if shared else None)
+    checked, analyze_time = timed(analyzer.analyze, ast)
+    ir, generate_time = timed(DLGenerator().generate, checked)
+    names = len({id(tok.value) for tok in tokens if tok.type == 'IDENTIFIER'})
+    return (lex_time, parse_time, analyze_time, generate_time), names
+
+def bench(label, filename):
+    print(label)
+    for shared in (True, False):
+        best = None
+        for n in range(REPEAT):
+            times, names = compile_phases(filename, shared)
+            best = times if best is None else tuple(map(min, best, times))
+        print("  %-14s lex %7.1f ms  parse %7.1f ms  analyze %7.1f ms  generate %7.1f ms  (%d name objects)" %
+              (("shared table" if shared else "separate table",) + tuple(t * 1000 for t in best) + (names,)))
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    DLParser.direct_parser()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for label, source in (("declarations", many_declarations(statements // 10)),
+                              ("scopes", many_scopes(statements // 50, 40))):
+            filename = os.path.join(tmpdir, 'big.dl')
+            with open(filename, 'w') as f:
+                f.write(source)
+            bench(label, filename)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Compare the DLParser parse loops: parse() on the dict tables,
+parse_dense() on the integer coded dense tables and parse_direct() with
+the direct coded parser.
+
+Tokens are lexed once up front, so only the parse loop is timed.
+Run from the repository root:
+
+    python benchmarks/bench_parse_loops.py [statements]
+"""
+
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from programs import straight_line, many_declarations, expressions
+
+REPEAT = 3
+
+def best_time(func, tokens):
+    best = None
+    for n in range(REPEAT):
+        start = time.perf_counter()
+        result = func(iter(tokens))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def dict_table_bytes(lrtable):
+    """Size of the action, goto and defaulted state dicts, not counting
+    the interned symbol names and small ints they share."""
+    size = sys.getsizeof(lrtable.lr_action) + sys.getsizeof(lrtable.lr_goto)
+    size += sum(sys.getsizeof(row) for row in lrtable.lr_action.values())
+    size += sum(sys.getsizeof(row) for row in lrtable.lr_goto.values())
+    size += sys.getsizeof(lrtable.defaulted_states)
+    return size
+
+def bench(label, source):
+    tokens = list(DLLexer().tokenize(source))
+    parser = DLParser()
+    expected, dict_time = best_time(parser.parse, tokens)
+    result, dense_time = best_time(parser.parse_dense, tokens)
+    assert str(result) == str(expected)
+    result, direct_time = best_time(parser.parse_direct, tokens)
+    assert str(result) == str(expected)
+
+    print("%s: %d tokens" % (label, len(tokens)))
+    print("  parse()        %10.0f tokens/s" % (len(tokens) / dict_time))
+    print("  parse_dense()  %10.0f tokens/s  (%.2fx)" % (len(tokens) / dense_time, dict_time / dense_time))
+    print("  parse_direct() %10.0f tokens/s  (%.2fx)" % (len(tokens) / direct_time, dict_time / direct_time))
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    dense = DLParser.dense_tables()
+    print("tables: %d states, %d symbols" % (len(dense.action_base), len(dense.symbols)))
+    print("  dict tables    %8d bytes" % dict_table_bytes(DLParser._lrtable))
+    print("  dense tables   %8d bytes" % dense.nbytes())
+    start = time.perf_counter()
+    DLParser.direct_parser()
+    print("  direct parser  %8d lines of Python, compiled in %.3f s" %
+          (DLParser.direct_source().count("\n"), time.perf_counter() - start))
+
+    bench("straight line", straight_line(statements))
+    bench("declarations", many_declarations(statements // 10))
+    bench("expressions", expressions(statements // 3))
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Measure parse time and parse stack depth for very long statement lists.
+
+Run from the repository root:
+
+    python benchmarks/bench_parser_lists.py [statements ...]
+"""
+
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.ast import Block
+from programs import straight_line, many_declarations
+
+def track_depth(tokens, parser, depth):
+    """Pass tokens through, recording the deepest parse stack seen."""
+    for tok in tokens:
+        if len(parser.statestack) > depth[0]:
+            depth[0] = len(parser.statestack)
+        yield tok
+
+def bench_parse(source):
+    lexer = DLLexer()
+    parser = DLParser()
+    depth = [0]
+    start = time.perf_counter()
+    ast = parser.parse(track_depth(lexer.tokenize(source), parser, depth))
+    elapsed = time.perf_counter() - start
+    return ast, elapsed, depth[0]
+
+# prepend() is quadratic, so it is only timed up to this many items
+PREPEND_LIMIT = 300000
+
+def bench_list_building(count):
+    """Compare the old prepend() construction with append()."""
+    prepend_time = None
+    if count <= PREPEND_LIMIT:
+        start = time.perf_counter()
+        block = Block()
+        for n in range(count):
+            block.prepend(n)
+        prepend_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    block = Block()
+    for n in range(count):
+        block.append(n)
+    append_time = time.perf_counter() - start
+    return prepend_time, append_time
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100000, 300000, 1000000]
+
+    print("%12s %10s %14s %12s" % ("statements", "parse s", "us/statement", "max stack"))
+    for size in sizes:
+        ast, elapsed, depth = bench_parse(straight_line(size))
+        assert len(ast.body.statements) == size
+        print("%12d %10.2f %14.2f %12d" % (size, elapsed, 1e6 * elapsed / size, depth))
+
+    print()
+    print("%12s %10s %14s %12s" % ("decls", "parse s", "us/decl", "max stack"))
+    for size in sizes:
+        count = size // 10
+        ast, elapsed, depth = bench_parse(many_declarations(count))
+        print("%12d %10.2f %14.2f %12d" % (count, elapsed, 1e6 * elapsed / count, depth))
+
+    print()
+    print("%12s %14s %14s" % ("list items", "prepend() s", "append() s"))
+    for size in sizes:
+        prepend_time, append_time = bench_list_building(size)
+        if prepend_time is None:
+            print("%12d %14s %14.4f" % (size, "(skipped)", append_time))
+        else:
+            print("%12d %14.2f %14.4f" % (size, prepend_time, append_time))
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Measure cold-import time of dl.parser with and without the LALR table cache.
+
+Each sample runs a fresh interpreter, so module and table state never
+carry over between runs.  Run from the repository root:
+
+    python benchmarks/bench_parser_startup.py [runs]
+"""
+
+import os
+import subprocess
+import sys
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dl.parser import DLParser
+
+CACHE = DLParser.cachefile
+
+IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+import sly
+mid = time.perf_counter()
+import dl.parser
+end = time.perf_counter()
+print(mid - start, end - mid)
+"""
+
+def sample(use_cache):
+    """Time one cold import, returning (sly import, dl.parser import) in seconds."""
+    if not use_cache and os.path.exists(CACHE):
+        os.remove(CACHE)
+    output = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT], cwd=ROOT,
+                            stdout=subprocess.PIPE, check=True).stdout
+    sly_time, parser_time = map(float, output.split())
+    return sly_time, parser_time
+
+def report(label, samples):
+    parser_times = [parser for sly, parser in samples]
+    total_times = [sly + parser for sly, parser in samples]
+    print("%-14s dl.parser median %7.2f ms   (min %7.2f ms)   sly+dl.parser median %7.2f ms" %
+          (label, 1000 * statistics.median(parser_times), 1000 * min(parser_times),
+           1000 * statistics.median(total_times)))
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    without_cache = [sample(False) for _ in range(runs)]
+    # Populate the cache once, then time imports that load it
+    sample(True)
+    with_cache = [sample(True) for _ in range(runs)]
+
+    print("Cold import of dl.parser over %d runs" % runs)
+    report("without cache", without_cache)
+    report("with cache", with_cache)
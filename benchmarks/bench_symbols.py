@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Measure symbol resolution in semantic analysis, on generated DL
+programs with many function scopes and identifiers.
+
+    lookups   -- SymbolTable.find_symbol() rate for every identifier use,
+                 through the visible symbol dict, and walking the scope
+                 chain with Scope.find_symbol() as the table used to
+    analyze   -- a full DLSemanticAnalyzer pass, which binds every use
+    generate  -- a DLGenerator pass, which reads the bound symbols
+
+Run from the repository root:
+
+    python benchmarks/bench_symbols.py [functions] [names]
+"""
+
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+from programs import many_scopes
+
+REPEAT = 3
+
+def best_time(func):
+    best = None
+    for n in range(REPEAT):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def lookups(table, names, find):
+    for name in names:
+        find(name)
+
+if __name__ == '__main__':
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    names = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+
+    source = many_scopes(functions, names)
+    program = DLParser().parse_direct(DLLexer().tokenize(source))
+    analyzer = DLSemanticAnalyzer()
+    checked, analyze_time = best_time(lambda: DLSemanticAnalyzer().analyze(program))
+    ir, generate_time = best_time(lambda: DLGenerator().generate(checked))
+
+    # Resolve the uses in one function body again, from its scope
+    table = analyzer.st
+    table.enter_scope()
+    for n in range(names):
+        table.add_var_symbol("g%d" % n, 'int')
+    table.enter_scope()
+    for n in range(names // 2):
+        table.add_arg_symbol("a%d" % n, 'int')
+        table.add_arg_symbol("g%d" % n, 'int')
+    for n in range(names):
+        table.add_var_symbol("l%d" % n, 'int')
+    uses = ["l%d" % k for k in range(names)] + ["a%d" % (k // 2) for k in range(names)]
+    uses += ["g%d" % k for k in range(names)] * 2
+    uses *= 1000
+    _, visible_time = best_time(lambda: lookups(table, uses, table.find_symbol))
+    _, chain_time = best_time(lambda: lookups(table, uses, table.current.find_symbol))
+
+    print("%d functions, %d names each" % (functions, names))
+    print("  lookups   visible dict %10.0f /s   scope chain %10.0f /s  (%.2fx)" %
+          (len(uses) / visible_time, len(uses) / chain_time, chain_time / visible_time))
+    print("  analyze   %8.1f ms" % (analyze_time * 1000))
+    print("  generate  %8.1f ms" % (generate_time * 1000))
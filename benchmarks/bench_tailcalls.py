@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Measure what turning recursive tail calls into loops saves, and
+check that the programs then run in constant stack space.
+
+The program of recursive functions is compiled with Mem2Reg, with and
+without TailCallElimination, and each is run with lli, when it is
+installed, at a depth that fits on the stack and at one that does not
+without the pass. Run from the repository root:
+
+    python benchmarks/bench_tailcalls.py [depth]
+"""
+
+import os
+import sys
+import time
+import shutil
+import subprocess
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+from dl.mem2reg import Mem2Reg
+from dl.tailcalls import TailCallElimination
+from dl.deadcode import DeadCodeElimination
+from programs import recursion
+
+def compile_program(source, eliminate):
+    ast = DLSemanticAnalyzer().analyze(DLParser().parse_direct(DLLexer().tokenize(source)))
+    module = DLGenerator().build(ast)
+    Mem2Reg().run(module)
+    eliminator = TailCallElimination()
+    start = time.perf_counter()
+    if eliminate:
+        eliminator.run(module)
+    eliminate_time = time.perf_counter() - start
+    DeadCodeElimination().run(module)
+    return module, eliminator, eliminate_time
+
+def run(lli, ir):
+    with tempfile.NamedTemporaryFile("w", suffix=".ll", delete=False) as outfile:
+        outfile.write(ir)
+    try:
+        start = time.perf_counter()
+        result = subprocess.run([lli, outfile.name], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        run_time = time.perf_counter() - start
+        if result.returncode:
+            return "nothing, crashed with status %d" % result.returncode, run_time
+        return " ".join(result.stdout.decode().split()), run_time
+    finally:
+        os.remove(outfile.name)
+
+if __name__ == '__main__':
+    depths = [int(sys.argv[1])] if len(sys.argv) > 1 else [10000, 10000000]
+    lli = shutil.which("lli")
+    for depth in depths:
+        source = recursion(depth)
+        print("depth %d" % depth)
+        for eliminate in (False, True):
+            module, eliminator, eliminate_time = compile_program(source, eliminate)
+            calls = sum(1 for function in module.functions for instruction in function.instructions()
+                        if instruction.opcode == "call" and instruction.operands[0] is function)
+            print("  with tail calls eliminated" if eliminate else "  recursive")
+            if eliminate:
+                print("    eliminated %d tail calls and %d accumulator calls in %.2f ms: %s" %
+                      (eliminator.tail_calls, eliminator.accumulator_calls, eliminate_time * 1000,
+                       ", ".join(eliminator.functions)))
+            print("    %d recursive calls left" % calls)
+            if lli:
+                output, run_time = run(lli, str(module))
+                print("    lli %8.1f ms   prints %s" % (run_time * 1000, output))
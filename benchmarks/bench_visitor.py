@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Compare the explicit stack traversal of ASTVisitor.visit() with the
+recursive ASTVisitor.visit_recursive(), running DLSemanticAnalyzer and
+DLGenerator over large generated DL programs.
+
+Programs are parsed once up front, so only the traversal is timed. The
+recursion limit is raised for visit_recursive() on the deep programs,
+which visit() does not need. Run from the repository root:
+
+    python benchmarks/bench_visitor.py [statements]
+"""
+
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+from programs import expressions, constant_expressions, deep_sum, deep_nesting
+
+REPEAT = 3
+
+def best_time(func):
+    best = None
+    for n in range(REPEAT):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def analyze(ast, method):
+    analyzer = DLSemanticAnalyzer()
+    analyzer.st.enter_scope()
+    return getattr(analyzer, method)(ast)
+
+def generate(ast, method):
+    generator = DLGenerator()
+    getattr(generator, method)(ast)
+    return str(generator.module)
+
+def bench(label, source, generated=True):
+    ast = DLParser().parse_direct(DLLexer().tokenize(source))
+    print(label)
+    passes = [("semantic", analyze)]
+    if generated:
+        passes.append(("generator", generate))
+    for name, run in passes:
+        expected, recursive_time = best_time(lambda: run(ast, 'visit_recursive'))
+        result, stack_time = best_time(lambda: run(ast, 'visit'))
+        assert result == expected
+        print("  %-10s visit_recursive() %8.1f ms   visit() %8.1f ms  (%.2fx)" %
+              (name, recursive_time * 1000, stack_time * 1000, recursive_time / stack_time))
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10 * statements))
+
+    bench("expressions", expressions(statements // 3), generated=False)
+    bench("constant expressions", constant_expressions(statements // 3))
+    bench("deep sum", deep_sum(statements))
+    bench("deep nesting", deep_nesting(statements // 2))
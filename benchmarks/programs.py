@@ -0,0 +1,217 @@
+"""Generators for large DL programs used by the benchmarks."""
+
+def straight_line(statements):
+    """A main block with one long sequence of assignments and prints."""
+    lines = ["int x, y;", "{"]
+    body = []
+    for n in range(statements):
+        if n % 2:
+            body.append("    print(x + %d)" % (n % 100))
+        else:
+            body.append("    x = x + %d" % (n % 100))
+    lines.append(";\n".join(body))
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+def many_declarations(count):
+    """A program declaring count variables in one list and count small functions."""
+    names = ["v%d" % n for n in range(count)]
+    lines = ["int " + ", ".join(names) + ";"]
+    for n in range(count):
+        lines.append("f%d(a, b, c);" % n)
+        lines.append("{ return a + b + c }")
+    lines.append("{")
+    lines.append(";\n".join("    v%d = f%d(1, 2, %d)" % (n, n, n) for n in range(count)))
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+def expressions(statements):
+    """A main block of assignments with nested arithmetic, if and while statements."""
+    lines = ["int a, b, c, d;", "{"]
+    body = []
+    for n in range(statements):
+        if n % 3 == 0:
+            body.append("    a = (b + %d) * c - d / (a + 1)" % (n % 100))
+        elif n % 3 == 1:
+            body.append("    if (a < b + %d) { c = c * 2 - a } else { d = d + b * (c - 1) }" % (n % 100))
+        else:
+            body.append("    while (d > %d) { d = d - a / 2 }" % (n % 100))
+    lines.append(";\n".join(body))
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+def constant_expressions(statements):
+    """A main block of prints, ifs and whiles over constants only, so it
+    needs no symbol information to generate code."""
+    lines = ["{"]
+    body = []
+    for n in range(statements):
+        if n % 3 == 0:
+            body.append("    print((%d + 2) * 3 - 4 / (5 + 1))" % (n % 100))
+        elif n % 3 == 1:
+            body.append("    if (1 < %d + 2) { print(3 * 2 - 1) } else { print(4 + 5 * (6 - 1)) }" % (n % 100))
+        else:
+            body.append("    while (%d > 100) { print(7 - 8 / 2) }" % (n % 100))
+    lines.append(";\n".join(body))
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+def deep_sum(terms):
+    """A main block printing one left-associated sum of terms constants."""
+    return "{ print(" + " + ".join(str(n % 10) for n in range(terms)) + ") }\n"
+
+def deep_nesting(levels):
+    """A main block of levels nested if statements, each with a while loop."""
+    return ("{ " + "if (1 < 2) { while (2 < 1) { " * levels + "print(1)" +
+            " } }" * levels + " }\n")
+
+def many_scopes(functions, names):
+    """A program of functions that each declare names arguments and
+    locals, shadowing some globals, and use them with globals."""
+    globals_ = ["g%d" % n for n in range(names)]
+    lines = ["int " + ", ".join(globals_) + ";"]
+    for n in range(functions):
+        args = ["a%d" % k for k in range(names // 2)] + ["g%d" % k for k in range(names // 2)]
+        lines.append("f%d(%s);" % (n, ", ".join(args)))
+        lines.append("int " + ", ".join("l%d" % k for k in range(names)) + ";")
+        body = ["    l%d = a%d + g%d * g%d" % (k, k // 2, k, names - 1 - k) for k in range(names)]
+        body.append("    return " + " + ".join("l%d" % k for k in range(names)))
+        lines.append("{\n" + ";\n".join(body) + "\n}")
+    lines.append("{")
+    lines.append(";\n".join("    g%d = g%d + %d" % (n % names, (n + 1) % names, n) for n in range(functions)))
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+def array_loops(size, passes):
+    """A main block that runs passes times over an array of size
+    elements, reading and writing it at computed indices."""
+    return """int h[%d], i, p, s;
+{
+    p = 0;
+    while (p < %d) {
+        i = 1;
+        while (i < %d) { h[i] = h[i - 1] + i * p; i = i + 1 };
+        p = p + 1
+    };
+    i = 0;
+    s = 0;
+    while (i < %d) { s = s + h[i] / %d; i = i + 1 };
+    print(s)
+}
+""" % (size, passes, size, size, size)
+
+def nested_loops(outer, inner):
+    """A main block of a while loop of outer iterations around one of
+    inner iterations, whose body mostly computes the same values on
+    every iteration."""
+    return """int a, b, c, i, j, s, h[8];
+{
+    a = 3;
+    b = 5;
+    c = 7;
+    h[3] = 2;
+    i = 0;
+    while (i < %d) {
+        j = 0;
+        while (j < %d) { s = s + a * b + c * i + h[3] * (a + b) + j; j = j + 1 };
+        i = i + 1
+    };
+    print(s)
+}
+""" % (outer, inner)
+
+def matrix_multiply(size):
+    """A main block that multiplies two size x size matrices, kept in
+    arrays row by row, and prints the sum of the diagonal."""
+    return """int a[%(cells)d], b[%(cells)d], c[%(cells)d], i, j, k, s;
+{
+    i = 0;
+    while (i < %(cells)d) { a[i] = i / 7; b[i] = i / 5; i = i + 1 };
+    i = 0;
+    while (i < %(size)d) {
+        j = 0;
+        while (j < %(size)d) {
+            k = 0;
+            s = 0;
+            while (k < %(size)d) { s = s + a[i * %(size)d + k] * b[k * %(size)d + j]; k = k + 1 };
+            c[i * %(size)d + j] = s;
+            j = j + 1
+        };
+        i = i + 1
+    };
+    i = 0;
+    s = 0;
+    while (i < %(size)d) { s = s + c[i * %(size)d + i]; i = i + 1 };
+    print(s)
+}
+""" % {'size': size, 'cells': size * size}
+
+def polynomial(points, degree):
+    """A main block that evaluates a polynomial of the given degree,
+    with coefficients in an array, at points evenly spaced points, and
+    prints the sum of the values."""
+    return """int p[%(terms)d], i, k, x, y, s;
+{
+    k = 0;
+    while (k < %(terms)d) { p[k] = k * 3 + 1; k = k + 1 };
+    i = 0;
+    while (i < %(points)d) {
+        x = i * 3 - 50;
+        k = 0;
+        y = 0;
+        while (k < %(terms)d) { y = y * x + p[k]; k = k + 1 };
+        s = s + y + 2 * x;
+        i = i + 1
+    };
+    print(s)
+}
+""" % {'points': points, 'terms': degree + 1}
+
+def helper_calls(iterations):
+    """A program of small helper functions, one with several returns
+    and one calling another, called in a loop of iterations."""
+    return """sq(x); { return x * x }
+clamp(x, low, high); { if (x < low) { return low }; if (x > high) { return high }; return x }
+mix(a, b); int t; { t = sq(a) + sq(b); return clamp(t / 7, 10, 1000) }
+int i, s;
+{
+    i = 0;
+    while (i < %d) { s = s + mix(i, i + 3) + clamp(i, 5, 50); i = i + 1 };
+    print(s)
+}
+""" % (iterations)
+
+def recursion(depth):
+    """A program of recursive functions: a sum accumulated in an
+    argument, a factorial stored in a variable before it is returned,
+    and a sum of squares, each called to the given depth."""
+    return """sum(n, acc); { if (n == 0) { return acc }; return sum(n - 1, acc + n) }
+factorial(n); int r; { if (n == 0) { r = 1 } else { r = n * factorial(n - 1) }; return r }
+squares(n); { if (n == 0) { return 0 }; return n * n + squares(n - 1) }
+{
+    print(sum(%(depth)d, 0));
+    print(factorial(%(depth)d));
+    print(squares(%(depth)d))
+}
+""" % {'depth': depth}
+
+def many_functions(statements, size=100):
+    """The straight line program split into functions of size statements
+    each, which main calls in turn."""
+    lines = []
+    for n in range(statements // size):
+        lines.append("f%d(x);" % n)
+        lines.append("int y;")
+        body = []
+        for k in range(size):
+            if k % 2:
+                body.append("    print(y + %d)" % (k % 100))
+            else:
+                body.append("    y = x + %d" % (k % 100))
+        body.append("    return y")
+        lines.append("{\n" + ";\n".join(body) + "\n}")
+    lines.append("int x;")
+    lines.append("{")
+    lines.append(";\n".join("    x = f%d(x)" % n for n in range(statements // size)))
+    lines.append("}")
+    return "\n".join(lines) + "\n"
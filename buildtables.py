@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+sys.path.append('.')
+
+import dl.parser
+from dl.parser import DLParser
+
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(dl.parser.__file__)), 'parsetab.py')
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] != '--check':
+        sys.exit("usage: buildtables.py [--check]")
+
+    if len(sys.argv) > 1:
+        # Only report whether the frozen tables match the grammar
+        if DLParser.tables_current():
+            print("Parsing tables are up to date:", TABLE_FILE)
+        else:
+            sys.exit("Parsing tables are missing or out of date: " + TABLE_FILE)
+    else:
+        DLParser.write_tables(TABLE_FILE)
+        print("Wrote parsing tables:", TABLE_FILE)
@@ -0,0 +1,303 @@
+from array import array
+
+from dl import ast
+
+# Kinds of node fields in the arena
+NODE = 0     # handle of a child node, -1 for None
+NAME = 1     # index into the name table, -1 for None
+INT = 2      # integer constant
+LIST = 3     # handles of the first and last node of a linked list, and its
+             # length (three fields)
+
+# Field layout of each node class, in kind code order
+LAYOUTS = (
+    (ast.Integer, (('value', INT),)),
+    (ast.Variable, (('name', NAME),)),
+    (ast.ArrayIndex, (('var', NODE), ('index', NODE))),
+    (ast.BinOp, (('op', NAME), ('left', NODE), ('right', NODE))),
+    (ast.RelOp, (('op', NAME), ('left', NODE), ('right', NODE))),
+    (ast.FunctionCall, (('name', NAME), ('args', NODE))),
+    (ast.Arguments, (('arguments', LIST),)),
+    (ast.Assign, (('left', NODE), ('right', NODE))),
+    (ast.Print, (('arg', NODE),)),
+    (ast.Read, (('result', NODE),)),
+    (ast.Return, (('result', NODE),)),
+    (ast.If, (('condition', NODE), ('body_true', NODE), ('body_else', NODE))),
+    (ast.While, (('condition', NODE), ('body', NODE))),
+    (ast.Block, (('statements', LIST),)),
+    (ast.Declarations, (('declarations', LIST),)),
+    (ast.VariableDeclarations, (('variables', LIST), ('var_type', NAME))),
+    (ast.FunctionDeclaration, (('name', NAME), ('args', NODE), ('body', NODE), ('vars', NODE))),
+    (ast.Program, (('body', NODE), ('declarations', NODE))),
+    )
+
+FIELDS = 4   # fields per node
+INT_MIN = -2**31
+INT_MAX = 2**31 - 1
+
+class ASTArena:
+    """Struct-of-arrays storage for an AST.
+
+    Nodes live in typed parallel arrays and are referenced by integer
+    handle instead of being Python objects. Node views (see ArenaNode)
+    give them the interface of the classes in dl.ast, so the arena can
+    be passed to DLParser as its node factory, and the resulting tree
+    can be traversed by DLSemanticAnalyzer and DLGenerator unchanged:
+
+        arena = ASTArena()
+        program = DLParser(nodes=arena).parse(tokens)
+
+    Attributes:
+        kinds -- kind code of each node, an index into LAYOUTS
+        fields -- FIELDS arrays of child handles and payloads, per node
+        next -- handle of the next node in the same list, per node
+        itypes -- index of the inferred type of each node into itype_names
+        itype_names -- the inferred types seen so far, None first
+        names -- interned identifiers and operator names, by ID
+        name_ids -- map from name to ID
+        wide -- Integer values that do not fit a field, by handle
+        symbols -- resolved symbols, by handle
+        list_items -- handles of the nodes of each list that has been
+                      indexed, by (owner handle, field), until it changes
+    """
+    def __init__(self):
+        self.kinds = array('B')
+        self.fields = [array('i') for n in range(FIELDS)]
+        self.next = array('i')
+        self.itypes = array('b')
+        self.itype_names = [None]
+        self.names = []
+        self.name_ids = {}
+        self.wide = {}
+        self.symbols = {}
+        self.list_items = {}
+
+        # Node factories, with the signatures of the dl.ast constructors
+        for cls in VIEW_CLASSES:
+            setattr(self, cls.__name__, self.factory(cls))
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def factory(self, cls):
+        """Return a function that allocates a node of view class cls."""
+        kind = cls.kind
+        init = cls.__init__
+        kinds = self.kinds
+        fields = self.fields
+        nexts = self.next
+        itypes = self.itypes
+        def new(*args):
+            handle = len(kinds)
+            kinds.append(kind)
+            for field in fields:
+                field.append(-1)
+            nexts.append(-1)
+            itypes.append(0)
+            node = cls.__new__(cls)
+            node.arena = self
+            node.handle = handle
+            init(node, *args)
+            return node
+        return new
+
+    def node(self, handle):
+        """Return a view of the node with the given handle, or None for -1."""
+        if handle < 0:
+            return None
+        cls = VIEW_CLASSES[self.kinds[handle]]
+        node = cls.__new__(cls)
+        node.arena = self
+        node.handle = handle
+        return node
+
+    def intern(self, name):
+        """Return the ID of name in the name table."""
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            name_id = self.name_ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def nbytes(self):
+        """Return the number of bytes held by the node arrays."""
+        return sum(a.itemsize * len(a) for a in (self.kinds, self.next, self.itypes, *self.fields))
+
+class ArenaList:
+    """View of a linked list of nodes in an arena, such as Block.statements.
+
+    Supports the list operations the AST classes and visitors use:
+    iteration, len(), indexing, append() and insert() at the front.
+    The length is stored with the list, and the first indexing collects
+    the handles of its nodes in an array, kept in the arena until the
+    list changes, so len() and indexing take constant time.
+
+    Attributes:
+        arena -- the arena holding the nodes
+        handle -- handle of the node owning the list
+        first -- index of the field holding the first node of the list
+    """
+    __slots__ = ('arena', 'handle', 'first')
+
+    def __init__(self, arena, handle, first):
+        self.arena = arena
+        self.handle = handle
+        self.first = first
+
+    def __iter__(self):
+        arena = self.arena
+        nexts = arena.next
+        handle = arena.fields[self.first][self.handle]
+        while handle >= 0:
+            yield arena.node(handle)
+            handle = nexts[handle]
+
+    def __len__(self):
+        return self.arena.fields[self.first + 2][self.handle]
+
+    def __getitem__(self, index):
+        arena = self.arena
+        key = (self.handle, self.first)
+        items = arena.list_items.get(key)
+        if items is None:
+            nexts = arena.next
+            items = arena.list_items[key] = array('i')
+            handle = arena.fields[self.first][self.handle]
+            while handle >= 0:
+                items.append(handle)
+                handle = nexts[handle]
+        return arena.node(items[index])
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def append(self, node):
+        """Link node at the end of the list."""
+        heads = self.arena.fields[self.first]
+        tails = self.arena.fields[self.first + 1]
+        handle = node.handle
+        self.arena.next[handle] = -1
+        if tails[self.handle] >= 0:
+            self.arena.next[tails[self.handle]] = handle
+        else:
+            heads[self.handle] = handle
+        tails[self.handle] = handle
+        self.arena.fields[self.first + 2][self.handle] += 1
+        self.arena.list_items.pop((self.handle, self.first), None)
+
+    def insert(self, index, node):
+        """Link node at the front of the list; index must be 0."""
+        if index != 0:
+            raise IndexError('arena lists only support insert(0, node)')
+        heads = self.arena.fields[self.first]
+        tails = self.arena.fields[self.first + 1]
+        handle = node.handle
+        self.arena.next[handle] = heads[self.handle]
+        heads[self.handle] = handle
+        if tails[self.handle] < 0:
+            tails[self.handle] = handle
+        self.arena.fields[self.first + 2][self.handle] += 1
+        self.arena.list_items.pop((self.handle, self.first), None)
+
+class ArenaNode:
+    """Mixin for views of arena nodes.
+
+    A view class derives from both ArenaNode and the dl.ast class it
+    stands for, and has the same name, so visitor dispatch, isinstance()
+    checks, the node methods and __repr__ all behave as for the object
+    AST. Every attribute is a property that reads or writes the arena.
+    Views are created on demand and compare equal when they refer to
+    the same node.
+
+    Attributes:
+        arena -- the arena holding the node
+        handle -- the handle of the node
+    """
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return isinstance(other, ArenaNode) and self.handle == other.handle and self.arena is other.arena
+
+    def __hash__(self):
+        return self.handle
+
+    @property
+    def itype(self):
+        return self.arena.itype_names[self.arena.itypes[self.handle]]
+
+    @itype.setter
+    def itype(self, itype):
+        names = self.arena.itype_names
+        if itype not in names:
+            names.append(itype)
+        self.arena.itypes[self.handle] = names.index(itype)
+
+    @property
+    def symbol(self):
+        return self.arena.symbols.get(self.handle)
+
+    @symbol.setter
+    def symbol(self, symbol):
+        if symbol is None:
+            self.arena.symbols.pop(self.handle, None)
+        else:
+            self.arena.symbols[self.handle] = symbol
+
+def node_property(index):
+    def get(self):
+        return self.arena.node(self.arena.fields[index][self.handle])
+    def set(self, node):
+        self.arena.fields[index][self.handle] = -1 if node is None else node.handle
+    return property(get, set)
+
+def name_property(index):
+    def get(self):
+        name_id = self.arena.fields[index][self.handle]
+        return self.arena.names[name_id] if name_id >= 0 else None
+    def set(self, name):
+        self.arena.fields[index][self.handle] = -1 if name is None else self.arena.intern(name)
+    return property(get, set)
+
+def int_property(index):
+    def get(self):
+        if self.handle in self.arena.wide:
+            return self.arena.wide[self.handle]
+        return self.arena.fields[index][self.handle]
+    def set(self, value):
+        if INT_MIN <= value <= INT_MAX:
+            self.arena.wide.pop(self.handle, None)
+            self.arena.fields[index][self.handle] = value
+        else:
+            self.arena.wide[self.handle] = value
+    return property(get, set)
+
+def list_property(index):
+    def get(self):
+        return ArenaList(self.arena, self.handle, index)
+    def set(self, nodes):
+        self.arena.fields[index][self.handle] = -1
+        self.arena.fields[index + 1][self.handle] = -1
+        self.arena.fields[index + 2][self.handle] = 0
+        self.arena.list_items.pop((self.handle, index), None)
+        items = ArenaList(self.arena, self.handle, index)
+        for node in nodes:
+            items.append(node)
+    return property(get, set)
+
+PROPERTIES = {
+    NODE: node_property,
+    NAME: name_property,
+    INT: int_property,
+    LIST: list_property,
+    }
+
+def view_class(kind, cls, layout):
+    """Build the view class for nodes of class cls."""
+    namespace = { '__slots__': ('arena', 'handle'), '__module__': __name__, 'kind': kind }
+    index = 0
+    for name, field_kind in layout:
+        namespace[name] = PROPERTIES[field_kind](index)
+        index += 3 if field_kind == LIST else 1
+    return type(cls.__name__, (ArenaNode, cls), namespace)
+
+VIEW_CLASSES = [view_class(kind, cls, layout) for kind, (cls, layout) in enumerate(LAYOUTS)]
@@ -1,11 +1,19 @@
 class ASTNode:
     """Base class for all AST nodes.
 
+    Nodes declare their attributes in __slots__, so they carry no
+    per-instance __dict__. Every subclass must list its own attributes in
+    __slots__ and call ASTNode.__init__.
+
     Attributes:
         itype -- an annotation of the inferred type of the node
+        symbol -- the symbol the node refers to, once resolved
     """
+    __slots__ = ('itype', 'symbol')
+
     def __init__(self):
         self.itype = None
+        self.symbol = None
 
     def set_itype(self, itype):
         """Set the inferred type of the AST node."""
@@ -18,7 +26,7 @@ class Expression(ASTNode):
     Attributes:
         none
     """
-    pass
+    __slots__ = ()
 
 class Integer(Expression):
     """Integer constant node.
@@ -26,7 +34,10 @@ class Integer(Expression):
     Attributes:
         value -- the integer value of the node
     """
+    __slots__ = ('value',)
+
     def __init__(self, value):
+        super().__init__()
         self.value = value
 
     def __repr__(self):
@@ -38,7 +49,10 @@ class Variable(Expression):
     Attributes:
         name -- the variable name
     """
+    __slots__ = ('name',)
+
     def __init__(self, name):
+        super().__init__()
         self.name = name
 
     def __repr__(self):
@@ -51,7 +65,10 @@ class ArrayIndex(Expression):
         var -- the array variable
         index -- the array element to read or write
     """
+    __slots__ = ('var', 'index')
+
     def __init__(self, var, index):
+        super().__init__()
         self.var = var
         self.index = index
 
@@ -66,7 +83,10 @@ class BinOp(Expression):
         left -- the left-side argument to the operator
         right -- the right-side argument to the operator
     """
+    __slots__ = ('op', 'left', 'right')
+
     def __init__(self, op, left=None, right=None):
+        super().__init__()
         self.op = op
         self.left = left
         self.right = right
@@ -90,6 +110,8 @@ class RelOp(BinOp):
         left -- the left-side argument to the operator
         right -- the right-side argument to the operator
     """
+    __slots__ = ()
+
     def __repr__(self):
         return "RelOp(%s, %s, %s)" % (self.op, self.left, self.right)
 
@@ -100,7 +122,10 @@ class FunctionCall(Expression):
         name -- the function name
         args -- a list of arguments to pass to the function (optional)
     """
+    __slots__ = ('name', 'args')
+
     def __init__(self, name, args=None):
+        super().__init__()
         self.name = name
         self.args = args
 
@@ -116,7 +141,10 @@ class Arguments(ASTNode):
     Attributes:
         arguments -- an ordered list of arguments
     """
+    __slots__ = ('arguments',)
+
     def __init__(self, argument=None):
+        super().__init__()
         if argument:
             self.arguments = [argument]
         else:
@@ -126,6 +154,10 @@ class Arguments(ASTNode):
         """Add an argument to the beginning of the argument list."""
         self.arguments.insert(0, argument)
 
+    def append(self, argument):
+        """Add an argument to the end of the argument list."""
+        self.arguments.append(argument)
+
     def count(self):
         """Count of how many arguments are in argument list."""
         return len(self.arguments)
@@ -140,7 +172,7 @@ class Statement(ASTNode):
     Attributes:
         none
     """
-    pass
+    __slots__ = ()
 
 class Assign(Statement):
     """Assignment statement node.
@@ -149,7 +181,10 @@ class Assign(Statement):
         left -- the variable or array element to assign to
         right -- the value to be assigned
     """
+    __slots__ = ('left', 'right')
+
     def __init__(self, left, right):
+        super().__init__()
         self.left = left
         self.right = right
 
@@ -162,7 +197,10 @@ class Print(Statement):
     Attributes:
         arg -- the single argument to print
     """
+    __slots__ = ('arg',)
+
     def __init__(self, arg):
+        super().__init__()
         self.arg = arg
 
     def __repr__(self):
@@ -174,7 +212,10 @@ class Read(Statement):
     Attributes:
         result -- the variable to store the read value
     """
+    __slots__ = ('result',)
+
     def __init__(self, result):
+        super().__init__()
         self.result = result
 
     def __repr__(self):
@@ -186,7 +227,10 @@ class Return(Statement):
     Attributes:
         result -- the result to return
     """
+    __slots__ = ('result',)
+
     def __init__(self, result):
+        super().__init__()
         self.result = result
 
     def __repr__(self):
@@ -200,7 +244,10 @@ class If(Statement):
         body_true -- the block to run if the condition is true
         body_else -- the block to run if the condition is false (optional)
     """
+    __slots__ = ('condition', 'body_true', 'body_else')
+
     def __init__(self, condition, body_true, body_else=None):
+        super().__init__()
         self.condition = condition
         self.body_true = body_true
         self.body_else = body_else
@@ -218,7 +265,10 @@ class While(Statement):
         condition -- the condition of the loop
         body -- the body of the loop
     """
+    __slots__ = ('condition', 'body')
+
     def __init__(self, condition, body):
+        super().__init__()
         self.condition = condition
         self.body = body
 
@@ -231,7 +281,10 @@ class Block(ASTNode):
     Attributes:
         statements -- an ordered list of statements
     """
+    __slots__ = ('statements',)
+
     def __init__(self, statement=None):
+        super().__init__()
         if statement:
             self.statements = [statement]
         else:
@@ -241,6 +294,10 @@ class Block(ASTNode):
         """Add a statement to the beginning of the statement list."""
         self.statements.insert(0, statement)
 
+    def append(self, statement):
+        """Add a statement to the end of the statement list."""
+        self.statements.append(statement)
+
     def __repr__(self):
         display = "Block(" + ", ".join(map(str, self.statements)) + ")"
         return display
@@ -251,7 +308,10 @@ class Declarations(ASTNode):
     Attributes:
         declarations -- an ordered list of declarations
     """
+    __slots__ = ('declarations',)
+
     def __init__(self, declaration=None):
+        super().__init__()
         if declaration:
             self.declarations = [declaration]
         else:
@@ -261,6 +321,10 @@ class Declarations(ASTNode):
         """Add a declaration to the beginning of the declaration list."""
         self.declarations.insert(0, declaration)
 
+    def append(self, declaration):
+        """Add a declaration to the end of the declaration list."""
+        self.declarations.append(declaration)
+
     def __repr__(self):
         display = "Declarations(" + ", ".join(map(str, self.declarations)) + ")"
         return display
@@ -272,7 +336,10 @@ class VariableDeclarations(ASTNode):
         var_type -- the type of the variables
         variables -- an ordered list of variables to declare
     """
+    __slots__ = ('var_type', 'variables')
+
     def __init__(self, variable=None):
+        super().__init__()
         self.var_type = None
         if variable:
             self.variables = [variable]
@@ -287,6 +354,10 @@ class VariableDeclarations(ASTNode):
         """Add a variable to the beginning of the declaration list."""
         self.variables.insert(0, variable)
 
+    def append(self, variable):
+        """Add a variable to the end of the declaration list."""
+        self.variables.append(variable)
+
     def __repr__(self):
         display = "VariableDeclarations(%s, " % (self.var_type)
         display += ", ".join(map(str, self.variables))
@@ -302,7 +373,10 @@ class FunctionDeclaration(ASTNode):
         args -- a list of arguments to be passed to the function (optional)
         vars -- a list of other variables to declare for the function (optional)
     """
+    __slots__ = ('name', 'args', 'body', 'vars')
+
     def __init__(self, name, args=None):
+        super().__init__()
         self.name = name
         self.args = args
         self.body = None
@@ -344,7 +418,10 @@ class Program(ASTNode):
         body -- the body of the program
         declarations -- the variable and function declarations
     """
+    __slots__ = ('body', 'declarations')
+
     def __init__(self, body, declarations=None):
+        super().__init__()
         self.body = body
         self.declarations = declarations
 
@@ -0,0 +1,378 @@
+import gc
+
+from dl.ir import Constant, BinaryOperator, ICmp, Call, Phi, Branch, drop_all
+from dl.cfg import reverse_postorder, immediate_dominators
+
+INT_MIN = -2**31
+INT_MAX = 2**31 - 1
+
+# The range of a value nothing is known about
+FULL_RANGE = (INT_MIN, INT_MAX)
+
+# How deep in the expressions a value is computed from ranges are
+# followed, before the value is taken to have any value
+MAX_DEPTH = 100
+
+# The predicate that holds when a comparison is false
+NEGATED_PREDICATES = {
+    'eq': 'ne', 'ne': 'eq',
+    'slt': 'sge', 'sge': 'slt',
+    'sle': 'sgt', 'sgt': 'sle',
+    'ult': 'uge', 'uge': 'ult',
+    'ule': 'ugt', 'ugt': 'ule',
+    }
+
+# The predicate with the operands swapped
+SWAPPED_PREDICATES = {
+    'eq': 'eq', 'ne': 'ne',
+    'slt': 'sgt', 'sgt': 'slt',
+    'sle': 'sge', 'sge': 'sle',
+    'ult': 'ugt', 'ugt': 'ult',
+    'ule': 'uge', 'uge': 'ule',
+    }
+
+def in_range(low, high):
+    """Return the range (low, high), or FULL_RANGE if it does not fit
+    i32, as when the computation may wrap around."""
+    if low < INT_MIN or high > INT_MAX:
+        return FULL_RANGE
+    return (low, high)
+
+def intersect(first, second):
+    """Return the values in both ranges, or None if there are none."""
+    low = max(first[0], second[0])
+    high = min(first[1], second[1])
+    if low > high:
+        return None
+    return (low, high)
+
+def constrain(predicate, other):
+    """Return the range of the values x for which x predicate y holds,
+    for every y in the range other, or None if nothing is learned."""
+    low, high = other
+    if predicate == 'slt':
+        return (INT_MIN, high - 1) if high > INT_MIN else None
+    elif predicate == 'sle':
+        return (INT_MIN, high)
+    elif predicate == 'sgt':
+        return (low + 1, INT_MAX) if low < INT_MAX else None
+    elif predicate == 'sge':
+        return (low, INT_MAX)
+    elif predicate == 'eq':
+        return other
+    elif predicate in ('ult', 'ule') and low >= 0:
+        # x is an unsigned value below y, so it is not negative either
+        return (0, high - 1 if predicate == 'ult' else high)
+    return None
+
+def bounds_check(instruction):
+    """Return the ICmp of a bounds check branch, or None if instruction
+    is not one.
+
+    A bounds check is a conditional branch on an unsigned comparison
+    of the index with the constant size of the array, to a block that
+    traps if it fails (see DLGenerator.emit_bounds_check).
+    """
+    if instruction.__class__ is not Branch or len(instruction.operands) != 3:
+        return None
+    condition, ok_block, fail_block = instruction.operands
+    if (condition.__class__ is not ICmp or condition.predicate != "ult"
+            or condition.operands[1].__class__ is not Constant):
+        return None
+    first = fail_block.instructions[0] if fail_block.instructions else None
+    if first.__class__ is not Call or first.operands[0].name != "llvm.trap":
+        return None
+    return condition
+
+class ValueRanges:
+    """Find ranges of the integer values of a function in SSA form.
+
+    The range of a value is a (low, high) pair, of the values it can
+    have at some block. Constants have their value, and arithmetic is
+    computed on ranges, as long as it cannot wrap around. The facts a
+    block knows come from the branches that must have been taken to
+    reach it: in the body of while (i < n) { ... }, i is below n.
+
+    Loop counters are phis that start at some value, and only step up
+    (or down) by a constant from there. Their range goes from the start
+    value to where the loop test stops them:
+
+        while.loop.1:
+          %i.phi.0 = phi i32 [ 0, %entry ], [ %tmp.5, %while.body.2 ]
+          %tmp.1 = icmp slt i32 %i.phi.0, 10
+          br i1 %tmp.1, label %while.body.2, label %while.end.3
+        while.body.2:                       ; %i.phi.0 is in (0, 9)
+          %tmp.5 = add i32 %i.phi.0, 1      ; %tmp.5 is in (1, 10)
+
+    Attributes:
+        function -- the function analyzed
+        idom -- the immediate dominators of the reachable blocks
+        facts -- map from each block analyzed so far to a map from
+                 values to the ranges known for them there
+        visiting -- the phis whose range is being found, which are
+                    taken to have any value meanwhile
+        depth -- how deep in the operands of a value the analysis is
+    """
+    def __init__(self, function):
+        self.function = function
+        order = reverse_postorder(function)
+        self.idom = immediate_dominators(function, order)
+        self.facts = {order[0]: {}}
+        self.visiting = set()
+        self.depth = 0
+        # Dominators are analyzed before the blocks they dominate
+        for block in order[1:]:
+            self.block_facts(block)
+
+    def block_facts(self, block):
+        """Return the facts known at a block."""
+        facts = self.facts.get(block)
+        if facts is None:
+            if block not in self.idom:
+                # Nothing is known in unreachable code
+                return {}
+            # Analyze the dominators not analyzed yet first, outermost first
+            chain = []
+            while block not in self.facts:
+                chain.append(block)
+                block = self.idom[block]
+            for block in reversed(chain):
+                facts = self.add_facts(block)
+        return facts
+
+    def add_facts(self, block):
+        """Find the facts known at a block: those of its dominator, and
+        what the branch to it tells, if it is the only way in."""
+        facts = self.facts[block] = dict(self.facts[self.idom[block]])
+        predecessors = block.predecessors
+        if len(predecessors) != 1:
+            return facts
+        source = predecessors[0]
+        branch = source.terminator
+        if len(branch.operands) != 3 or branch.operands[1] is branch.operands[2]:
+            return facts
+        condition = branch.operands[0]
+        if condition.__class__ is not ICmp:
+            return facts
+        predicate = condition.predicate
+        if branch.operands[2] is block:
+            predicate = NEGATED_PREDICATES[predicate]
+        left, right = condition.operands
+        if left.__class__ is not Constant:
+            self.learn(facts, left, constrain(predicate, self.range(right, source)))
+        if right.__class__ is not Constant:
+            self.learn(facts, right, constrain(SWAPPED_PREDICATES[predicate], self.range(left, source)))
+        return facts
+
+    def learn(self, facts, value, known):
+        """Add the range known for a value to facts."""
+        if known is None:
+            return
+        previous = facts.get(value)
+        if previous is not None:
+            known = intersect(previous, known)
+            if known is None:
+                # The block cannot be reached; keep what was known
+                return
+        facts[value] = known
+
+    def range(self, value, block):
+        """Return the range of value at block."""
+        if value.__class__ is Constant:
+            if value.value.__class__ is not int:
+                return FULL_RANGE
+            return (value.value, value.value)
+        known = self.value_range(value)
+        fact = self.block_facts(block).get(value)
+        if fact is not None:
+            known = intersect(known, fact) or fact
+        return known
+
+    def value_range(self, value):
+        """Return the range of value wherever it is defined."""
+        if self.depth > MAX_DEPTH:
+            return FULL_RANGE
+        self.depth += 1
+        try:
+            value_class = value.__class__
+            if value_class is BinaryOperator:
+                return self.operation_range(value)
+            elif value_class is Phi and value not in self.visiting:
+                self.visiting.add(value)
+                try:
+                    return self.phi_range(value)
+                finally:
+                    self.visiting.discard(value)
+            return FULL_RANGE
+        finally:
+            self.depth -= 1
+
+    def operation_range(self, operation):
+        """Return the range of the result of a binary operation."""
+        block = operation.block
+        left = self.range(operation.operands[0], block)
+        right = self.range(operation.operands[1], block)
+        opcode = operation.opcode
+        if opcode == "add":
+            return in_range(left[0] + right[0], left[1] + right[1])
+        elif opcode == "sub":
+            return in_range(left[0] - right[1], left[1] - right[0])
+        elif opcode == "mul":
+            products = [a * b for a in left for b in right]
+            return in_range(min(products), max(products))
+        elif opcode == "udiv" and left[0] >= 0 and right[0] > 0:
+            return (left[0] // right[1], left[1] // right[0])
+        return FULL_RANGE
+
+    def phi_range(self, phi):
+        """Return the range of a phi.
+
+        A loop counter stays on the side of its start values its steps
+        go to, since a step cannot wrap around where the loop test
+        bounds the counter. So the range goes from the start values to
+        the furthest the steps take the counter. Other phis have any
+        value of their incoming values.
+        """
+        starts = []
+        steps = []
+        for value, block in zip(phi.operands, phi.blocks):
+            if value is phi:
+                continue
+            step = self.step(phi, value)
+            if step is None:
+                starts.append(self.range(value, block))
+            elif step:
+                steps.append((step, value.block))
+        if not starts:
+            return FULL_RANGE
+        low = min([start[0] for start in starts])
+        high = max([start[1] for start in starts])
+        if not steps:
+            return (low, high)
+        if all(step > 0 for step, block in steps):
+            for step, block in steps:
+                known = self.block_facts(block).get(phi, FULL_RANGE)
+                if known[1] + step > INT_MAX:
+                    return FULL_RANGE
+                high = max(high, known[1] + step)
+        elif all(step < 0 for step, block in steps):
+            for step, block in steps:
+                known = self.block_facts(block).get(phi, FULL_RANGE)
+                if known[0] + step < INT_MIN:
+                    return FULL_RANGE
+                low = min(low, known[0] + step)
+        else:
+            return FULL_RANGE
+        return (low, high)
+
+    def step(self, phi, value):
+        """Return the constant value adds to phi, or None."""
+        if value.__class__ is not BinaryOperator or value.block is None:
+            return None
+        left, right = value.operands
+        if value.opcode == "add":
+            if left is phi and right.__class__ is Constant:
+                return right.value
+            elif right is phi and left.__class__ is Constant:
+                return left.value
+        elif value.opcode == "sub" and left is phi and right.__class__ is Constant:
+            return -right.value
+        return None
+
+class BoundsCheckElimination:
+    """Remove the array bounds checks that cannot fail.
+
+    DLGenerator(check_bounds=True) checks every array index before the
+    element is used. This pass finds the range of each index checked,
+    with ValueRanges, and where it is all inside the array, branches
+    straight on and joins the rest of the code to the block of the
+    check, so a loop over an array is left as if it was not checked:
+
+        module = DLGenerator(check_bounds=True).build(checked)
+        Mem2Reg().run(module)
+        BoundsCheckElimination().run(module)
+
+    Run it after Mem2Reg, since the ranges of values that are still
+    in memory are not known. Constant indices and indices checked
+    before are found in range without. The trap block of a function is
+    removed once no check is left to branch to it.
+
+    Attributes:
+        checks -- the number of bounds checks found
+        eliminated -- the number of bounds checks removed
+    """
+    def __init__(self):
+        self.checks = 0
+        self.eliminated = 0
+
+    def run(self, module):
+        """Remove the redundant bounds checks of module, and return it.
+
+        The garbage collector is paused meanwhile, as in DLGenerator.build.
+        """
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for function in module.functions:
+                if function.blocks:
+                    self.run_on_function(function)
+        finally:
+            if enabled:
+                gc.enable()
+        return module
+
+    def run_on_function(self, function):
+        """Remove the redundant bounds checks of a function."""
+        branches = [block.terminator for block in function.blocks
+                    if block.terminator is not None and bounds_check(block.terminator) is not None]
+        if not branches:
+            return
+        self.checks += len(branches)
+
+        # All the checks are decided first, on the unchanged code
+        ranges = ValueRanges(function)
+        redundant = []
+        for branch in branches:
+            condition = bounds_check(branch)
+            index, size = condition.operands
+            if branch.block not in ranges.idom:
+                continue
+            known = ranges.range(index, condition.block)
+            if 0 <= known[0] and known[1] < size.value:
+                redundant.append(branch)
+
+        removed = set()
+        fail_blocks = set()
+        for branch in redundant:
+            condition, ok_block, fail_block = branch.operands
+            fail_blocks.add(fail_block)
+            self.merge(branch, ok_block, removed)
+            if not condition.uses:
+                removed.add(condition)
+                condition.block.instructions.remove(condition)
+        self.eliminated += len(redundant)
+
+        for fail_block in fail_blocks:
+            if not fail_block.uses:
+                removed.update(fail_block.instructions)
+                function.blocks.remove(fail_block)
+                fail_block.function = None
+        drop_all(removed)
+
+    def merge(self, branch, ok_block, removed):
+        """Replace a bounds check branch with the code of the block it
+        goes to when the check passes, which has no other way in."""
+        block = branch.block
+        branch.drop_operands()
+        block.instructions.pop()
+        for instruction in ok_block.instructions:
+            instruction.block = block
+        block.instructions.extend(ok_block.instructions)
+        ok_block.instructions = []
+        for successor in dict.fromkeys(block.successors):
+            for instruction in successor.instructions:
+                if instruction.__class__ is Phi:
+                    instruction.blocks = [block if incoming is ok_block else incoming
+                                          for incoming in instruction.blocks]
+        block.function.blocks.remove(ok_block)
+        ok_block.function = None
@@ -0,0 +1,151 @@
+"""Control flow analyses of the functions of a dl.ir Module.
+
+The functions here take a Function with basic blocks, and only follow
+the edges from its entry block, so unreachable blocks have no
+dominator and are in no result. They walk the graph with explicit
+stacks, so the long chains of blocks of large programs do not hit the
+recursion limit.
+"""
+
+def reverse_postorder(function):
+    """Return the blocks reachable from the entry, in reverse postorder."""
+    entry = function.blocks[0]
+    order = []
+    visited = {entry}
+    stack = [(entry, iter(entry.successors))]
+    while stack:
+        block, successors = stack[-1]
+        for successor in successors:
+            if successor not in visited:
+                visited.add(successor)
+                stack.append((successor, iter(successor.successors)))
+                break
+        else:
+            stack.pop()
+            order.append(block)
+    order.reverse()
+    return order
+
+def reachable_predecessors(block, reachable):
+    """Return the predecessors of block that are in reachable."""
+    return [predecessor for predecessor in block.predecessors if predecessor in reachable]
+
+def immediate_dominators(function, order=None):
+    """Return a map from each reachable block to its immediate dominator.
+
+    The entry block is mapped to itself. This is the iterative algorithm
+    of Cooper, Harvey and Kennedy, "A Simple, Fast Dominance Algorithm".
+    order is the reverse postorder of the function, if already known.
+    """
+    if order is None:
+        order = reverse_postorder(function)
+    index = {block: n for n, block in enumerate(order)}
+    predecessors = {block: reachable_predecessors(block, index) for block in order}
+    entry = order[0]
+    idom = {entry: entry}
+
+    def intersect(first, second):
+        while first is not second:
+            while index[first] > index[second]:
+                first = idom[first]
+            while index[second] > index[first]:
+                second = idom[second]
+        return first
+
+    changed = True
+    while changed:
+        changed = False
+        for block in order[1:]:
+            new_idom = None
+            for predecessor in predecessors[block]:
+                if predecessor in idom:
+                    new_idom = predecessor if new_idom is None else intersect(predecessor, new_idom)
+            if idom.get(block) is not new_idom:
+                idom[block] = new_idom
+                changed = True
+    return idom
+
+def dominator_tree(idom):
+    """Return a map from each block to the blocks it immediately dominates."""
+    children = {block: [] for block in idom}
+    for block, parent in idom.items():
+        if block is not parent:
+            children[parent].append(block)
+    return children
+
+def dominates(idom, dominator, block):
+    """Check if dominator dominates block, given the immediate dominators."""
+    while True:
+        if block is dominator:
+            return True
+        parent = idom[block]
+        if parent is block:
+            return False
+        block = parent
+
+def dominance_frontiers(idom):
+    """Return a map from each block to its dominance frontier, as a set."""
+    frontiers = {block: set() for block in idom}
+    for block in idom:
+        predecessors = reachable_predecessors(block, idom)
+        if len(predecessors) < 2:
+            continue
+        for predecessor in predecessors:
+            runner = predecessor
+            while runner is not idom[block]:
+                frontiers[runner].add(block)
+                runner = idom[runner]
+    return frontiers
+
+class Loop:
+    """A natural loop: the blocks of the cycles through a header block,
+    which dominates them all.
+
+    Attributes:
+        header -- the block the loop is entered at, as while.loop
+        blocks -- the blocks of the loop, the header included, as a set
+        latches -- the blocks in the loop that branch back to the header
+    """
+    def __init__(self, header):
+        self.header = header
+        self.blocks = {header}
+        self.latches = []
+
+    def outside_predecessors(self):
+        """Return the predecessors of the header outside the loop."""
+        return [block for block in self.header.predecessors if block not in self.blocks]
+
+    def exits(self):
+        """Return the blocks outside the loop that blocks in it branch to."""
+        exits = []
+        for block in self.blocks:
+            for successor in block.successors:
+                if successor not in self.blocks and successor not in exits:
+                    exits.append(successor)
+        return exits
+
+def natural_loops(idom):
+    """Return the natural loops of a function, given its immediate
+    dominators, innermost first.
+
+    Each branch back to a block that dominates it closes a loop, and
+    the loops with the same header are one loop.
+    """
+    loops = {}
+    for block in idom:
+        for successor in block.successors:
+            if successor in idom and dominates(idom, successor, block):
+                loop = loops.get(successor)
+                if loop is None:
+                    loop = loops[successor] = Loop(successor)
+                loop.latches.append(block)
+                # The loop has the blocks the latch is reached from
+                # without passing the header
+                worklist = [block]
+                while worklist:
+                    member = worklist.pop()
+                    if member not in loop.blocks:
+                        loop.blocks.add(member)
+                        worklist.extend(reachable_predecessors(member, idom))
+    # A loop nested in another has fewer blocks
+    return sorted(loops.values(), key=lambda loop: len(loop.blocks))
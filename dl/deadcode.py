@@ -0,0 +1,155 @@
+import gc
+
+from dl.ir import Alloca, Load, GetElementPtr, BinaryOperator, ICmp, Call, Phi, Constant, Function, drop_all
+from dl.cfg import reverse_postorder
+
+# Instructions that only compute a value, and can go if it is unused
+PURE_INSTRUCTIONS = {Alloca, Load, GetElementPtr, BinaryOperator, ICmp, Phi}
+
+def is_pure(instruction):
+    """Check if an instruction does nothing but compute its value.
+
+    A division is only pure by a constant other than zero, since the
+    generated code leaves division by zero to happen at run time.
+    """
+    instruction_class = instruction.__class__
+    if instruction_class is BinaryOperator and instruction.opcode == "udiv":
+        divisor = instruction.operands[1]
+        return divisor.__class__ is Constant and divisor.value != 0
+    return instruction_class in PURE_INSTRUCTIONS
+
+class DeadCodeElimination:
+    """Remove the code of a module that never runs, or computes values
+    that are never used.
+
+    DLGenerator keeps generating the code after a return, in a block
+    without a label, and the end of an If whose branches both return
+    is a block nothing branches to. The pass removes:
+
+        the instructions after the terminator of a block
+        the blocks that cannot be reached from the entry of a function,
+            and their values in the phis of the blocks that can
+        the instructions that compute values nothing uses, as the
+            loads and arithmetic whose uses other passes replaced
+        the functions that main never calls, directly or through
+            other functions
+
+    Stores, calls, branches and returns are always kept, as is division
+    by anything but a constant, which may fault.
+
+        module = DLGenerator().build(checked)
+        DeadCodeElimination().run(module)
+
+    Attributes:
+        removed -- count of the instructions removed, by opcode
+        blocks -- the number of blocks removed
+        functions -- the names of the functions removed
+    """
+    def __init__(self):
+        self.removed = {}
+        self.blocks = 0
+        self.functions = []
+
+    def run(self, module):
+        """Remove the dead code of module, and return it.
+
+        The garbage collector is paused meanwhile, as in DLGenerator.build.
+        """
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for function in module.functions:
+                if function.blocks:
+                    self.run_on_function(function)
+            self.remove_functions(module)
+        finally:
+            if enabled:
+                gc.enable()
+        return module
+
+    def removed_count(self):
+        """Return the total number of instructions removed."""
+        return sum(self.removed.values())
+
+    def count_removed(self, instructions):
+        """Count removed instructions by opcode."""
+        for instruction in instructions:
+            self.removed[instruction.opcode] = self.removed.get(instruction.opcode, 0) + 1
+
+    def run_on_function(self, function):
+        """Remove the dead code of a function."""
+        removed = []
+
+        # Code after a terminator never runs
+        for block in function.blocks:
+            for index, instruction in enumerate(block.instructions):
+                if instruction.is_terminator:
+                    if index + 1 < len(block.instructions):
+                        removed.extend(block.instructions[index + 1:])
+                        del block.instructions[index + 1:]
+                    break
+
+        # Nor does code in blocks the entry has no path to. Their
+        # branches are dropped here, so the blocks they branch to lose
+        # them as predecessors
+        reachable = set(reverse_postorder(function))
+        blocks = []
+        for block in function.blocks:
+            if block in reachable:
+                blocks.append(block)
+                continue
+            for successor in dict.fromkeys(block.successors):
+                if successor in reachable:
+                    for instruction in successor.instructions:
+                        if instruction.__class__ is Phi:
+                            instruction.remove_incoming(block)
+            removed.extend(block.instructions)
+            block.instructions = []
+            block.function = None
+            self.blocks += 1
+        function.blocks = blocks
+
+        # Mark the values the instructions with effects use, directly
+        # or through other values; the pure instructions left unmarked
+        # are dead
+        live = set()
+        worklist = [instruction for instruction in function.instructions() if not is_pure(instruction)]
+        while worklist:
+            instruction = worklist.pop()
+            if instruction in live:
+                continue
+            live.add(instruction)
+            for operand in instruction.operands:
+                if operand.__class__ in PURE_INSTRUCTIONS and operand not in live:
+                    worklist.append(operand)
+        for block in blocks:
+            kept = [instruction for instruction in block.instructions if instruction in live]
+            if len(kept) != len(block.instructions):
+                removed.extend([instruction for instruction in block.instructions if instruction not in live])
+                block.instructions = kept
+
+        self.count_removed(removed)
+        drop_all(set(removed))
+
+    def remove_functions(self, module):
+        """Remove the functions main does not call, directly or not."""
+        main = module.get_function("main")
+        if main is None:
+            return
+        called = {main}
+        worklist = [main]
+        while worklist:
+            for instruction in worklist.pop().instructions():
+                if instruction.__class__ is Call:
+                    function = instruction.operands[0]
+                    if function.__class__ is Function and function not in called:
+                        called.add(function)
+                        worklist.append(function)
+        for function in list(module.functions):
+            if function.blocks and function not in called:
+                instructions = list(function.instructions())
+                self.count_removed(instructions)
+                self.blocks += len(function.blocks)
+                drop_all(set(instructions))
+                module.remove_function(function)
+                self.functions.append(function.name)
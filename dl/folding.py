@@ -0,0 +1,314 @@
+from dl import ast
+from dl.visitor import ASTVisitor
+from dl.ast import Integer, Variable, ArrayIndex, BinOp, RelOp, FunctionDeclaration
+from dl.symbols import VariableSymbol
+from dl.generator import BINOP_OPCODES
+
+INT_MIN = -2**31
+INT_MAX = 2**31 - 1
+
+def wrap(value):
+    """Return value wrapped around to a signed 32 bit integer, as i32."""
+    return (value - INT_MIN) % 2**32 + INT_MIN
+
+def fold_BinOp(op, left, right):
+    """Return the value of the binary operation op on two i32 values,
+    or None if it cannot be computed, as for division by zero."""
+    if op == 'PLUSOP':
+        return wrap(left + right)
+    elif op == 'MINUSOP':
+        return wrap(left - right)
+    elif op == 'MULTIPLYOP':
+        return wrap(left * right)
+    elif op == 'DIVIDEOP':
+        # The generator divides with udiv, on the unsigned bit patterns
+        divisor = right % 2**32
+        if divisor == 0:
+            return None
+        return wrap(left % 2**32 // divisor)
+    return None
+
+def fold_RelOp(op, left, right):
+    """Return the value of the comparison op of two i32 values, or None."""
+    if op == 'EQOP':
+        return left == right
+    elif op == 'NEOP':
+        return left != right
+    elif op == 'LTOP':
+        return left < right
+    elif op == 'LEOP':
+        return left <= right
+    elif op == 'GTOP':
+        return left > right
+    elif op == 'GEOP':
+        return left >= right
+    return None
+
+# The value of comparing a value with itself
+RELOP_REFLEXIVE = {
+    'EQOP': True,
+    'NEOP': False,
+    'LTOP': False,
+    'LEOP': True,
+    'GTOP': False,
+    'GEOP': True,
+    }
+
+class DLConstantFolder(ASTVisitor):
+    """Fold constant expressions in a checked AST.
+
+    Run between DLSemanticAnalyzer and DLGenerator, the folder replaces
+    the BinOp and RelOp subtrees that have constant operands with their
+    value, and simplifies the identities and annihilators of arithmetic:
+
+        x + 0, 0 + x, x - 0, x * 1, 1 * x, x / 1  ->  x
+        x * 0, 0 * x, x - x                       ->  0
+        x == x, x <= x, x >= x                    ->  true
+        x != x, x < x, x > x                      ->  false
+
+    Values are folded as the generated code computes them: i32
+    arithmetic wraps around, and division is unsigned (udiv). Division
+    by zero is left to run. A subtree is only dropped, as x in x * 0, if
+    it calls no function, and x - x and the comparisons only fold when
+    both sides are the same variable.
+
+    A folded comparison becomes an Integer node with the inferred type
+    'bool', 1 for true and 0 for false, which the generator emits as an
+    i1 constant. The index of an ArrayIndex is folded too, so constant
+    index expressions work like constant indices.
+
+    The folder counts the instructions the generator would have emitted
+    for the folded code, by opcode:
+
+        folder = DLConstantFolder()
+        program = folder.fold(checked)
+        print(folder.removed)        # {'add': 2, 'load': 1}
+
+    Attributes:
+        nodes -- the node classes to create folded constants with, as
+                 for DLParser: dl.ast, or the ASTArena of the tree
+        removed -- count of the instructions removed, by opcode
+    """
+    def __init__(self, nodes=ast):
+        self.nodes = nodes
+        self.removed = {}
+
+    def fold(self, program):
+        """Fold the constant expressions of a checked program, and return it."""
+        self.visit(program)
+        return program
+
+    def removed_count(self):
+        """Return the total number of instructions removed."""
+        return sum(self.removed.values())
+
+    def remove(self, opcode, count=1):
+        """Count removed instructions with the given opcode."""
+        self.removed[opcode] = self.removed.get(opcode, 0) + count
+
+    def remove_tree(self, node):
+        """Count the instructions of an expression that is dropped."""
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, BinOp):
+                if isinstance(node, RelOp):
+                    self.remove("icmp")
+                else:
+                    self.remove(BINOP_OPCODES[node.op])
+                stack.append(node.left)
+                stack.append(node.right)
+            elif isinstance(node, ArrayIndex):
+                self.remove("getelementptr")
+                self.remove("load")
+                stack.append(node.index)
+            elif isinstance(node, Variable):
+                # Arguments are used without a load
+                if isinstance(node.symbol, VariableSymbol):
+                    self.remove("load")
+
+    def is_pure(self, node):
+        """Check if an expression can be dropped: it calls no function."""
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, BinOp):
+                stack.append(node.left)
+                stack.append(node.right)
+            elif isinstance(node, ArrayIndex):
+                stack.append(node.index)
+            elif not isinstance(node, (Integer, Variable)):
+                return False
+        return True
+
+    def same_variable(self, left, right):
+        """Check if two expressions are uses of the same variable."""
+        return (isinstance(left, Variable) and isinstance(right, Variable)
+                and left.symbol is not None and left.symbol is right.symbol)
+
+    def constant(self, value, itype='int'):
+        """Create an Integer node for a folded value."""
+        node = self.nodes.Integer(value)
+        node.set_itype(itype)
+        return node
+
+    def constant_value(self, node):
+        """Return the value of an i32 Integer node, or None."""
+        if isinstance(node, Integer) and node.itype != 'bool' and INT_MIN <= node.value <= INT_MAX:
+            return node.value
+        return None
+
+
+    def visit_Integer(self, node):
+        """Call the folder for Integer AST nodes."""
+        return node
+
+    def visit_Variable(self, node):
+        """Call the folder for Variable AST nodes."""
+        return node
+
+    def visit_ArrayIndex(self, node):
+        """Call the folder for ArrayIndex AST nodes."""
+        node.index = yield node.index
+        return node
+
+    def visit_BinOp(self, node):
+        """Call the folder for BinOp AST nodes."""
+        left = yield node.left
+        right = yield node.right
+        node.left = left
+        node.right = right
+
+        op = node.op
+        left_value = self.constant_value(left)
+        right_value = self.constant_value(right)
+        if left_value is not None and right_value is not None:
+            value = fold_BinOp(op, left_value, right_value)
+            if value is not None:
+                self.remove(BINOP_OPCODES[op])
+                return self.constant(value)
+            return node
+
+        # Identities keep an operand, annihilators drop the whole tree
+        kept = None
+        if op == 'PLUSOP':
+            if right_value == 0:
+                kept = left
+            elif left_value == 0:
+                kept = right
+        elif op == 'MINUSOP':
+            if right_value == 0:
+                kept = left
+            elif self.same_variable(left, right):
+                self.remove_tree(node)
+                return self.constant(0)
+        elif op == 'MULTIPLYOP':
+            if right_value == 1:
+                kept = left
+            elif left_value == 1:
+                kept = right
+            elif (right_value == 0 and self.is_pure(left)) or (left_value == 0 and self.is_pure(right)):
+                self.remove_tree(node)
+                return self.constant(0)
+        elif op == 'DIVIDEOP':
+            if right_value == 1:
+                kept = left
+        if kept is None:
+            return node
+        self.remove(BINOP_OPCODES[op])
+        return kept
+
+    def visit_RelOp(self, node):
+        """Call the folder for RelOp AST nodes."""
+        left = yield node.left
+        right = yield node.right
+        node.left = left
+        node.right = right
+
+        left_value = self.constant_value(left)
+        right_value = self.constant_value(right)
+        if left_value is not None and right_value is not None:
+            value = fold_RelOp(node.op, left_value, right_value)
+        elif self.same_variable(left, right):
+            value = RELOP_REFLEXIVE.get(node.op)
+        else:
+            value = None
+        if value is None:
+            return node
+        self.remove_tree(node)
+        return self.constant(int(value), 'bool')
+
+    def visit_FunctionCall(self, node):
+        """Call the folder for FunctionCall AST nodes."""
+        if node.args:
+            yield node.args
+        return node
+
+    def visit_Arguments(self, node):
+        """Call the folder for Arguments AST nodes."""
+        arguments = []
+        changed = False
+        for argument in node.arguments:
+            folded = yield argument
+            arguments.append(folded)
+            changed = changed or folded is not argument
+        if changed:
+            node.arguments = arguments
+        return node
+
+
+    def visit_Assign(self, node):
+        """Call the folder for Assign AST nodes."""
+        if isinstance(node.left, ArrayIndex):
+            yield node.left
+        node.right = yield node.right
+
+    def visit_Print(self, node):
+        """Call the folder for Print AST nodes."""
+        node.arg = yield node.arg
+
+    def visit_Read(self, node):
+        """Call the folder for Read AST nodes."""
+        pass
+
+    def visit_Return(self, node):
+        """Call the folder for Return AST nodes."""
+        node.result = yield node.result
+
+    def visit_If(self, node):
+        """Call the folder for If AST nodes."""
+        node.condition = yield node.condition
+        yield node.body_true
+        if node.body_else:
+            yield node.body_else
+
+    def visit_While(self, node):
+        """Call the folder for While AST nodes."""
+        node.condition = yield node.condition
+        yield node.body
+
+    def visit_Block(self, node):
+        """Call the folder for Block AST nodes."""
+        for statement in node.statements:
+            yield statement
+
+
+    def visit_Declarations(self, node):
+        """Call the folder for Declarations AST nodes."""
+        for declaration in node.declarations:
+            if isinstance(declaration, FunctionDeclaration):
+                yield declaration
+
+    def visit_VariableDeclarations(self, node):
+        """Call the folder for VariableDeclarations AST nodes."""
+        pass
+
+    def visit_FunctionDeclaration(self, node):
+        """Call the folder for FunctionDeclaration AST nodes."""
+        yield node.body
+
+    def visit_Program(self, node):
+        """Call the folder for Program AST nodes."""
+        if node.declarations:
+            yield node.declarations
+        yield node.body
@@ -0,0 +1,173 @@
+from dl.generator import DLGenerator, GenerationError, BINOP_OPCODES, RELOP_OPCODES
+from dl.semantic import DLSemanticAnalyzer
+from dl.ast import Variable, ArrayIndex, VariableDeclarations
+
+class DLFusedGenerator(DLGenerator, DLSemanticAnalyzer):
+    """Run semantic analysis and generate LLVM code in a single pass.
+
+    Traverse an abstract syntax tree (AST) once, checking each node as
+    DLSemanticAnalyzer does and generating code for it as DLGenerator
+    does. The generated code is the same as running the two passes one
+    after the other, and the same SemanticError is raised for programs
+    that fail the analysis:
+
+        ir = DLFusedGenerator().generate(program)
+
+    Nodes are checked in the order of the analyzer, so the first error
+    found is the same. Nodes that the generator does not visit, like
+    the target of an assignment, are checked without generating code.
+    The index of an array target is checked before the right side, and
+    its code is generated after it, as DLGenerator does.
+
+    Attributes:
+        st -- symbol table for the program
+        checker -- analyzer that shares st, for the subtrees that are
+                   checked before their code is generated
+        module -- the IR module being built
+        function -- the function being built
+        block -- the basic block instructions are added to
+        values -- map from the symbols of the locals and arguments of
+                  the function to the values they are kept in
+        printf, scanf -- the declarations of the library functions
+        format_string -- the global format string of printf and scanf
+        output -- the file object code is written to, or None
+        streaming -- whether finished functions are written to output
+                     and dropped from the module
+        check_bounds -- whether array indices are checked at run time
+        trap -- the declaration of llvm.trap, once a check needs it
+        bounds_fail -- the block the failed checks of the function
+                       branch to, once a check needs it
+        reg_count -- current count of temporary registers
+        label_count -- current count of unique labels
+    """
+    def __init__(self, names=None, output=None, check_bounds=False):
+        DLGenerator.__init__(self, output, check_bounds)
+        DLSemanticAnalyzer.__init__(self, names)
+        # Checks subtrees without generating code, with the same symbols
+        self.checker = DLSemanticAnalyzer(names)
+        self.checker.st = self.st
+
+    def visit_Integer(self, node):
+        """Call the fused pass for Integer AST nodes."""
+        DLSemanticAnalyzer.visit_Integer(self, node)
+        return DLGenerator.visit_Integer(self, node)
+
+    def visit_Variable(self, node):
+        """Call the fused pass for Variable AST nodes."""
+        DLSemanticAnalyzer.visit_Variable(self, node)
+        return DLGenerator.visit_Variable(self, node)
+
+    def visit_ArrayIndex(self, node):
+        """Call the fused pass for ArrayIndex AST nodes."""
+        self.find_ArrayIndex(node)
+        return (yield from DLGenerator.visit_ArrayIndex(self, node))
+
+    def check_target(self, node):
+        """Check a node that is used without generating code for it."""
+        if isinstance(node, Variable):
+            DLSemanticAnalyzer.visit_Variable(self, node)
+        elif isinstance(node, ArrayIndex):
+            self.checker.visit(node)
+        else:
+            raise GenerationError("Assignment is only possible to variables and indexed array elements")
+
+    def visit_BinOp(self, node):
+        """Call the fused pass for BinOp AST nodes."""
+        temp_name = self.new_temporary()
+        left = yield node.left
+        right = yield node.right
+        self.check_BinOp(node)
+        return self.emit_BinOp(temp_name, BINOP_OPCODES.get(node.op, ""), left, right)
+
+    def visit_RelOp(self, node):
+        """Call the fused pass for RelOp AST nodes."""
+        temp_name = self.new_temporary()
+        left = yield node.left
+        right = yield node.right
+        self.check_RelOp(node)
+        return self.emit_RelOp(temp_name, RELOP_OPCODES.get(node.op, ""), left, right)
+
+    def visit_FunctionCall(self, node):
+        """Call the fused pass for FunctionCall AST nodes."""
+        self.find_FunctionCall(node)
+        temp_name = self.new_temporary()
+
+        args = []
+        if node.args:
+            args = yield node.args
+        self.check_FunctionCall(node)
+        return self.emit_FunctionCall(temp_name, node.name, args)
+
+    def visit_Assign(self, node):
+        """Call the fused pass for Assign AST nodes."""
+        self.check_target(node.left)
+        right = yield node.right
+        self.check_Assign(node)
+
+        if isinstance(node.left, Variable):
+            self.assign_Variable(node.left, right)
+        else:
+            index = yield node.left.index
+            self.assign_ArrayIndex(node.left, right, index)
+
+    def visit_Read(self, node):
+        """Call the fused pass for Read AST nodes."""
+        self.check_target(node.result)
+        DLGenerator.visit_Read(self, node)
+
+    def visit_Declarations(self, node):
+        """Call the fused pass for Declarations AST nodes."""
+        variables = []
+        for declaration in node.declarations:
+            if isinstance(declaration, VariableDeclarations):
+                # Declare the symbols now, the code is generated in main
+                DLSemanticAnalyzer.visit_VariableDeclarations(self, declaration)
+                variables.append(declaration)
+            else:
+                yield declaration
+        return variables
+
+    def visit_VariableDeclarations(self, node):
+        """Call the fused pass for the VariableDeclarations of a function."""
+        DLSemanticAnalyzer.visit_VariableDeclarations(self, node)
+        DLGenerator.visit_VariableDeclarations(self, node)
+
+    def visit_FunctionDeclaration(self, node):
+        """Call the fused pass for FunctionDeclaration AST nodes."""
+        self.enter_FunctionDeclaration(node)
+        arguments = []
+        if node.args:
+            arguments = node.args.arguments
+        self.emit_function_header(node.name, arguments)
+
+        if node.vars:
+            yield node.vars
+
+        yield node.body
+        self.emit_function_footer()
+        self.st.exit_scope()
+
+    def visit_Program(self, node):
+        """Call the fused pass for Program AST nodes."""
+        self.st.enter_scope()
+        var_decs = None
+        if node.declarations:
+            var_decs = yield node.declarations
+        self.emit_main_header()
+
+        # The symbols were declared with the declarations
+        if var_decs:
+            for variable in var_decs:
+                DLGenerator.visit_VariableDeclarations(self, variable)
+
+        yield node.body
+        self.emit_main_footer()
+        self.st.exit_scope()
+
+    # The remaining statements are checked and generated alike
+    visit_Arguments = DLGenerator.visit_Arguments
+    visit_Print = DLGenerator.visit_Print
+    visit_Return = DLGenerator.visit_Return
+    visit_If = DLGenerator.visit_If
+    visit_While = DLGenerator.visit_While
+    visit_Block = DLGenerator.visit_Block
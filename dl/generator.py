@@ -1,32 +1,123 @@
+import gc
+
 from dl.visitor import ASTVisitor
 from dl.ast import Variable, ArrayIndex, VariableDeclarations, FunctionDeclaration
 from dl.symbols import VariableSymbol, ArgumentSymbol, ArraySymbol
+from dl.ir import (Module, Function, BasicBlock, GlobalString, Alloca, Load, Store,
+                   GetElementPtr, BinaryOperator, ICmp, Call, Branch, Return, Unreachable)
+
+# LLVM opcodes of the binary and relational operators
+BINOP_OPCODES = {
+    'PLUSOP': "add",
+    'MINUSOP': "sub",
+    'MULTIPLYOP': "mul",
+    'DIVIDEOP': "udiv",
+    }
+
+RELOP_OPCODES = {
+    'EQOP': "eq",
+    'NEOP': "ne",
+    'LTOP': "slt",
+    'LEOP': "sle",
+    'GTOP': "sgt",
+    'GEOP': "sge",
+    }
 
 class DLGenerator(ASTVisitor):
     """Generate LLVM code from an AST.
-    Traverse an abstract syntax tree (AST) with recursive descent, and
-    generate LLVM code corresponding to the source program.
+    Traverse an abstract syntax tree (AST) depth first, and build the
+    LLVM IR corresponding to the source program as a dl.ir Module.
+    Handlers yield the child nodes to generate, and receive the IR
+    value holding their value (see ASTVisitor).
+
+    build() returns the module, for passes to work on. generate() also
+    prints it, and returns the code as a single string or, when the
+    generator is given an output file, streams it to the file: each
+    function is written as soon as it is finished, and then dropped,
+    so only the function being generated is held in memory:
+
+        with open("program.ll", "w") as outfile:
+            DLGenerator(outfile).generate(program)
+
+    Array indices may be any expression. With check_bounds, each index
+    is checked to be in the array before the element is used, and an
+    index out of range traps, in a block shared by the function:
+
+        %tmp.3 = icmp ult i32 %tmp.2, 10
+        br i1 %tmp.3, label %bounds.ok.4, label %bounds.fail.1
+
     Attributes:
-        code -- collects lines of generated code
+        module -- the IR module being built
+        function -- the function being built
+        block -- the basic block instructions are added to
+        values -- map from the symbols of the locals and arguments of
+                  the function to the values they are kept in
+        printf, scanf -- the declarations of the library functions
+        format_string -- the global format string of printf and scanf
+        output -- the file object code is written to, or None
+        streaming -- whether finished functions are written to output
+                     and dropped from the module
+        check_bounds -- whether array indices are checked at run time
+        trap -- the declaration of llvm.trap, once a check needs it
+        bounds_fail -- the block the failed checks of the function
+                       branch to, once a check needs it
         reg_count -- current count of temporary registers
         label_count -- current count of unique labels
     """
-    def __init__(self):
-        self.code = []
+    def __init__(self, output=None, check_bounds=False):
+        self.module = Module()
+        self.function = None
+        self.block = None
+        self.values = {}
+        # The functions declared before main may print too
+        self.printf = Function("printf", param_types=["i8*"], varargs=True, attributes="nounwind")
+        self.scanf = Function("scanf", param_types=["i8*"], varargs=True)
+        self.format_string = self.module.add_global(GlobalString(".formatstr", "%d\\0A\\00", 4))
+        self.output = output
+        self.streaming = False
+        self.check_bounds = check_bounds
+        self.trap = None
+        self.bounds_fail = None
         self.reg_count = 0
         self.label_count = 0
 
-    def add_code(self, lines):
-        """Add some lines of generated code."""
-        if self.code:
-            self.code.append(lines)
-        else:
-            self.code = [lines]
+    def add_instruction(self, instruction):
+        """Add an instruction to the end of the current block.
+
+        Code after a terminator, like the statements after a return,
+        goes in a new block without a label.
+        """
+        block = self.block
+        instructions = block.instructions
+        if instructions and instructions[-1].is_terminator:
+            block = self.start_block(BasicBlock())
+            instructions = block.instructions
+        instruction.block = block
+        instructions.append(instruction)
+        return instruction
+
+    def start_block(self, block):
+        """Add a block to the function, and add code to it from now on."""
+        self.block = self.function.add_block(block)
+        return block
+
+    def local_value(self, symbol, allocated_type="i32"):
+        """Return the value a local or argument of the function is kept in.
+
+        Values are found by the symbol the semantic analysis bound the
+        node to, not by name. The variables of main are not allocated
+        in the other functions, so they are referred to there by name
+        only, with an allocation that is in no block.
+        """
+        value = self.values.get(symbol)
+        if value is None:
+            value = self.values[symbol] = Alloca(allocated_type, symbol.name)
+        return value
 
     def new_temporary(self):
-        """Create a new temporary register."""
+        """Create a new temporary register name."""
         self.reg_count += 1
-        name = "%tmp." + str(self.reg_count)
+        name = "tmp." + str(self.reg_count)
         return name
 
     def new_label(self, partial):
@@ -35,18 +126,60 @@ class DLGenerator(ASTVisitor):
         label = partial + "." + str(self.label_count)
         return label
 
+    def build(self, program):
+        """Begin generation on the top-level node, and return the module.
+
+        The garbage collector is paused meanwhile, since the IR is a
+        large graph of new objects with cycles, none of them garbage.
+        """
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self.visit(program)
+        finally:
+            if enabled:
+                gc.enable()
+        return self.module
+
     def generate(self, program):
-        """Begin generation on the top-level node."""
-        self.visit(program)
+        """Begin generation on the top-level node.
 
-        # Squash all the lines of code into a single string
-        ir = "\n".join(self.code)
-        return ir
+        Return the generated code as a string, or None if it was
+        written to the output file. The text is the same either way.
+        """
+        if self.output is None:
+            return str(self.build(program))
+        self.streaming = True
+        try:
+            self.build(program)
+            self.write_finished()
+        finally:
+            self.streaming = False
+        return None
+
+    def write_finished(self):
+        """Write the globals and functions of the module to the output,
+        in order, and drop them from the module.
+
+        The functions stay known by name, for the calls generated later.
+        """
+        module = self.module
+        write = self.output.write
+        for global_value in module.globals:
+            write(global_value.format() + "\n")
+        del module.globals[:]
+        for function in module.functions:
+            function.write(write)
+            function.release()
+        del module.functions[:]
 
 
     def visit_Integer(self, node):
         """Call the generator for Expr AST nodes."""
-        return str(node.value)
+        # A comparison folded by DLConstantFolder
+        if node.itype == 'bool':
+            return self.module.boolean(node.value)
+        return self.module.constant(node.value)
 
 
     def visit_Variable(self, node):
@@ -56,270 +189,210 @@ class DLGenerator(ASTVisitor):
         elif isinstance(node.symbol, ArgumentSymbol):
             return self.access_Argument(node)
         else:
-            raise GeneratorError("Attempt to access undeclared variable symbol: " + node.name)
+            raise GenerationError("Attempt to access undeclared variable symbol: " + node.name)
 
     def access_Variable(self, node):
         """Call the generator for Variable AST nodes, containing local variables."""
         temp_name = self.new_temporary()
-        local_name = "%" + node.name
-        template = """
-            %s = load i32, i32* %s
-                    """
-        output_code = template % (temp_name, local_name)
-        self.add_code(output_code)
-        return temp_name
+        return self.add_instruction(Load(self.local_value(node.symbol), temp_name))
 
 
     def access_Argument(self, node):
         """Call the generator for Variable AST nodes, containing function arguments."""
-        return "%" + node.name
+        return self.local_value(node.symbol)
 
 
     def visit_ArrayIndex(self, node):
         """Call the generator for Variable AST nodes."""
         symbol = node.symbol
-        array_size = 0
-        if symbol and isinstance(symbol, ArraySymbol):
-            array_size = symbol.size.value
-        else:
-            raise GeneratorError("Use of array with unknown size: " + node.var.name)
+        if not (symbol and isinstance(symbol, ArraySymbol)):
+            raise GenerationError("Use of array with unknown size: " + node.var.name)
 
         temp_pointer = self.new_temporary()
         temp_value = self.new_temporary()
-        template = """
-    %s = getelementptr [%s x i32], [%s x i32]* %s, i32 0, i32 %s
-    %s = load i32, i32* %s
+        index = yield node.index
+        pointer = self.element_pointer(node, temp_pointer, index)
+        return self.add_instruction(Load(pointer, temp_value))
+
+    def element_pointer(self, node, temp_name, index):
+        """Generate the address of the element of an ArrayIndex node,
+        given the value of its index."""
+        size = node.symbol.size.value
+        if self.check_bounds:
+            self.emit_bounds_check(index, size)
+        array_type = "[%s x i32]" % (size)
+        indices = [self.module.constant(0), index]
+        array = self.local_value(node.symbol, array_type)
+        return self.add_instruction(GetElementPtr(array, indices, temp_name))
+
+    def emit_bounds_check(self, index, size):
+        """Generate a check that index is in an array of size elements.
+
+        The comparison is unsigned, so negative indices fail too. Code
+        goes on in a new block, entered if the index is in range.
         """
-        local_name = "%" + node.var.name
-        array_index = node.index.value
-        output_code = template % (temp_pointer, array_size, array_size, local_name, array_index, temp_value, temp_pointer)
-        self.add_code(output_code)
-        return temp_value
+        in_bounds = self.add_instruction(ICmp("ult", index, self.module.constant(size), self.new_temporary()))
+        if self.bounds_fail is None:
+            self.bounds_fail = BasicBlock(self.new_label("bounds.fail"))
+        ok_block = BasicBlock(self.new_label("bounds.ok"))
+        self.add_instruction(Branch(in_bounds, ok_block, self.bounds_fail))
+        self.start_block(ok_block)
+
+    def emit_bounds_fail(self):
+        """Add the block the failed bounds checks of the function branch to."""
+        if self.trap is None:
+            self.trap = self.module.add_function(
+                Function("llvm.trap", attributes="noreturn nounwind", return_type="void"))
+        block = self.function.add_block(self.bounds_fail)
+        block.append(Call(self.trap, []))
+        block.append(Unreachable())
+        self.bounds_fail = None
 
 
     def visit_BinOp(self, node):
         """Call the generator for BinOp AST nodes."""
         temp_name = self.new_temporary()
-        opcode_name = ""
-        if node.op == 'PLUSOP':
-            opcode_name = "add"
-        elif node.op == 'MINUSOP':
-            opcode_name = "sub"
-        elif node.op == 'MULTIPLYOP':
-            opcode_name = "mul"
-        elif node.op == 'DIVIDEOP':
-            opcode_name = "udiv"
-
-        left_reg = self.visit(node.left)
-        right_reg = self.visit(node.right)
-
-        template = """
-            %s = %s i32 %s, %s
-        """
-        output_code = template % (temp_name, opcode_name, left_reg, right_reg)
-        self.add_code(output_code)
-        return temp_name
+        opcode_name = BINOP_OPCODES.get(node.op, "")
+
+        left = yield node.left
+        right = yield node.right
+        return self.emit_BinOp(temp_name, opcode_name, left, right)
+
+    def emit_BinOp(self, temp_name, opcode_name, left, right):
+        """Generate a binary operation."""
+        return self.add_instruction(BinaryOperator(opcode_name, left, right, temp_name))
 
     def visit_RelOp(self, node):
         """Call the generator for RelOp AST nodes."""
         temp_name = self.new_temporary()
-        opcode_name = ""
-        if node.op == 'EQOP':
-            opcode_name = "eq"
-        elif node.op == 'NEOP':
-            opcode_name = "ne"
-        elif node.op == 'LTOP':
-            opcode_name = "slt"
-        elif node.op == 'LEOP':
-            opcode_name = "sle"
-        elif node.op == 'GTOP':
-            opcode_name = "sgt"
-        elif node.op == 'GEOP':
-            opcode_name = "sge"
-
-        left_reg = self.visit(node.left)
-        right_reg = self.visit(node.right)
-
-        template = """
-    %s = icmp %s i32 %s, %s
-        """
-        output_code = template % (temp_name, opcode_name, left_reg, right_reg)
-        self.add_code(output_code)
-        return temp_name
+        opcode_name = RELOP_OPCODES.get(node.op, "")
+
+        left = yield node.left
+        right = yield node.right
+        return self.emit_RelOp(temp_name, opcode_name, left, right)
+
+    def emit_RelOp(self, temp_name, opcode_name, left, right):
+        """Generate a comparison."""
+        return self.add_instruction(ICmp(opcode_name, left, right, temp_name))
 
 
     def visit_FunctionCall(self, node):
         """Call the generator for FunctionCall AST nodes."""
         # %tmp.7 = call i32 @alpha(i32 %tmp.8, i32 %tmp.9)
         temp_name = self.new_temporary()
-        function_name = "@" + node.name
 
-        args_string = ""
+        args = []
         if node.args:
-            args_string = self.visit(node.args)
-
-        template = """
-        %s = call i32 %s(%s)
-        """
+            args = yield node.args
+        return self.emit_FunctionCall(temp_name, node.name, args)
 
-        output_code = template % (temp_name, function_name, args_string)
-        self.add_code(output_code)
-        return temp_name
+    def emit_FunctionCall(self, temp_name, function_name, args):
+        """Generate a function call."""
+        function = self.module.get_function(function_name)
+        return self.add_instruction(Call(function, args, temp_name))
 
     def visit_Arguments(self, node):
         """Call the generator for Arguments AST nodes."""
         argument_list = []
         for argument in node.arguments:
-            arg_name = self.visit(argument)
-            argument_list.append("i32 " + arg_name)
-        return ", ".join(argument_list)
+            value = yield argument
+            argument_list.append(value)
+        return argument_list
 
 
     def visit_Assign(self, node):
         """Call the generator for Assign AST nodes."""
-        right_reg = self.visit(node.right)
+        right = yield node.right
 
         if isinstance(node.left, Variable):
-            self.assign_Variable(node.left, right_reg)
+            self.assign_Variable(node.left, right)
         elif isinstance(node.left, ArrayIndex):
-            self.assign_ArrayIndex(node.left, right_reg)
+            index = yield node.left.index
+            self.assign_ArrayIndex(node.left, right, index)
         else:
-            raise GeneratorError("Assignment is only possible to variables and indexed array elements")
+            raise GenerationError("Assignment is only possible to variables and indexed array elements")
 
-    def assign_Variable(self, node, right_reg):
+    def assign_Variable(self, node, right):
         """Call the generator for assignment to Variable AST nodes."""
-        symbol = node.symbol
-        template = """
-            store i32 %s, i32* %s
-        """
-        local_name = "%" + node.name
-        output_code = template % (right_reg, local_name)
-        self.add_code(output_code)
+        self.add_instruction(Store(right, self.local_value(node.symbol)))
 
-    def assign_ArrayIndex(self, node, right_reg):
+    def assign_ArrayIndex(self, node, right, index):
         """Call the generator for assignment to ArrayIndex AST nodes."""
         symbol = node.symbol
-        array_size = 0
-        if symbol and isinstance(symbol, ArraySymbol):
-            array_size = symbol.size.value
-        else:
-            raise GeneratorError("Use of array with unknown size: " + node.var.name)
+        if not (symbol and isinstance(symbol, ArraySymbol)):
+            raise GenerationError("Use of array with unknown size: " + node.var.name)
 
         temp_pointer = self.new_temporary()
-        template = """
-    %s = getelementptr [%s x i32], [%s x i32]* %s, i32 0, i32 %s
-    store i32 %s, i32* %s
-        """
-        local_name = "%" + node.var.name
-        array_index = node.index.value
-        output_code = template % (temp_pointer, array_size, array_size, local_name, array_index, right_reg, temp_pointer)
-        self.add_code(output_code)
+        pointer = self.element_pointer(node, temp_pointer, index)
+        self.add_instruction(Store(right, pointer))
 
 
     def visit_Print(self, node):
         """Call the generator for Print AST nodes."""
-        print_val = self.visit(node.arg)
-        template = """
-    call i32 (i8*, ...) @printf(i8* getelementptr([4 x i8], [4 x i8]* @.formatstr, i32 0, i32 0), i32 %s)
-        """
-        output_code = template % (print_val)
-        self.add_code(output_code)
+        value = yield node.arg
+        self.add_instruction(Call(self.printf, [self.format_string.pointer, value]))
 
 
     def visit_Read(self, node):
         """Call the generator for Read AST nodes."""
-        result_reg = "%" + node.result.name
-        template = """
-    call i32 (i8*, ...) @scanf(i8* getelementptr([4 x i8], [4 x i8]* @.formatstr, i32 0, i32 0), i32* %s)
-        """
-        output_code = template % (result_reg)
-        self.add_code(output_code)
+        result = self.local_value(node.result.symbol)
+        self.add_instruction(Call(self.scanf, [self.format_string.pointer, result]))
 
 
     def visit_Return(self, node):
         """Call the generator for Return AST nodes."""
-        result_reg = self.visit(node.result)
-        template = """
-    ret i32 %s
-        """
-        output_code = template % (result_reg)
-        self.add_code(output_code)
+        value = yield node.result
+        self.add_instruction(Return(value))
 
 
     def visit_If(self, node):
         """Call the generator for If AST nodes."""
-        end_label = self.new_label("if.end")
-        true_label = self.new_label("if.true")
-        false_label = self.new_label("if.false")
-
-        # Output beginning label for the loop
-        cond_reg = self.visit(node.condition)
-        template = """
-        br i1 %s, label %s, label %s
-            %s:
-                """
-        output_code = template % (cond_reg, "%"+true_label, "%"+false_label, true_label)
-        self.add_code(output_code)
+        end_block = BasicBlock(self.new_label("if.end"))
+        true_block = BasicBlock(self.new_label("if.true"))
+        false_block = BasicBlock(self.new_label("if.false"))
 
-        # Evaluate the conditions
+        # Evaluate the condition
+        condition = yield node.condition
+        self.add_instruction(Branch(condition, true_block, false_block))
+        self.start_block(true_block)
 
-        self.visit(node.body_true)
+        yield node.body_true
         # true body generated by visiting node.body_true
-        template = """
-            br label %s
-                %s:
-        """
-        output_code = template % ("%"+end_label, false_label)
-        self.add_code(output_code)
+        self.add_instruction(Branch(end_block))
+        self.start_block(false_block)
 
         if node.body_else:
-            self.visit(node.body_else)
+            yield node.body_else
         # else body generated by visiting node.body_else
-        template = """
-        br label %s
-            %s:
-            """
-        output_code = template % ("%" + end_label, end_label)
-        self.add_code(output_code)
+        self.add_instruction(Branch(end_block))
+        self.start_block(end_block)
 
 
     def visit_While(self, node):
         """Call the generator for While AST nodes."""
-        loop_label = self.new_label("while.loop")
-        body_label = self.new_label("while.body")
-        end_label = self.new_label("while.end")
+        loop_block = BasicBlock(self.new_label("while.loop"))
+        body_block = BasicBlock(self.new_label("while.body"))
+        end_block = BasicBlock(self.new_label("while.end"))
 
         # Output beginning label for the loop
-        template = """
-    br label %s
-  %s:
-        """
-        output_code = template % ("%"+loop_label, loop_label)
-        self.add_code(output_code)
+        self.add_instruction(Branch(loop_block))
+        self.start_block(loop_block)
 
         # Evaluate the condition, before each iteration
-        cond_reg = self.visit(node.condition)
-        template = """
-    br i1 %s, label %s, label %s
-  %s:
-        """
-        output_code = template % (cond_reg, "%"+body_label, "%"+end_label, body_label)
-        self.add_code(output_code)
+        condition = yield node.condition
+        self.add_instruction(Branch(condition, body_block, end_block))
+        self.start_block(body_block)
 
         # Evaluate the loop body, after checking condition
-        self.visit(node.body)
-        template = """
-    br label %s
-  %s:
-        """
-        output_code = template % ("%"+loop_label, end_label)
-        self.add_code(output_code)
+        yield node.body
+        self.add_instruction(Branch(loop_block))
+        self.start_block(end_block)
 
 
     def visit_Block(self, node):
         """Call the generator for Block AST nodes."""
         for statement in node.statements:
-            self.visit(statement)
+            yield statement
 
 
     def visit_Declarations(self, node):
@@ -329,7 +402,7 @@ class DLGenerator(ASTVisitor):
             if isinstance(declaration, VariableDeclarations):
                 variables.append(declaration)
             elif isinstance(declaration, FunctionDeclaration):
-                self.visit(declaration)
+                yield declaration
         return variables
 
 
@@ -340,80 +413,75 @@ class DLGenerator(ASTVisitor):
             elif isinstance(declaration, ArrayIndex):
                 self.declare_ArrayIndex(declaration)
             else:
-                raise GeneratorError("Declaration is only possible for variables and arrays")
+                raise GenerationError("Declaration is only possible for variables and arrays")
 
     def declare_Variable(self, node):
         """Call the generator to declare variables."""
-        template = """
-    %s = alloca i32
-    store i32 0, i32* %s
-        """
-        local_name = "%" + node.name
-        output_code = template % (local_name, local_name)
-        self.add_code(output_code)
+        variable = self.add_instruction(Alloca("i32", node.name))
+        self.add_instruction(Store(self.module.constant(0), variable))
+        self.values[node.symbol] = variable
 
     def declare_ArrayIndex(self, node):
         """Call the generator to declare arrays."""
-        template = """
-    %s = alloca [%s x i32]
-        """
-        local_name = "%" + node.var.name
-        output_code = template % (local_name, node.index.value)
-        self.add_code(output_code)
+        array_type = "[%s x i32]" % (node.index.value)
+        self.values[node.symbol] = self.add_instruction(Alloca(array_type, node.var.name))
 
 
     def visit_FunctionDeclaration(self, node):
         """Call the generator for FunctionDeclaration AST nodes."""
-        func_name = "@" + node.name
-        args_string = ""
-
+        arguments = []
         if node.args:
-            args_string = self.visit(node.args)
-
-        template = """
-define i32 %s(%s) {
-  entry:
-        """
-        header = template % (func_name, args_string)
-        self.add_code(header)
+            arguments = node.args.arguments
+        self.emit_function_header(node.name, arguments)
 
         if node.vars:
-            self.visit(node.vars)
+            yield node.vars
 
-        self.visit(node.body)
+        yield node.body
+        self.emit_function_footer()
 
-        footer = """
-}
-        """
-        self.add_code(footer)
+    def emit_function_header(self, func_name, arguments):
+        """Start a function definition, with the argument nodes given."""
+        arg_names = [argument.name for argument in arguments]
+        self.function = self.module.add_function(Function(func_name, arg_names))
+        self.values = {argument.symbol: arg for argument, arg in zip(arguments, self.function.args)}
+        self.start_block(BasicBlock("entry"))
+
+    def emit_function_footer(self):
+        """Finish a function definition."""
+        if self.bounds_fail is not None:
+            self.emit_bounds_fail()
+        self.function = None
+        self.block = None
+        self.values = {}
+        if self.streaming:
+            self.write_finished()
 
 
     def visit_Program(self, node):
         """Call the generator for Program AST nodes."""
         var_decs = None
         if node.declarations:
-            var_decs = self.visit(node.declarations)
-
-        header = """
-declare i32 @printf(i8*, ...) nounwind
-declare i32 @scanf(i8*, ...)
-@.formatstr = internal constant [4 x i8] c"%d\\0A\\00"
-define i32 @main() {
-  entry:
-        """
-        self.add_code(header)
+            var_decs = yield node.declarations
+        self.emit_main_header()
 
         if var_decs:
             for variable in var_decs:
-                self.visit(variable)
+                yield variable
 
-        self.visit(node.body)
+        yield node.body
+        self.emit_main_footer()
 
-        footer = """
-    ret i32 0
-}
-        """
-        self.add_code(footer)
+    def emit_main_header(self):
+        """Add the external declarations, and start main."""
+        self.module.add_function(self.printf)
+        self.module.add_function(self.scanf)
+        self.emit_function_header("main", [])
+
+    def emit_main_footer(self):
+        """Finish main, returning 0."""
+        self.add_instruction(Return(self.module.constant(0)))
+        self.emit_function_footer()
 
 class GenerationError(Exception):
     """Exception raised for errors detected in code generation.
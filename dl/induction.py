@@ -0,0 +1,340 @@
+import gc
+
+from dl.ir import Instruction, Constant, Argument, BinaryOperator, ICmp, Phi, Branch, Return, Unreachable
+from dl.cfg import reverse_postorder, immediate_dominators, natural_loops
+from dl.bounds import INT_MIN, INT_MAX, NEGATED_PREDICATES, SWAPPED_PREDICATES
+from dl.folding import wrap
+
+# The operations a value linear in an induction variable stays linear
+# through, if their other operand does not change in the loop
+LINEAR_OPCODES = {'add', 'sub', 'mul'}
+
+def holds(predicate, left, right):
+    """Return the truth of the signed comparison left predicate right."""
+    if predicate == 'slt':
+        return left < right
+    elif predicate == 'sle':
+        return left <= right
+    elif predicate == 'sgt':
+        return left > right
+    elif predicate == 'sge':
+        return left >= right
+    elif predicate == 'eq':
+        return left == right
+    return left != right
+
+def trip_count(predicate, start, step, bound):
+    """Return the number of times x predicate bound holds, for x from
+    start, adding step each time, before it first does not, or None if
+    it holds until x wraps around.
+    """
+    if predicate not in ('slt', 'sle', 'sgt', 'sge', 'eq', 'ne'):
+        return None
+    if not holds(predicate, start, bound):
+        return 0
+    if predicate in ('slt', 'sle'):
+        if step <= 0:
+            return None
+        last = bound if predicate == 'sle' else bound - 1
+        count = (last - start) // step + 1
+    elif predicate in ('sgt', 'sge'):
+        if step >= 0:
+            return None
+        last = bound if predicate == 'sge' else bound + 1
+        count = (start - last) // -step + 1
+    elif predicate == 'eq':
+        if step == 0:
+            return None
+        count = 1
+    else:
+        if step == 0 or (bound - start) % step:
+            return None
+        count = (bound - start) // step
+        if count <= 0:
+            # The step points away from the bound, which x only reaches
+            # after wrapping around
+            return None
+    # The value that ends the loop must be reached without wrapping
+    if not INT_MIN <= start + count * step <= INT_MAX:
+        return None
+    return count
+
+class InductionVariables:
+    """The induction variables of a loop in SSA form, as Mem2Reg leaves
+    While loops.
+
+    A basic induction variable is a phi of the loop header that starts
+    with a value from before the loop and is updated by adding or
+    subtracting a value that does not change in the loop, like i in
+    while (i < n) { ...; i = i + 1 }. A derived induction variable is
+    a value computed from a single basic one by adding, subtracting
+    and multiplying by such values, like i * k + 1, so that it too
+    changes by the same amount on every iteration.
+
+    The loop must have a single block it is entered from, the
+    preheader, and a single latch.
+
+    Attributes:
+        loop -- the dl.cfg.Loop analysed
+        preheader -- the block the loop is entered from
+        latch -- the block that branches back to the header
+        basic -- map from each basic induction variable to its start
+                 value and the instruction that updates it
+        derived -- map from the values found to be linear in a basic
+                   induction variable to it, or to None if they are not
+        trip_count -- the number of times the body of the loop runs, if
+                      it is a constant and the loop is only left from
+                      the test in its header, or None
+    """
+    def __init__(self, loop):
+        self.loop = loop
+        predecessors = loop.outside_predecessors()
+        self.preheader = predecessors[0] if len(predecessors) == 1 else None
+        self.latch = loop.latches[0] if len(loop.latches) == 1 else None
+        self.basic = {}
+        self.derived = {}
+        self.trip_count = None
+        if self.preheader is not None and self.latch is not None:
+            self.find_basic()
+            self.trip_count = self.find_trip_count()
+
+    def is_invariant(self, value):
+        """Check if value is the same on every iteration of the loop."""
+        if value.__class__ is Constant or value.__class__ is Argument:
+            return True
+        return isinstance(value, Instruction) and value.block not in self.loop.blocks
+
+    def find_basic(self):
+        """Find the basic induction variables of the header."""
+        for instruction in self.loop.header.instructions:
+            if instruction.__class__ is not Phi:
+                break
+            if len(instruction.blocks) != 2:
+                continue
+            start = instruction.operands[instruction.blocks.index(self.preheader)]
+            update = instruction.operands[instruction.blocks.index(self.latch)]
+            if update.__class__ is not BinaryOperator or not self.is_invariant(start):
+                continue
+            left, right = update.operands
+            if ((update.opcode == "add" and left is instruction and self.is_invariant(right))
+                    or (update.opcode == "add" and right is instruction and self.is_invariant(left))
+                    or (update.opcode == "sub" and left is instruction and self.is_invariant(right))):
+                self.basic[instruction] = (start, update)
+
+    def add_basic(self, phi, start, update):
+        """Add a basic induction variable made for the loop."""
+        self.basic[phi] = (start, update)
+        self.derived[phi] = phi
+
+    def linear(self, value):
+        """Return the basic induction variable value is linear in, or None."""
+        if value in self.basic:
+            return value
+        if value in self.derived:
+            return self.derived[value]
+        variable = None
+        if (value.__class__ is BinaryOperator and value.opcode in LINEAR_OPCODES
+                and value.block in self.loop.blocks):
+            left, right = value.operands
+            if self.is_invariant(right):
+                variable = self.linear(left)
+            elif self.is_invariant(left):
+                # k - i is linear in i too
+                variable = self.linear(right)
+            elif value.opcode != "mul":
+                # i + i is, but not i * i
+                variable = self.linear(left)
+                if variable is not self.linear(right):
+                    variable = None
+        self.derived[value] = variable
+        return variable
+
+    def find_trip_count(self):
+        """Return the number of iterations, if the test of the header
+        compares a basic induction variable with a constant, and the
+        variable starts and steps by constants."""
+        header = self.loop.header
+        for block in self.loop.blocks:
+            if block is header:
+                continue
+            for instruction in block.instructions:
+                if instruction.__class__ is Return or instruction.__class__ is Unreachable:
+                    return None
+            for successor in block.successors:
+                if successor not in self.loop.blocks:
+                    return None
+        branch = header.terminator
+        if branch.__class__ is not Branch or len(branch.operands) != 3:
+            return None
+        condition, true_block, false_block = branch.operands
+        if condition.__class__ is not ICmp:
+            return None
+        predicate = condition.predicate
+        if true_block not in self.loop.blocks:
+            predicate = NEGATED_PREDICATES[predicate]
+        variable, bound = condition.operands
+        if variable not in self.basic:
+            variable, bound = bound, variable
+            predicate = SWAPPED_PREDICATES[predicate]
+        if variable not in self.basic or bound.__class__ is not Constant:
+            return None
+        start, update = self.basic[variable]
+        step = update.operands[1] if update.operands[0] is variable else update.operands[0]
+        if start.__class__ is not Constant or step.__class__ is not Constant:
+            return None
+        step = -step.value if update.opcode == "sub" else step.value
+        return trip_count(predicate, start.value, step, bound.value)
+
+def induction_variables(function):
+    """Return the InductionVariables of the loops of a function,
+    innermost first."""
+    return [InductionVariables(loop) for loop in natural_loops(immediate_dominators(function))]
+
+class StrengthReduction:
+    """Replace the multiplications of loops by additions.
+
+    In a While loop counting i up, i * k is worth k more on every
+    iteration. This pass finds the induction variables of each loop
+    (see InductionVariables), and replaces each multiplication of a
+    value linear in one of them by a value that does not change in the
+    loop with a new induction variable, a phi of the header that starts
+    with the product before the loop and has the difference added at
+    the end of every iteration. The additions and multiplications the
+    product is only used in are replaced with it, so the index of
+    h[i * n + j] in a loop over i costs an addition instead of two:
+
+        module = DLGenerator().build(checked)
+        Mem2Reg().run(module)
+        StrengthReduction().run(module)
+
+    The start value and the step are computed in the preheader, and
+    folded when their operands are constants. The values the products
+    were computed from may be left unused, for DeadCodeElimination.
+    The trip counts of the loops that have constant ones are kept for
+    the report.
+
+    Attributes:
+        reduced -- the number of multiplications replaced
+        phis -- the number of phi instructions added
+        trip_counts -- list of the function name, the name of the loop
+                       header and the trip count of each loop that has
+                       a constant one
+    """
+    def __init__(self):
+        self.reduced = 0
+        self.phis = 0
+        self.trip_counts = []
+
+    def run(self, module):
+        """Reduce the multiplications of every function of module, and
+        return it.
+
+        The garbage collector is paused meanwhile, as in DLGenerator.build.
+        """
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for function in module.functions:
+                if function.blocks:
+                    self.run_on_function(function)
+        finally:
+            if enabled:
+                gc.enable()
+        return module
+
+    def run_on_function(self, function):
+        """Reduce the multiplications of the loops of a function."""
+        order = reverse_postorder(function)
+        for variables in induction_variables(function):
+            if variables.trip_count is not None:
+                self.trip_counts.append((function.name, variables.loop.header.name, variables.trip_count))
+            if not variables.basic:
+                continue
+            for block in order:
+                if block not in variables.loop.blocks:
+                    continue
+                for instruction in list(block.instructions):
+                    if (instruction.__class__ is BinaryOperator and instruction.opcode == "mul"
+                            and instruction.block is block):
+                        self.reduce(instruction, variables)
+
+    def reduce(self, multiply, variables):
+        """Replace a multiplication by a new induction variable, if it
+        multiplies an induction variable by an invariant value."""
+        left, right = multiply.operands
+        if variables.is_invariant(left) == variables.is_invariant(right):
+            return
+        variable = variables.linear(multiply)
+        if variable is None:
+            return
+        # The expression the product is only used in, if linear too
+        replaced = [multiply]
+        while len(replaced[-1].uses) == 1:
+            user = replaced[-1].uses[0]
+            if (user.__class__ is not BinaryOperator or user.block not in variables.loop.blocks
+                    or variables.linear(user) is not variable):
+                break
+            replaced.append(user)
+        expression = replaced[-1]
+        start, update = variables.basic[variable]
+        preheader = variables.preheader
+        name = multiply.name
+        terminator = preheader.instructions.pop()
+        # The product on the first iteration, and on the second, with the
+        # variable as updated after the first; the step is the difference
+        first = self.evaluate(expression, variable, start, variables, name + ".start", {})
+        second_start = self.evaluate(update, variable, start, variables, name + ".next", {})
+        second = self.evaluate(expression, variable, second_start, variables, name + ".second", {})
+        step = self.fold("sub", second, first, name + ".step", preheader)
+        preheader.append(terminator)
+
+        phi = variables.loop.header.insert(0, Phi("i32", name + ".iv"))
+        latch = variables.latch
+        next_value = latch.insert(len(latch.instructions) - 1,
+                                  BinaryOperator("add", phi, step, name + ".iv.next"))
+        phi.add_incoming(first, preheader)
+        phi.add_incoming(next_value, latch)
+        expression.replace_all_uses_with(phi)
+        for instruction in reversed(replaced):
+            instruction.erase()
+        variables.add_basic(phi, first, next_value)
+        self.reduced += len([instruction for instruction in replaced if instruction.opcode == "mul"])
+        self.phis += 1
+
+    def evaluate(self, value, variable, start, variables, prefix, values):
+        """Compute the value of a value linear in variable for the given
+        start value of the variable, at the end of the preheader, and
+        return it. values maps the values of the loop computed so far."""
+        if value is variable:
+            return start
+        if variables.is_invariant(value):
+            return value
+        computed = values.get(value)
+        if computed is None:
+            left = self.evaluate(value.operands[0], variable, start, variables, prefix, values)
+            right = self.evaluate(value.operands[1], variable, start, variables, prefix, values)
+            computed = values[value] = self.fold(value.opcode, left, right,
+                                                 "%s.%d" % (prefix, len(values)), variables.preheader)
+        return computed
+
+    def fold(self, opcode, left, right, name, block):
+        """Return the value of an add, sub or mul of two values, as a
+        constant if it is one, or else appended to block."""
+        if left.__class__ is Constant and right.__class__ is Constant:
+            if opcode == "add":
+                value = left.value + right.value
+            elif opcode == "sub":
+                value = left.value - right.value
+            else:
+                value = left.value * right.value
+            return block.function.module.constant(wrap(value))
+        if right.__class__ is Constant:
+            if (opcode != "mul" and right.value == 0) or (opcode == "mul" and right.value == 1):
+                return left
+            if opcode == "mul" and right.value == 0:
+                return right
+        elif left.__class__ is Constant and opcode != "sub":
+            return self.fold(opcode, right, left, name, block)
+        elif opcode == "sub" and left is right:
+            return block.function.module.constant(0)
+        return block.append(BinaryOperator(opcode, left, right, name))
@@ -0,0 +1,325 @@
+import gc
+
+from dl.ir import Constant, Function, BasicBlock, Alloca, Call, Phi, Branch, Return
+from dl.cfg import reverse_postorder, immediate_dominators, natural_loops
+
+# The largest cost of a call that is inlined, by default
+DEFAULT_THRESHOLD = 20
+
+# What is saved by inlining a call: the call, and passing each argument
+CALL_COST = 1
+ARGUMENT_COST = 1
+
+# What may be saved for each constant argument, as the code using it
+# folds once it is inlined
+CONSTANT_ARGUMENT_BONUS = 2
+
+# What is saved by inlining a call in a loop, which runs many times
+LOOP_BONUS = 10
+
+def call_graph(module):
+    """Return a map from each function defined in module to the
+    functions defined in it that it calls, in the order of the calls."""
+    graph = {}
+    for function in module.functions:
+        if function.blocks:
+            callees = {}
+            for instruction in function.instructions():
+                if instruction.__class__ is Call and instruction.operands[0].blocks:
+                    callees[instruction.operands[0]] = None
+            graph[function] = list(callees)
+    return graph
+
+def strongly_connected(graph):
+    """Return the strongly connected components of a graph given as a map
+    from each node to its successors, each as a list, callees first.
+
+    This is Tarjan's algorithm, with an explicit stack, so long chains
+    of calls do not hit the recursion limit.
+    """
+    index = {}
+    lowlink = {}
+    stack = []
+    on_stack = set()
+    components = []
+    for root in graph:
+        if root in index:
+            continue
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph[root]))]
+        while work:
+            node, successors = work[-1]
+            for successor in successors:
+                if successor not in index:
+                    index[successor] = lowlink[successor] = len(index)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(graph[successor])))
+                    break
+                elif successor in on_stack:
+                    lowlink[node] = min(lowlink[node], index[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.remove(member)
+                        component.append(member)
+                        if member is node:
+                            break
+                    components.append(component)
+    return components
+
+class Inliner:
+    """Replace the calls of small functions by the code of the functions.
+
+    DLGenerator calls every DL function with a call instruction, so a
+    helper like square(x); { return x * x } costs a call and a return
+    for a multiplication, and the passes after cannot see through it.
+    This pass copies the blocks of the function called into the caller,
+    with the arguments replaced by the values passed and the names
+    prefixed by the function name and a count, so they do not clash.
+    Each return branches to the code after the call, and where there
+    are several, a phi of the values returned is the value of the call:
+
+        module = DLGenerator().build(checked)
+        Inliner().run(module)
+        Mem2Reg().run(module)
+
+    The pass runs before Mem2Reg: the locals of the function inlined
+    are allocated in the entry block of the caller, for Mem2Reg to
+    promote, and the variables of main a function uses are those of
+    main, so functions using them are only inlined into main. The
+    functions are done callees first, so what they inline is inlined
+    with them, and the calls copied with them are tried again in the
+    caller. The functions in a cycle of calls, directly or through
+    others, are never inlined.
+
+    A call is inlined if the cost of the function, its instructions
+    other than allocas, less what inlining saves, is at most the
+    threshold. Inlining saves the call and passing its arguments, more
+    for constant arguments and calls in loops, and the whole function
+    for the last call of it, which DeadCodeElimination can then remove.
+
+    Attributes:
+        threshold -- the largest cost of a call that is inlined
+        inlined -- count of the calls inlined, by the name of the function
+        refused -- count of the calls not inlined, by the reason: too
+                   costly, recursive, or using the variables of main
+    """
+    def __init__(self, threshold=DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.inlined = {}
+        self.refused = {}
+
+    def run(self, module):
+        """Inline the calls of every function of module, and return it.
+
+        The garbage collector is paused meanwhile, as in DLGenerator.build.
+        """
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            graph = call_graph(module)
+            components = strongly_connected(graph)
+            recursive = set()
+            for component in components:
+                if len(component) > 1 or component[0] in graph[component[0]]:
+                    recursive.update(component)
+            for component in components:
+                for function in component:
+                    self.run_on_function(function, recursive)
+        finally:
+            if enabled:
+                gc.enable()
+        return module
+
+    def inlined_count(self):
+        """Return the total number of calls inlined."""
+        return sum(self.inlined.values())
+
+    def refuse(self, reason):
+        """Count a call not inlined for a reason."""
+        self.refused[reason] = self.refused.get(reason, 0) + 1
+
+    def run_on_function(self, function, recursive):
+        """Inline the calls of a function that the cost model allows."""
+        calls = [instruction for instruction in function.instructions()
+                 if instruction.__class__ is Call and instruction.operands[0].blocks]
+        if not calls:
+            return
+        in_loops = set()
+        for loop in natural_loops(immediate_dominators(function)):
+            in_loops.update(loop.blocks)
+        # Inlining splits blocks, so where the calls are is found first
+        in_loop = {call: call.block in in_loops for call in calls}
+        # The calls the callees could not inline, as they use variables
+        # of main, are copied with them, and tried again
+        calls.reverse()
+        while calls:
+            call = calls.pop()
+            callee = call.operands[0]
+            if callee in recursive:
+                self.refuse("recursive")
+            elif self.main_variables(callee, function) is None:
+                self.refuse("variables of main")
+            elif self.cost(call, in_loop[call]) > self.threshold:
+                self.refuse("too costly")
+            else:
+                for copy in self.inline(call):
+                    in_loop[copy] = in_loop[call]
+                    calls.append(copy)
+
+    def cost(self, call, in_loop):
+        """Return the cost of inlining a call: the instructions of the
+        function called, less what inlining the call saves."""
+        callee = call.operands[0]
+        size = 0
+        for instruction in callee.instructions():
+            if instruction.__class__ is not Alloca:
+                size += 1
+        saved = CALL_COST + ARGUMENT_COST * (len(call.operands) - 1)
+        for argument in call.operands[1:]:
+            if argument.__class__ is Constant:
+                saved += CONSTANT_ARGUMENT_BONUS
+        if in_loop:
+            saved += LOOP_BONUS
+        if len(callee.uses) == 1:
+            saved += size
+        return size - saved
+
+    def main_variables(self, callee, caller):
+        """Return a map from the allocations of the variables of main the
+        callee uses, which are in no block, to the variables of the
+        caller, or None if the caller is not main."""
+        variables = {}
+        for instruction in callee.instructions():
+            for operand in instruction.operands:
+                if operand.__class__ is Alloca and operand.block is None:
+                    variables[operand] = None
+        if not variables:
+            return variables
+        if caller.name != "main":
+            return None
+        allocas = {}
+        for instruction in caller.entry.instructions:
+            if instruction.__class__ is Alloca:
+                allocas[instruction.name] = instruction
+        for variable in variables:
+            alloca = allocas.get(variable.name)
+            if alloca is None or alloca.allocated_type != variable.allocated_type:
+                return None
+            variables[variable] = alloca
+        return variables
+
+    def inline(self, call):
+        """Replace a call by a copy of the blocks of the function called,
+        and return the copies of the calls of functions defined in the
+        module it has."""
+        callee = call.operands[0]
+        block = call.block
+        caller = block.function
+        count = self.inlined_count() + 1
+        prefix = "%s.%d." % (callee.name, count)
+
+        calls = []
+        # The values of the callee, mapped to those of the copy
+        values = dict(zip(callee.args, call.operands[1:]))
+        values.update(self.main_variables(callee, caller))
+        # The blocks no return is reached from are not copied
+        reachable = set(reverse_postorder(callee))
+        blocks = [original for original in callee.blocks if original in reachable]
+        copies = []
+        for original in blocks:
+            values[original] = BasicBlock(None if original.name is None else prefix + original.name)
+        for original in blocks:
+            copy_block = values[original]
+            copy_block.function = caller
+            copies.append(copy_block)
+            for instruction in original.instructions:
+                copy = instruction.clone()
+                if copy.ref is not None:
+                    copy.name = prefix + copy.name
+                values[instruction] = copy
+                copy_block.append(copy)
+                if copy.__class__ is Call and copy.operands[0].blocks:
+                    calls.append(copy)
+                if instruction.is_terminator:
+                    break
+
+        # The code after the call goes in a block of its own, which the
+        # returns branch to
+        index = block.instructions.index(call)
+        after = BasicBlock(prefix + "return")
+        after.function = caller
+        for instruction in block.instructions[index + 1:]:
+            after.append(instruction)
+        del block.instructions[index:]
+        for successor in after.successors:
+            for instruction in successor.instructions:
+                if instruction.__class__ is Phi:
+                    instruction.blocks = [after if incoming is block else incoming
+                                          for incoming in instruction.blocks]
+        block.append(Branch(values[callee.entry]))
+
+        returned = []
+        entry = caller.entry
+        allocas = 0
+        while entry.instructions[allocas].__class__ is Alloca:
+            allocas += 1
+        for copy_block in copies:
+            kept = []
+            for instruction in copy_block.instructions:
+                for operand_index, operand in enumerate(instruction.operands):
+                    value = values.get(operand)
+                    if value is not None:
+                        instruction.set_operand(operand_index, value)
+                if instruction.__class__ is Phi:
+                    self.map_incoming(instruction, values)
+                elif instruction.__class__ is Return:
+                    returned.append((instruction.operands[0], copy_block))
+                    instruction.drop_operands()
+                    instruction = Branch(after)
+                    instruction.block = copy_block
+                elif instruction.__class__ is Alloca:
+                    # Allocated once in the entry of the caller, not on
+                    # every call, as in a loop
+                    entry.insert(allocas, instruction)
+                    allocas += 1
+                    continue
+                kept.append(instruction)
+            copy_block.instructions = kept
+
+        if len(returned) == 1:
+            result = returned[0][0]
+        elif returned:
+            result = after.insert(0, Phi(call.type, prefix + "result"))
+            for value, incoming in returned:
+                result.add_incoming(value, incoming)
+        else:
+            result = Constant("undef", call.type)
+        call.replace_all_uses_with(result)
+        call.drop_operands()
+        call.block = None
+
+        position = caller.blocks.index(block) + 1
+        caller.blocks[position:position] = copies + [after]
+        self.inlined[callee.name] = self.inlined.get(callee.name, 0) + 1
+        return calls
+
+    def map_incoming(self, phi, values):
+        """Make a copied phi take its values from the copied blocks, and
+        drop those from blocks that were not copied, as unreachable."""
+        for index in reversed(range(len(phi.blocks))):
+            incoming = values.get(phi.blocks[index])
+            if incoming is None:
+                phi.operands.pop(index).uses.remove(phi)
+                del phi.blocks[index]
+            else:
+                phi.blocks[index] = incoming
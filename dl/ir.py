@@ -0,0 +1,651 @@
+import copy
+
+class Value:
+    """Base class for everything an instruction can use as an operand.
+
+    Values keep the instructions that use them, one entry for each
+    operand that refers to the value, so the uses of a value can be
+    found and replaced without searching the code (use-def chains).
+
+    Attributes:
+        type -- the LLVM type of the value, as a string like 'i32'
+        uses -- the instructions that have the value as an operand
+        ref -- the value as an operand, like '%tmp.1', '@main' or '5'
+    """
+    __slots__ = ('type', 'uses', 'ref')
+
+    def __init__(self, value_type, ref=None):
+        self.type = value_type
+        self.uses = []
+        self.ref = ref
+
+    def replace_all_uses_with(self, value):
+        """Make every instruction that uses this value use value instead."""
+        for user in self.uses:
+            operands = user.operands
+            for index, operand in enumerate(operands):
+                if operand is self:
+                    operands[index] = value
+                    value.uses.append(user)
+        self.uses = []
+
+    def typed(self):
+        """Return the value as an operand, with its type."""
+        return self.type + " " + self.ref
+
+class NoUses:
+    """The uses of constants, which are not recorded."""
+    __slots__ = ()
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+    def append(self, user):
+        pass
+
+    def remove(self, user):
+        pass
+
+NO_USES = NoUses()
+
+class Constant(Value):
+    """A constant operand, printed as its value.
+
+    Integer constants are made with Module.constant, which returns the
+    same object for the same value. Constants are shared by all the
+    code, so their uses are not recorded.
+
+    Attributes:
+        value -- the integer value, or the text of a constant expression
+    """
+    __slots__ = ('value',)
+    uses = NO_USES
+
+    def __init__(self, value, value_type="i32", ref=None):
+        self.type = value_type
+        self.ref = str(value) if ref is None else ref
+        self.value = value
+
+    def __repr__(self):
+        return "Constant(%s)" % (self.value)
+
+class NamedValue(Value):
+    """Base class for the values that are referred to by name.
+
+    The name is kept as the reference of the value, with its prefix,
+    '%' for locals and '@' for globals.
+    """
+    __slots__ = ()
+    prefix = "%"
+
+    @property
+    def name(self):
+        """The name of the value, or None if it has none."""
+        if self.ref is None:
+            return None
+        return self.ref[1:]
+
+    @name.setter
+    def name(self, name):
+        self.ref = None if name is None else self.prefix + name
+
+class Argument(NamedValue):
+    """A function argument.
+
+    Attributes:
+        name -- the name of the argument
+        function -- the function the argument belongs to
+    """
+    __slots__ = ('function',)
+
+    def __init__(self, name, function, value_type="i32"):
+        super().__init__(value_type, "%" + name)
+        self.function = function
+
+class GlobalString(NamedValue):
+    """A global constant string, like the format string of printf.
+
+    Attributes:
+        name -- the name of the global
+        text -- the string, in LLVM syntax without the quotes
+        size -- the number of bytes in the string
+        pointer -- a constant i8* pointer to the first byte
+    """
+    __slots__ = ('text', 'size', 'pointer')
+    prefix = "@"
+
+    def __init__(self, name, text, size):
+        super().__init__("[%s x i8]*" % (size), "@" + name)
+        self.text = text
+        self.size = size
+        self.pointer = Constant("getelementptr([%s x i8], %s %s, i32 0, i32 0)"
+                                % (size, self.type, self.ref), "i8*")
+
+    def format(self):
+        """Return the definition of the global."""
+        return '%s = internal constant [%s x i8] c"%s"' % (self.ref, self.size, self.text)
+
+class Module:
+    """A compilation unit of LLVM IR: global strings and functions.
+
+    The module is printed with the globals first, then the functions
+    in the order they were added.
+
+    Attributes:
+        globals -- the global strings, in order
+        functions -- the functions, in order, declarations included
+        function_names -- map from function name to function
+        constants -- the integer constants made by constant(), by value
+        booleans -- the i1 constants false and true
+    """
+    __slots__ = ('globals', 'functions', 'function_names', 'constants', 'booleans')
+
+    def __init__(self):
+        self.globals = []
+        self.functions = []
+        self.function_names = {}
+        self.constants = {}
+        self.booleans = (Constant(0, "i1", "false"), Constant(1, "i1", "true"))
+
+    def constant(self, value):
+        """Return the i32 constant for value."""
+        constant = self.constants.get(value)
+        if constant is None:
+            constant = self.constants[value] = Constant(value)
+        return constant
+
+    def boolean(self, value):
+        """Return the i1 constant for the truth of value."""
+        return self.booleans[1 if value else 0]
+
+    def add_global(self, global_value):
+        """Add a global to the module, and return it."""
+        self.globals.append(global_value)
+        return global_value
+
+    def add_function(self, function):
+        """Add a function to the module, and return it."""
+        function.module = self
+        self.functions.append(function)
+        self.function_names[function.name] = function
+        return function
+
+    def remove_function(self, function):
+        """Remove a function from the module."""
+        self.functions.remove(function)
+        del self.function_names[function.name]
+        function.module = None
+
+    def get_function(self, name):
+        """Return the function called name, or None if there is none."""
+        return self.function_names.get(name)
+
+    def write(self, write):
+        """Print the module, passing the text to write piece by piece."""
+        for global_value in self.globals:
+            write(global_value.format() + "\n")
+        for function in self.functions:
+            function.write(write)
+
+    def __str__(self):
+        text = []
+        self.write(text.append)
+        return "".join(text)
+
+class Function(NamedValue):
+    """A function, defined with basic blocks or declared without any.
+
+    The type of the function value is its return type.
+
+    Attributes:
+        name -- the name of the function
+        args -- the Argument values of a definition
+        param_types -- the types of the parameters
+        varargs -- whether the function takes more arguments, like printf
+        attributes -- text printed after the signature of a declaration
+        blocks -- the basic blocks, the entry block first
+        module -- the module the function is in
+    """
+    __slots__ = ('args', 'param_types', 'varargs', 'attributes', 'blocks', 'module')
+    prefix = "@"
+
+    def __init__(self, name, arg_names=(), param_types=None, varargs=False, attributes="",
+                 return_type="i32"):
+        super().__init__(return_type, "@" + name)
+        self.args = [Argument(arg_name, self) for arg_name in arg_names]
+        if param_types is None:
+            param_types = [arg.type for arg in self.args]
+        self.param_types = param_types
+        self.varargs = varargs
+        self.attributes = attributes
+        self.blocks = []
+        self.module = None
+
+    @property
+    def is_declaration(self):
+        return not self.blocks
+
+    @property
+    def entry(self):
+        return self.blocks[0]
+
+    def signature(self):
+        """Return the function type, as called through a varargs call."""
+        params = list(self.param_types)
+        if self.varargs:
+            params.append("...")
+        return "%s (%s)" % (self.type, ", ".join(params))
+
+    def add_block(self, block):
+        """Add a basic block to the end of the function, and return it."""
+        block.function = self
+        self.blocks.append(block)
+        return block
+
+    def instructions(self):
+        """Iterate over the instructions of all the blocks in order."""
+        for block in self.blocks:
+            yield from block.instructions
+
+    def release(self):
+        """Drop the body of the function, once it is no longer needed,
+        as when it has been written out.
+
+        The references between its values are cut, so the body is freed
+        at once, even while the garbage collector is paused. The calls
+        it made are removed from the uses of the functions they called.
+        """
+        callees = set()
+        for block in self.blocks:
+            for instruction in block.instructions:
+                if instruction.__class__ is Call:
+                    callees.add(instruction.operands[0])
+                elif instruction.__class__ is Phi:
+                    instruction.blocks = []
+                instruction.operands = []
+                instruction.uses = []
+                instruction.block = None
+            block.instructions = []
+            block.uses = []
+            block.function = None
+        for arg in self.args:
+            arg.uses = []
+        for callee in callees:
+            callee.uses = [user for user in callee.uses if user.block is not None]
+        self.blocks = []
+
+    def write(self, write):
+        """Print the function, passing the text to write piece by piece."""
+        if not self.blocks:
+            params = list(self.param_types)
+            if self.varargs:
+                params.append("...")
+            header = "declare %s %s(%s)" % (self.type, self.ref, ", ".join(params))
+            if self.attributes:
+                header += " " + self.attributes
+            write(header + "\n")
+            return
+        write("define %s %s(%s) {\n" % (self.type, self.ref, ", ".join([arg.typed() for arg in self.args])))
+        for block in self.blocks:
+            block.write(write)
+        write("}\n")
+
+    def __str__(self):
+        text = []
+        self.write(text.append)
+        return "".join(text)
+
+class BasicBlock(NamedValue):
+    """A straight-line sequence of instructions.
+
+    The last instruction of a complete block is a terminator, a branch
+    or a return. A block without a name is printed without a label.
+    The uses of a block are the branches to it.
+
+    Attributes:
+        name -- the label of the block, or None
+        instructions -- the instructions of the block, in order
+        function -- the function the block is in
+    """
+    __slots__ = ('instructions', 'function')
+
+    def __init__(self, name=None):
+        super().__init__("label", None if name is None else "%" + name)
+        self.instructions = []
+        self.function = None
+
+    @property
+    def terminator(self):
+        """The terminator of the block, or None if it has none."""
+        if self.instructions and self.instructions[-1].is_terminator:
+            return self.instructions[-1]
+        return None
+
+    @property
+    def successors(self):
+        """The blocks the terminator of the block branches to."""
+        terminator = self.terminator
+        if terminator is None:
+            return []
+        return [operand for operand in terminator.operands if operand.__class__ is BasicBlock]
+
+    @property
+    def predecessors(self):
+        """The blocks that branch to the block."""
+        predecessors = []
+        for user in self.uses:
+            if user.block not in predecessors:
+                predecessors.append(user.block)
+        return predecessors
+
+    def append(self, instruction):
+        """Add an instruction to the end of the block, and return it."""
+        instruction.block = self
+        self.instructions.append(instruction)
+        return instruction
+
+    def insert(self, index, instruction):
+        """Insert an instruction before position index, and return it."""
+        instruction.block = self
+        self.instructions.insert(index, instruction)
+        return instruction
+
+    def write(self, write):
+        """Print the block, passing the text to write."""
+        lines = []
+        if self.ref is not None:
+            lines.append(self.ref[1:] + ":")
+        for instruction in self.instructions:
+            lines.append("  " + instruction.format())
+        lines.append("")
+        write("\n".join(lines))
+
+class Instruction(NamedValue):
+    """Base class for instructions.
+
+    An instruction is the value it computes, named by its result
+    register. Instructions without a result have no name.
+
+    Attributes:
+        name -- the name of the result register, or None
+        operands -- the values the instruction uses, in order
+        block -- the basic block the instruction is in
+        opcode -- the LLVM opcode, like 'load' or 'br'
+    """
+    __slots__ = ('operands', 'block')
+    is_terminator = False
+
+    def __init__(self, value_type, operands, name=None):
+        self.type = value_type
+        self.uses = []
+        self.ref = None if name is None else "%" + name
+        self.operands = operands
+        self.block = None
+        for operand in operands:
+            operand.uses.append(self)
+
+    def set_operand(self, index, value):
+        """Replace the operand at index with value."""
+        self.operands[index].uses.remove(self)
+        self.operands[index] = value
+        value.uses.append(self)
+
+    def clone(self):
+        """Return a copy of the instruction, in no block, with the same
+        operands and name."""
+        clone = copy.copy(self)
+        clone.uses = []
+        clone.operands = list(self.operands)
+        clone.block = None
+        for operand in clone.operands:
+            operand.uses.append(clone)
+        return clone
+
+    def drop_operands(self):
+        """Remove the instruction from the uses of its operands."""
+        for operand in self.operands:
+            operand.uses.remove(self)
+        self.operands = []
+
+    def erase(self):
+        """Remove the instruction from its block, and its operands' uses."""
+        self.drop_operands()
+        self.block.instructions.remove(self)
+        self.block = None
+
+    def assigned(self, text):
+        """Return the text of the instruction, with its result if named."""
+        if self.ref is None:
+            return text
+        return self.ref + " = " + text
+
+    def __repr__(self):
+        return "<%s %s>" % (self.__class__.__name__, self.format())
+
+def drop_all(instructions):
+    """Remove a set of instructions from the uses of their operands,
+    and detach them from their blocks, which the caller removes them from.
+
+    The uses of each operand are filtered once, where erasing the
+    instructions one by one would search them once for every use, as
+    for the many loads of a variable.
+    """
+    operands = {}
+    for instruction in instructions:
+        for operand in instruction.operands:
+            if operand.__class__ is not Constant:
+                operands[id(operand)] = operand
+        instruction.operands = []
+        instruction.block = None
+        if instruction.__class__ is Phi:
+            instruction.blocks = []
+    for operand in operands.values():
+        operand.uses = [user for user in operand.uses if user not in instructions]
+
+class Alloca(Instruction):
+    """Allocate memory for a local variable or array on the stack.
+
+    Attributes:
+        allocated_type -- the type of the memory allocated
+    """
+    __slots__ = ('allocated_type',)
+    opcode = "alloca"
+
+    def __init__(self, allocated_type, name=None):
+        super().__init__(allocated_type + "*", [], name)
+        self.allocated_type = allocated_type
+
+    def format(self):
+        return self.assigned("alloca " + self.allocated_type)
+
+class Load(Instruction):
+    """Load a value from memory. The operand is the pointer."""
+    __slots__ = ()
+    opcode = "load"
+
+    def __init__(self, pointer, name=None):
+        super().__init__(pointer.type[:-1], [pointer], name)
+
+    def format(self):
+        pointer = self.operands[0]
+        return self.assigned("load %s, %s %s" % (self.type, pointer.type, pointer.ref))
+
+class Store(Instruction):
+    """Store a value to memory. The operands are the value and the pointer."""
+    __slots__ = ()
+    opcode = "store"
+
+    def __init__(self, value, pointer):
+        super().__init__("void", [value, pointer])
+
+    def format(self):
+        value, pointer = self.operands
+        return "store %s %s, %s %s" % (value.type, value.ref, pointer.type, pointer.ref)
+
+class GetElementPtr(Instruction):
+    """Compute the address of an element of an array.
+
+    The operands are the pointer to the array, then the indices.
+
+    Attributes:
+        element_type -- the type the pointer points to
+    """
+    __slots__ = ('element_type',)
+    opcode = "getelementptr"
+
+    def __init__(self, pointer, indices, name=None):
+        super().__init__("i32*", [pointer] + indices, name)
+        self.element_type = pointer.type[:-1]
+
+    def format(self):
+        operands = ", ".join([operand.typed() for operand in self.operands])
+        return self.assigned("getelementptr %s, %s" % (self.element_type, operands))
+
+class BinaryOperator(Instruction):
+    """An arithmetic operation on two values.
+
+    Attributes:
+        opcode -- the LLVM opcode, like 'add' or 'udiv'
+    """
+    __slots__ = ('opcode',)
+
+    def __init__(self, opcode, left, right, name=None):
+        super().__init__(left.type, [left, right], name)
+        self.opcode = opcode
+
+    def format(self):
+        left, right = self.operands
+        return self.assigned("%s %s %s, %s" % (self.opcode, left.type, left.ref, right.ref))
+
+class ICmp(Instruction):
+    """A comparison of two integers, giving an i1.
+
+    Attributes:
+        predicate -- the LLVM predicate, like 'eq' or 'slt'
+    """
+    __slots__ = ('predicate',)
+    opcode = "icmp"
+
+    def __init__(self, predicate, left, right, name=None):
+        super().__init__("i1", [left, right], name)
+        self.predicate = predicate
+
+    def format(self):
+        left, right = self.operands
+        return self.assigned("icmp %s %s %s, %s" % (self.predicate, left.type, left.ref, right.ref))
+
+class Call(Instruction):
+    """A function call. The operands are the function, then the arguments.
+
+    The call has the return type of the function, and no name if that
+    is void.
+    """
+    __slots__ = ()
+    opcode = "call"
+
+    def __init__(self, function, args, name=None):
+        super().__init__(function.type, [function] + args, name)
+
+    @property
+    def function(self):
+        return self.operands[0]
+
+    @property
+    def args(self):
+        return self.operands[1:]
+
+    def format(self):
+        function = self.operands[0]
+        args = ", ".join([arg.typed() for arg in self.operands[1:]])
+        if function.varargs:
+            callee = function.signature() + " " + function.ref
+        else:
+            callee = function.type + " " + function.ref
+        return self.assigned("call %s(%s)" % (callee, args))
+
+class Phi(Instruction):
+    """Select a value by the predecessor block control came from.
+
+    The operands are the incoming values, and blocks the predecessor
+    each of them comes from.
+
+    Attributes:
+        blocks -- the incoming blocks, in the order of the operands
+    """
+    __slots__ = ('blocks',)
+    opcode = "phi"
+
+    def __init__(self, value_type, name=None):
+        super().__init__(value_type, [], name)
+        self.blocks = []
+
+    def add_incoming(self, value, block):
+        """Add value as the value when control comes from block."""
+        self.operands.append(value)
+        value.uses.append(self)
+        self.blocks.append(block)
+
+    def clone(self):
+        clone = super().clone()
+        clone.blocks = list(self.blocks)
+        return clone
+
+    def drop_operands(self):
+        super().drop_operands()
+        self.blocks = []
+
+    def remove_incoming(self, block):
+        """Remove the values coming from block."""
+        for index in reversed(range(len(self.blocks))):
+            if self.blocks[index] is block:
+                self.operands.pop(index).uses.remove(self)
+                del self.blocks[index]
+
+    def format(self):
+        incoming = ", ".join(["[ %s, %s ]" % (value.ref, block.ref)
+                              for value, block in zip(self.operands, self.blocks)])
+        return self.assigned("phi %s %s" % (self.type, incoming))
+
+class Branch(Instruction):
+    """A conditional or unconditional branch.
+
+    The operands are the target block, or the i1 condition, the block
+    to branch to if it is true and the block if it is false.
+    """
+    __slots__ = ()
+    opcode = "br"
+    is_terminator = True
+
+    def __init__(self, *operands):
+        super().__init__("void", list(operands))
+
+    def format(self):
+        return "br " + ", ".join([operand.typed() for operand in self.operands])
+
+class Return(Instruction):
+    """Return a value from the function. The operand is the value."""
+    __slots__ = ()
+    opcode = "ret"
+    is_terminator = True
+
+    def __init__(self, value):
+        super().__init__("void", [value])
+
+    def format(self):
+        value = self.operands[0]
+        return "ret " + value.type + " " + value.ref
+
+class Unreachable(Instruction):
+    """Mark the end of a block control never reaches, as after a trap."""
+    __slots__ = ()
+    opcode = "unreachable"
+    is_terminator = True
+
+    def __init__(self):
+        super().__init__("void", [])
+
+    def format(self):
+        return "unreachable"
@@ -2,10 +2,20 @@
 # lexer.py
 # -----------------------------------------------------------------------------
 
+import os
+import re
 import sys
+import mmap
 sys.path.append('.')
 
+from array import array
 from sly import Lexer
+from sly.lex import Token
+from dl.names import NameTable
+
+# Group codes used by the bulk scanner for text that is not a token
+_IGNORED = -1
+_ILLEGAL = -3
 
 class DLLexer(Lexer):
     tokens = { ELSE, IF, INT, PRINT, READ, RETURN, WHILE,
@@ -15,6 +25,20 @@ class DLLexer(Lexer):
                EQOP, NEOP, LTOP, LEOP, GTOP, GEOP,
                INTCONSTANT, IDENTIFIER }
 
+    # Integer codes for token types used by tokenize_arrays(): a token
+    # type's code is its index in this tuple
+    token_names = tuple(sorted(tokens))
+
+    # Token types whose value differs between occurrences.  All other
+    # tokens always have the same text.
+    valued_tokens = { 'IDENTIFIER', 'INTCONSTANT' }
+
+    # A keyword only matches where IDENTIFIER would match exactly the keyword
+    _keyword_end = r'(?![a-z0-9])'
+
+    # Most distinct pieces of source remembered by tokenize_bytes()
+    _bulk_known_limit = 65536
+
     # Ignored whitespace characters
     ignore = ' \t'
     ignore_newline = r'\n+'
@@ -57,6 +81,10 @@ class DLLexer(Lexer):
     NEOP = r'!='
 
 
+    def __init__(self, names=None):
+        # Identifiers are interned in names, one table per compilation
+        self.names = NameTable() if names is None else names
+
     # Extra action for newlines
     def ignore_newline(self, t):
         self.lineno += t.value.count('\n')
@@ -64,3 +92,254 @@ class DLLexer(Lexer):
     def error(self, t):
         print("Illegal character '%s'" % t.value[0])
         self.index += 1
+
+    def tokenize(self, text, lineno=1, index=0):
+        """Generate tokens from text, with identifiers interned in names."""
+        intern = self.names.intern
+        for tok in super().tokenize(text, lineno, index):
+            if tok.type == 'IDENTIFIER':
+                tok.value = intern(tok.value)
+            yield tok
+
+    @classmethod
+    def _bulk_scanner(cls, binary=False):
+        """Build the regexes used by tokenize_arrays() and tokenize_bytes().
+
+        Returns a regex that splits text into pieces, a regex matching
+        the ignored text that may start a piece, the master regex used
+        to classify the rest of a piece, a list mapping master regex
+        groups to codes, and a scanner regex that splits text into the
+        same pieces with the groups of the master regex, so a piece is
+        classified by the group that matched.  Each piece is a single
+        token (or comment or illegal character) with any whitespace and
+        newlines before it, or trailing whitespace at the end of the
+        text.  Keywords get their own alternatives ahead of IDENTIFIER.
+        With binary set, the regexes match bytes instead of str.
+        """
+        if '_bulk' not in vars(cls):
+            cls._bulk = {}
+        if binary in cls._bulk:
+            return cls._bulk[binary]
+
+        spacing = ['[%s]+' % re.escape(cls.ignore)]
+        parts = []
+        kinds = []
+        for tokname, value in cls._rules:
+            pattern = value if isinstance(value, str) else value.pattern
+            if tokname == 'ignore_newline':
+                spacing.append(pattern)
+                continue
+            elif tokname.startswith('ignore_'):
+                kind = _IGNORED
+            else:
+                for keyword, keytype in cls._remapping.get(tokname, {}).items():
+                    parts.append(re.escape(keyword) + cls._keyword_end)
+                    kinds.append(cls.token_names.index(keytype))
+                kind = cls.token_names.index(tokname)
+            parts.append(pattern)
+            kinds.append(kind)
+        parts.append('.')
+        kinds.append(_ILLEGAL)
+
+        def compile(pattern):
+            if binary:
+                pattern = pattern.encode('ascii')
+            return re.compile(pattern, cls.reflags | re.DOTALL)
+
+        spacing = '(?:%s)' % '|'.join(spacing)
+        alternatives = '|'.join('(?:%s)' % part for part in parts)
+        splitter = compile('%s*(?:%s)|%s+' % (spacing, alternatives, spacing))
+        prefix = compile('%s*' % spacing)
+        groups = '|'.join('(%s)' % part for part in parts)
+        master = compile(groups)
+        # Trailing spacing is tried first, so it is not split into an
+        # illegal character matched by '.' when nothing follows it
+        scanner = compile(r'%s+\Z|%s*(?:%s)' % (spacing, spacing, groups))
+        cls._bulk[binary] = (splitter, prefix, master, [None] + kinds, scanner)
+        return cls._bulk[binary]
+
+    def tokenize_arrays(self, text, lineno=1):
+        """Tokenize all of text into a TokenArrays object.
+
+        The text is split into pieces with one pass of the scanner
+        regex.  Each piece is classified by the group of the scanner
+        that matched, and only its offsets, type code and line number
+        are stored, in compact arrays, so no string is created for any
+        piece: values are sliced from the text when they are needed.
+        No Token objects are created.  Illegal characters are passed
+        to error() one at a time and are always skipped.
+        """
+        splitter, prefix, master, codes, scanner = self._bulk_scanner()
+        types = array('B')
+        starts = array('q')
+        ends = array('q')
+        linenos = array('L')
+        add_type = types.append
+        add_start = starts.append
+        add_end = ends.append
+        add_lineno = linenos.append
+        count = text.count
+
+        for match in scanner.finditer(text):
+            group = match.lastindex
+            if group is None:
+                # Trailing whitespace at the end of the text
+                lineno += count('\n', *match.span())
+                continue
+            start, end = match.span(group)
+            piece_start = match.start()
+            if start != piece_start:
+                lineno += count('\n', piece_start, start)
+            kind = codes[group]
+            if kind >= 0:
+                add_type(kind)
+                add_start(start)
+                add_end(end)
+                add_lineno(lineno)
+            elif kind == _ILLEGAL:
+                self._bulk_error(text[start:end], start, lineno)
+
+        self.text = text
+        self.index = len(text)
+        self.lineno = lineno
+        return TokenArrays(text, types, starts, ends, linenos, self.token_names, self.valued_tokens, self.names)
+
+    def tokenize_bytes(self, data, lineno=1):
+        """Generate tokens from a bytes-like source, such as an mmap.
+
+        The token regexes run directly on the bytes, so the source is
+        never decoded or copied as a whole.  Token values are decoded
+        once per distinct piece of source, and identifiers are interned
+        in names.  Line numbers
+        are counted from the newlines before each token.  Tokens are
+        produced one at a time, so memory does not grow with the size
+        of the source.  Every byte that starts no token, including each
+        byte of a non-ASCII character, is passed to error() and skipped.
+        """
+        splitter, prefix, master, codes, scanner = self._bulk_scanner(binary=True)
+        names = self.token_names
+        identifier = names.index('IDENTIFIER')
+        intern = self.names.intern
+        known = {}
+        index = 0
+        try:
+            for match in splitter.finditer(data):
+                piece = match.group()
+                info = known.get(piece)
+                if info is None:
+                    spacing = prefix.match(piece).end()
+                    rest = piece[spacing:]
+                    kind = codes[master.match(rest).lastindex] if rest else _IGNORED
+                    value = rest.decode('ascii') if kind >= 0 else None
+                    if kind == identifier:
+                        value = intern(value)
+                    info = (kind, value, len(rest), piece.count(b'\n', 0, spacing))
+                    # Bound the memory used by unique identifiers
+                    if len(known) >= self._bulk_known_limit:
+                        known.clear()
+                    known[piece] = info
+
+                kind, value, length, newlines = info
+                lineno += newlines
+                index = match.end()
+                if kind >= 0:
+                    tok = Token()
+                    tok.type = names[kind]
+                    tok.value = value
+                    tok.lineno = lineno
+                    tok.index = index - length
+                    yield tok
+                elif kind == _ILLEGAL:
+                    self._bulk_error(piece[-1:].decode('latin-1'), index - 1, lineno)
+        finally:
+            self.index = index
+            self.lineno = lineno
+
+    def tokenize_file(self, filename, lineno=1):
+        """Generate tokens from a DL source file, which is memory mapped."""
+        with open(filename, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # An empty file can't be mapped, and has no tokens
+                self.index = 0
+                self.lineno = lineno
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                yield from self.tokenize_bytes(data, lineno)
+
+    def _bulk_error(self, value, index, lineno):
+        """Report an illegal character found by the bulk tokenizers."""
+        tok = Token()
+        tok.type = 'ERROR'
+        tok.value = value
+        tok.lineno = lineno
+        tok.index = index
+        self.index = index
+        self.lineno = lineno
+        self.error(tok)
+
+class TokenArrays:
+    """Tokens of a source buffer, stored as compact parallel arrays.
+
+    Attributes:
+        source -- the tokenized text
+        types -- token type codes, indexes into names
+        starts -- offset in source where each token starts
+        ends -- offset in source just past the end of each token
+        linenos -- line number of each token
+        names -- token type names, indexed by code
+        valued -- set of token type names whose text varies
+        identifiers -- the NameTable identifiers are interned in
+    """
+    def __init__(self, source, types, starts, ends, linenos, names, valued, identifiers=None):
+        self.source = source
+        self.types = types
+        self.starts = starts
+        self.ends = ends
+        self.linenos = linenos
+        self.names = names
+        self.valued = valued
+        self.identifiers = NameTable() if identifiers is None else identifiers
+
+    def __len__(self):
+        return len(self.types)
+
+    def type(self, n):
+        """Return the type name of token n."""
+        return self.names[self.types[n]]
+
+    def value(self, n):
+        """Return the text of token n, sliced from the source."""
+        return self.source[self.starts[n]:self.ends[n]]
+
+    def tokens(self):
+        """Generate Token objects, in the form DLParser.parse() consumes.
+
+        Only identifiers and integer constants are sliced from the
+        source, and identifiers are interned in identifiers.  Every
+        other token type has fixed text, which is sliced once and
+        shared.
+        """
+        source = self.source
+        names = self.names
+        starts = self.starts
+        ends = self.ends
+        linenos = self.linenos
+        fixed = [None] * len(names)
+        sliced = [name in self.valued for name in names]
+        identifier = names.index('IDENTIFIER')
+        intern = self.identifiers.intern
+        for n, code in enumerate(self.types):
+            tok = Token()
+            tok.type = names[code]
+            if code == identifier:
+                tok.value = intern(source[starts[n]:ends[n]])
+            elif sliced[code]:
+                tok.value = source[starts[n]:ends[n]]
+            else:
+                value = fixed[code]
+                if value is None:
+                    value = fixed[code] = source[starts[n]:ends[n]]
+                tok.value = value
+            tok.lineno = linenos[n]
+            tok.index = starts[n]
+            yield tok
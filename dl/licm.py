@@ -0,0 +1,220 @@
+import gc
+
+from dl.ir import (Instruction, Constant, Alloca, Load, Store, GetElementPtr, BinaryOperator, ICmp, Call,
+                   Phi, Branch, BasicBlock)
+from dl.cfg import reverse_postorder, immediate_dominators, dominates, natural_loops
+from dl.valuenumbering import may_alias
+from dl.induction import InductionVariables
+
+# The library functions that write no memory of the program
+READ_ONLY_FUNCTIONS = {"printf"}
+
+# The library functions that only write through their pointer arguments
+ARGUMENT_WRITING_FUNCTIONS = {"scanf"}
+
+def is_safe_pointer(pointer):
+    """Check if a pointer may be loaded from before it is known to be
+    used: it is a variable, or an element of an array at a constant
+    index inside it. A computed index may be out of range, if the load
+    is guarded by a test or a bounds check."""
+    if pointer.__class__ is Alloca:
+        return True
+    if pointer.__class__ is not GetElementPtr:
+        return False
+    array, first, index = pointer.operands
+    if array.__class__ is not Alloca or first.__class__ is not Constant or first.value != 0:
+        return False
+    size = int(array.allocated_type[1:].split(" x ")[0])
+    return index.__class__ is Constant and index.value.__class__ is int and 0 <= index.value < size
+
+class LoopInvariantCodeMotion:
+    """Move the code of loops that computes the same value on every
+    iteration to before the loop.
+
+    DLGenerator evaluates the body of a While loop, all of it, on every
+    iteration. This pass finds the loops of each function (see
+    dl.cfg.natural_loops), and hoists to the preheader, the one block
+    that enters the loop, the instructions whose operands do not change
+    in the loop:
+
+        arithmetic, comparisons and element addresses of values
+            defined before the loop, or hoisted themselves
+        loads of memory no instruction in the loop may write
+
+    The pass knows what the calls of DL programs write: print calls
+    printf, which writes no memory of the program, read calls scanf,
+    which writes the variable read, and a call of a DL function may
+    write anything. Inner loops are done first, so code can move out
+    of several loops.
+
+        module = DLGenerator().build(checked)
+        Mem2Reg().run(module)
+        LoopInvariantCodeMotion().run(module)
+
+    Hoisted code runs even if the loop does not, so only code that
+    cannot fault moves: no division by anything but a constant other
+    than zero, and no loads of array elements at computed indices.
+    Such code moves too if it would run anyway, before any call or
+    store of the loop: if it is in the header, or if the loop has a
+    trip count of at least one (see dl.induction.InductionVariables)
+    and it runs on every iteration.
+    Preheaders are made for loops entered from a conditional branch.
+
+    Attributes:
+        loops -- the number of loops found
+        hoisted -- count of the instructions hoisted, by opcode
+        preheaders -- the number of preheader blocks added
+    """
+    def __init__(self):
+        self.loops = 0
+        self.hoisted = {}
+        self.preheaders = 0
+
+    def run(self, module):
+        """Hoist the loop invariant code of every function of module,
+        and return it.
+
+        The garbage collector is paused meanwhile, as in DLGenerator.build.
+        """
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for function in module.functions:
+                if function.blocks:
+                    self.run_on_function(function)
+        finally:
+            if enabled:
+                gc.enable()
+        return module
+
+    def hoisted_count(self):
+        """Return the total number of instructions hoisted."""
+        return sum(self.hoisted.values())
+
+    def run_on_function(self, function):
+        """Hoist the loop invariant code of a function."""
+        loops = natural_loops(immediate_dominators(function))
+        if not loops:
+            return
+        self.loops += len(loops)
+        # New preheaders are in the loops around, so the loops are
+        # found again once they are added
+        idom = immediate_dominators(function)
+        if any(self.add_preheader(loop) for loop in loops):
+            idom = immediate_dominators(function)
+            loops = natural_loops(idom)
+        order = reverse_postorder(function)
+        for loop in loops:
+            predecessors = loop.outside_predecessors()
+            if len(predecessors) == 1:
+                blocks = [block for block in order if block in loop.blocks]
+                self.hoist(loop, predecessors[0], blocks, self.first_iteration(loop, idom, blocks))
+
+    def add_preheader(self, loop):
+        """Add a block to enter loop from, if the one block it is
+        entered from also goes elsewhere. Return if one was added."""
+        predecessors = loop.outside_predecessors()
+        if len(predecessors) != 1 or len(predecessors[0].successors) == 1:
+            return False
+        entering = predecessors[0]
+        header = loop.header
+        function = header.function
+        preheader = BasicBlock(header.name + ".preheader")
+        preheader.function = function
+        function.blocks.insert(function.blocks.index(header), preheader)
+        branch = entering.terminator
+        for index, operand in enumerate(branch.operands):
+            if operand is header:
+                branch.set_operand(index, preheader)
+        preheader.append(Branch(header))
+        for instruction in header.instructions:
+            if instruction.__class__ is Phi:
+                instruction.blocks = [preheader if block is entering else block for block in instruction.blocks]
+        self.preheaders += 1
+        return True
+
+    def first_iteration(self, loop, idom, blocks):
+        """Return the instructions of a loop that surely run once it is
+        entered, before the program does anything that can be seen.
+
+        These are the instructions of the header, and of the blocks on
+        every path around the loop if it runs at least once, that come
+        before any call or store. The blocks of the loop are scanned in
+        reverse postorder, so the blocks on the paths from the header
+        to a block are scanned before it."""
+        if InductionVariables(loop).trip_count:
+            every = {block for block in blocks
+                     if all(dominates(idom, block, latch) for latch in loop.latches)}
+        else:
+            every = {loop.header}
+        runs = set()
+        for block in blocks:
+            for instruction in block.instructions:
+                if instruction.__class__ is Call or instruction.__class__ is Store:
+                    return runs
+                if block in every:
+                    runs.add(instruction)
+        return runs
+
+    def hoist(self, loop, preheader, blocks, runs):
+        """Move the invariant instructions of the blocks of a loop, in
+        reverse postorder, to the end of the preheader. The instructions
+        in runs may fault, as they would run anyway."""
+        stores, clobbers = self.loop_writes(blocks)
+        moved = set()
+        terminator = preheader.instructions.pop()
+        for block in blocks:
+            kept = []
+            for instruction in block.instructions:
+                if self.is_invariant(instruction, loop, moved, stores, clobbers, instruction in runs):
+                    moved.add(instruction)
+                    instruction.block = preheader
+                    preheader.instructions.append(instruction)
+                    self.hoisted[instruction.opcode] = self.hoisted.get(instruction.opcode, 0) + 1
+                else:
+                    kept.append(instruction)
+            if len(kept) != len(block.instructions):
+                block.instructions = kept
+        preheader.instructions.append(terminator)
+
+    def loop_writes(self, blocks):
+        """Return the pointers the loop stores to, and whether it calls a
+        function that may write any memory."""
+        stores = []
+        for block in blocks:
+            for instruction in block.instructions:
+                instruction_class = instruction.__class__
+                if instruction_class is Store:
+                    stores.append(instruction.operands[1])
+                elif instruction_class is Call:
+                    name = instruction.operands[0].name
+                    if name in ARGUMENT_WRITING_FUNCTIONS:
+                        stores.extend([argument for argument in instruction.operands[1:]
+                                       if argument.type.endswith("*")])
+                    elif name not in READ_ONLY_FUNCTIONS:
+                        return stores, True
+        return stores, False
+
+    def is_invariant(self, instruction, loop, moved, stores, clobbers, runs):
+        """Check if an instruction of a loop can be moved before it.
+        runs tells if the instruction surely runs once the loop is
+        entered."""
+        instruction_class = instruction.__class__
+        if instruction_class is BinaryOperator:
+            if instruction.opcode == "udiv" and not runs:
+                divisor = instruction.operands[1]
+                if divisor.__class__ is not Constant or divisor.value == 0:
+                    return False
+        elif instruction_class is Load:
+            pointer = instruction.operands[0]
+            if clobbers or not (runs or is_safe_pointer(pointer)):
+                return False
+            for stored in stores:
+                if may_alias(stored, pointer):
+                    return False
+        elif instruction_class is not ICmp and instruction_class is not GetElementPtr:
+            return False
+        for operand in instruction.operands:
+            if isinstance(operand, Instruction) and operand.block in loop.blocks and operand not in moved:
+                return False
+        return True
@@ -0,0 +1,197 @@
+import gc
+
+from dl.ir import Alloca, Load, Store, Phi, Constant
+from dl.cfg import reverse_postorder, immediate_dominators, dominator_tree, dominance_frontiers
+
+class Mem2Reg:
+    """Promote scalar local variables from memory to SSA registers.
+
+    DLGenerator keeps every variable in an alloca, reads it with a load
+    and writes it with a store. This pass rewrites the variables that
+    only ever are loaded and stored to, so that each load uses the
+    value stored last instead, with phi instructions where control
+    flow joins, as at the end of an If and the top of a While loop:
+
+        module = DLGenerator().build(checked)
+        Mem2Reg().run(module)
+
+    Variables whose address is taken, like the target of a read, and
+    arrays stay in memory. Phis are placed at the iterated dominance
+    frontier of the stores (Cytron et al.), and the loads are renamed
+    walking the dominator tree. Phis whose value is never used are
+    removed again. Loads in unreachable code read undef.
+
+    Attributes:
+        promoted -- the number of allocas promoted
+        phis -- the number of phi instructions added
+        removed -- count of the instructions removed, by opcode
+    """
+    def __init__(self):
+        self.promoted = 0
+        self.phis = 0
+        self.removed = {}
+
+    def run(self, module):
+        """Promote the variables of every function of module, and return it.
+
+        The garbage collector is paused meanwhile, as in DLGenerator.build.
+        """
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for function in module.functions:
+                if function.blocks:
+                    self.run_on_function(function)
+        finally:
+            if enabled:
+                gc.enable()
+        return module
+
+    def count_removed(self, opcode, count=1):
+        """Count removed instructions with the given opcode."""
+        self.removed[opcode] = self.removed.get(opcode, 0) + count
+
+    def is_promotable(self, instruction):
+        """Check if instruction is an alloca of a scalar that is only
+        loaded from and stored to."""
+        if instruction.__class__ is not Alloca or instruction.allocated_type != "i32":
+            return False
+        for user in instruction.uses:
+            if user.__class__ is Load:
+                continue
+            if user.__class__ is Store and user.operands[1] is instruction and user.operands[0] is not instruction:
+                continue
+            return False
+        return True
+
+    def run_on_function(self, function):
+        """Promote the variables of a function."""
+        allocas = [instruction for instruction in function.instructions() if self.is_promotable(instruction)]
+        if not allocas:
+            return
+        promoted = set(allocas)
+        order = reverse_postorder(function)
+        idom = immediate_dominators(function, order)
+        frontiers = dominance_frontiers(idom)
+        undef = Constant("undef")
+
+        # Place the phis at the iterated dominance frontier of the stores
+        phis = {}
+        phi_variables = {}
+        for alloca in allocas:
+            worklist = [user.block for user in alloca.uses if user.__class__ is Store and user.block in idom]
+            placed = set()
+            while worklist:
+                block = worklist.pop()
+                for frontier in frontiers[block]:
+                    if frontier not in placed:
+                        placed.add(frontier)
+                        name = "%s.phi.%d" % (alloca.name, len(phi_variables))
+                        phi = frontier.insert(0, Phi("i32", name))
+                        self.phis += 1
+                        phis.setdefault(frontier, []).append(phi)
+                        phi_variables[phi] = alloca
+                        worklist.append(frontier)
+
+        # Rename, walking the dominator tree with a stack of the values
+        # each variable has, so far, in the blocks being walked
+        children = dominator_tree(idom)
+        values = {alloca: [undef] for alloca in allocas}
+        stack = [(order[0], None)]
+        while stack:
+            block, defined = stack.pop()
+            if defined is not None:
+                # Leaving the block, forget what it stored
+                for alloca in defined:
+                    values[alloca].pop()
+                continue
+            defined = []
+            self.rename_block(block, promoted, values, defined, phi_variables)
+            for successor in dict.fromkeys(block.successors):
+                for phi in phis.get(successor, ()):
+                    phi.add_incoming(values[phi_variables[phi]][-1], block)
+            stack.append((block, defined))
+            for child in reversed(children[block]):
+                stack.append((child, None))
+
+        # Unreachable code was not walked: its loads read undef, and
+        # its edges into the reachable code bring undef to the phis
+        for block in function.blocks:
+            if block in idom:
+                continue
+            self.rename_block(block, promoted, {alloca: [undef] for alloca in allocas}, [], {})
+            for successor in dict.fromkeys(block.successors):
+                for phi in phis.get(successor, ()):
+                    phi.add_incoming(undef, block)
+
+        self.remove_dead_phis(phi_variables)
+        for block in dict.fromkeys(alloca.block for alloca in allocas):
+            block.instructions = [instruction for instruction in block.instructions
+                                  if instruction not in promoted]
+        for alloca in allocas:
+            alloca.uses = []
+            alloca.block = None
+        self.count_removed("alloca", len(allocas))
+        self.promoted += len(allocas)
+
+    def rename_block(self, block, promoted, values, defined, phi_variables):
+        """Replace the loads of the promoted variables in a block by the
+        values they read, and remove the stores, which define the values.
+
+        values holds the stack of values of each variable, and defined
+        collects the variables the block pushes a value for.
+        """
+        kept = []
+        loads = stores = 0
+        for instruction in block.instructions:
+            instruction_class = instruction.__class__
+            if instruction_class is Load and instruction.operands[0] in promoted:
+                instruction.replace_all_uses_with(values[instruction.operands[0]][-1])
+                instruction.operands = []
+                instruction.block = None
+                loads += 1
+                continue
+            elif instruction_class is Store and instruction.operands[1] in promoted:
+                value, alloca = instruction.operands
+                values[alloca].append(value)
+                defined.append(alloca)
+                value.uses.remove(instruction)
+                instruction.operands = []
+                instruction.block = None
+                stores += 1
+                continue
+            elif instruction_class is Phi and instruction in phi_variables:
+                alloca = phi_variables[instruction]
+                values[alloca].append(instruction)
+                defined.append(alloca)
+            kept.append(instruction)
+        if loads or stores:
+            block.instructions = kept
+            self.count_removed("load", loads)
+            self.count_removed("store", stores)
+
+    def remove_dead_phis(self, phi_variables):
+        """Remove the phis whose value no instruction other than a phi
+        placed by this pass uses, directly or through other such phis.
+
+        Phis already in the function, like the result phi of an inlined
+        call, count as uses that keep a phi alive.
+        """
+        live = set()
+        worklist = [phi for phi in phi_variables
+                    if any(user.__class__ is not Phi or user not in phi_variables for user in phi.uses)]
+        while worklist:
+            phi = worklist.pop()
+            if phi in live:
+                continue
+            live.add(phi)
+            for operand in phi.operands:
+                if operand in phi_variables and operand not in live:
+                    worklist.append(operand)
+        for phi in phi_variables:
+            if phi not in live:
+                phi.drop_operands()
+        for phi in phi_variables:
+            if phi not in live:
+                phi.block.instructions.remove(phi)
+                self.phis -= 1
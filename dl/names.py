@@ -0,0 +1,54 @@
+from functools import cached_property
+
+class Name(str):
+    """An identifier interned in a NameTable.
+
+    A Name is the identifier string itself, so it prints, compares and
+    hashes like the string, but it also carries its integer ID in the
+    table, which the symbol table uses to index its arrays. Every
+    occurrence of an identifier in a compilation is the same Name
+    object.
+
+    Attributes:
+        id -- the index of the name in its table
+        table -- the NameTable the name is interned in
+        local -- the name as an LLVM local, '%' + name, made when first used
+    """
+
+    @cached_property
+    def local(self):
+        return "%" + self
+
+class NameTable:
+    """Per-compilation table of interned identifiers.
+
+    DLLexer interns each identifier it reads here, so the identifiers
+    in the AST are Name objects with dense integer IDs.
+
+    Attributes:
+        names -- the interned Name objects, indexed by ID
+        by_text -- map from identifier string to its Name
+    """
+    def __init__(self):
+        self.names = []
+        self.by_text = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, text):
+        """Return the Name interned for the string text."""
+        name = self.by_text.get(text)
+        if name is None:
+            name = Name(text)
+            name.id = len(self.names)
+            name.table = self
+            self.names.append(name)
+            self.by_text[name] = name
+        return name
+
+def local(name):
+    """Return name as an LLVM local, '%' + name, for a Name or a string."""
+    if name.__class__ is Name:
+        return name.local
+    return "%" + name
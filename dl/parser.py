@@ -2,20 +2,36 @@
 # parser.py
 # -----------------------------------------------------------------------------
 
+import os
 import sys
 sys.path.append('.')
 
 from sly import Parser
+from dl import ast
 from dl.lexer import DLLexer
-from dl.ast import Integer, Variable, BinOp, RelOp, ArrayIndex, \
-                   Assign, Print, Read, Return, If, While, Block, \
-                   FunctionCall, Arguments, FunctionDeclaration, \
-                   Declarations, VariableDeclarations, Program
 
 class DLParser(Parser):
     """LALR parser for simple DL language."""
     tokens = DLLexer.tokens
 
+    # Frozen parsing tables written by buildtables.py, used when present
+    # and up to date
+    tablemodule = 'dl.parsetab'
+
+    # Cache the LALR tables in the user's cache directory, so they are
+    # only rebuilt when the grammar changes.  The package directory may
+    # be read-only, and writing there would dirty the source tree.
+    cachefile = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser(os.path.join('~', '.cache')),
+                             'dl', 'parser.lrtab')
+
+    def __init__(self, nodes=ast):
+        """Create a parser that builds the AST with the node classes of nodes.
+
+        nodes is any object with the node classes of dl.ast as attributes,
+        such as dl.ast itself or a dl.arena.ASTArena.
+        """
+        self.nodes = nodes
+
     precedence = (
         # Lowest
         ('left', EQOP, NEOP, LEOP, LTOP, GEOP, GTOP),
@@ -30,28 +46,32 @@ class DLParser(Parser):
     @_('block')
     def program(self, p):
         """Implement the <program> production alternate without declarations."""
-        return Program(p.block)
+        return self.nodes.Program(p.block)
 
     @_('declarations block')
     def program(self, p):
         """Implement the <program> production alternate with declarations."""
-        return Program(p.block, p.declarations)
+        return self.nodes.Program(p.block, p.declarations)
 
     # <declarations> ::= <declaration>
-    #                  | <declaration> <declarations>
+    #                  | <declarations> <declaration>
 
     @_('declaration')
     def declarations(self, p):
         """Implement the <declarations> production alternate with a single <declaration>."""
-        return Declarations(p.declaration)
+        return self.nodes.Declarations(p.declaration)
 
-    @_('declaration declarations')
+    @_('declarations declaration')
     def declarations(self, p):
-        """Implement the <declarations> production alternate for a sequence of <declaration>s."""
+        """Implement the <declarations> production alternate for a sequence of <declaration>s.
+
+        The rule is left recursive, so each <declaration> is appended as
+        soon as it is parsed and the parse stack stays shallow.
+        """
         node = p.declarations
 
         if p.declaration:
-            node.prepend(p.declaration)
+            node.append(p.declaration)
 
         return node
 
@@ -76,20 +96,20 @@ class DLParser(Parser):
         node.set_type("INT")
         return node
 
-    # <vardeflist> ::= <vardec> | <vardec> , <vardeflist>
+    # <vardeflist> ::= <vardec> | <vardeflist> , <vardec>
 
     @_('vardec')
     def vardeflist(self, p):
         """Implement the <vardeflist> production alternate with a single <vardec>."""
-        return VariableDeclarations(p.vardec)
+        return self.nodes.VariableDeclarations(p.vardec)
 
-    @_('vardec COMMA vardeflist')
+    @_('vardeflist COMMA vardec')
     def vardeflist(self, p):
         """Implement the <vardeflist> production alternate with a sequence of <vardec>s."""
         node = p.vardeflist
 
         if p.vardec:
-            node.prepend(p.vardec)
+            node.append(p.vardec)
 
         return node
 
@@ -103,7 +123,7 @@ class DLParser(Parser):
     @_('variable OPENSQUARE constant CLOSESQUARE')
     def vardec(self, p):
         """Implement the <vardec> production alternate with an array."""
-        return ArrayIndex(p.variable, p.constant)
+        return self.nodes.ArrayIndex(p.variable, p.constant)
 
 
     # <functiondeclaration> ::= <identifier> (); <functionbody>
@@ -112,7 +132,7 @@ class DLParser(Parser):
     @_('IDENTIFIER OPENPAREN CLOSEPAREN SEMICOLON functionbody')
     def functiondeclaration(self, p):
         """Implement the <functiondeclaration> production alternate without arguments."""
-        node = FunctionDeclaration(p.IDENTIFIER)
+        node = self.nodes.FunctionDeclaration(p.IDENTIFIER)
         #print(p.functionbody)
         node.set_body(p.functionbody)
         return node
@@ -120,7 +140,7 @@ class DLParser(Parser):
     @_('IDENTIFIER OPENPAREN arglist CLOSEPAREN SEMICOLON functionbody')
     def functiondeclaration(self, p):
         """Implement the <functiondeclaration> production alternate with arguments."""
-        node = FunctionDeclaration(p.IDENTIFIER, p.arglist)
+        node = self.nodes.FunctionDeclaration(p.IDENTIFIER, p.arglist)
         #print(p.functionbody)
         node.set_body(p.functionbody)
         return node
@@ -139,20 +159,20 @@ class DLParser(Parser):
         temporary = { 'body': p.block }
         return temporary
 
-    # <arglist> ::= <identifier> | <identifier> , <arglist>
+    # <arglist> ::= <identifier> | <arglist> , <identifier>
 
     @_('variable')
     def arglist(self, p):
         """Implement the <arglist> production alternate for a single argument."""
-        return Arguments(p.variable)
+        return self.nodes.Arguments(p.variable)
 
-    @_('variable COMMA arglist')
+    @_('arglist COMMA variable')
     def arglist(self, p):
         """Implement the <arglist> production alternate for a sequence of arguments."""
         node = p.arglist
 
         if p.variable:
-            node.prepend(p.variable)
+            node.append(p.variable)
 
         return node
 
@@ -163,20 +183,24 @@ class DLParser(Parser):
         """Implement the <block> production."""
         return p.statementlist
 
-    # <statementlist> ::= <statement> | <statement> ; <statementlist>
+    # <statementlist> ::= <statement> | <statementlist> ; <statement>
 
     @_('statement')
     def statementlist(self, p):
         """Implement the <statementlist> production alternate for a single <statement>."""
-        return Block(p.statement)
+        return self.nodes.Block(p.statement)
 
-    @_('statement SEMICOLON statementlist')
+    @_('statementlist SEMICOLON statement')
     def statementlist(self, p):
-        """Implement the <statementlist> production alternate for a sequence of <statement>s."""
+        """Implement the <statementlist> production alternate for a sequence of <statement>s.
+
+        The rule is left recursive, so each <statement> is appended as
+        soon as it is parsed and the parse stack stays shallow.
+        """
         node = p.statementlist
 
         if p.statement:
-            node.prepend(p.statement)
+            node.append(p.statement)
 
         return node
 
@@ -230,13 +254,13 @@ class DLParser(Parser):
     @_('variable ASSIGNOP expression')
     def assignment(self, p):
         """Implement the <assignment> production alternate for single variable assignment."""
-        return Assign(p.variable, p.expression)
+        return self.nodes.Assign(p.variable, p.expression)
 
     @_('variable OPENSQUARE expression CLOSESQUARE ASSIGNOP expression')
     def assignment(self, p):
         """Implement the <assignment> production alternate for array element assignment."""
-        arrayindex = ArrayIndex(p.variable, p.expression0)
-        return Assign(arrayindex, p.expression1)
+        arrayindex = self.nodes.ArrayIndex(p.variable, p.expression0)
+        return self.nodes.Assign(arrayindex, p.expression1)
 
     # <ifstatement> ::= if ( <bexpression> ) <block> else <block>
     #                 | if ( <bexpression> ) <block>
@@ -244,40 +268,40 @@ class DLParser(Parser):
     @_('IF OPENPAREN bexpression CLOSEPAREN block ELSE block')
     def ifstatement(self, p):
         """Implement the <ifstatement> production alternate with an else block."""
-        return If(p.bexpression, p.block0, p.block1)
+        return self.nodes.If(p.bexpression, p.block0, p.block1)
 
     @_('IF OPENPAREN bexpression CLOSEPAREN block')
     def ifstatement(self, p):
         """Implement the <ifstatement> production alternate without an else block."""
-        return If(p.bexpression, p.block)
+        return self.nodes.If(p.bexpression, p.block)
 
     # <whilestatement> ::= while ( <bexpression> ) <block>
 
     @_('WHILE OPENPAREN bexpression CLOSEPAREN block')
     def whilestatement(self, p):
         """Implement the <whilestatement> production."""
-        return While(p.bexpression, p.block)
+        return self.nodes.While(p.bexpression, p.block)
 
     # <printstatement> ::= print ( <expression> )
 
     @_('PRINT OPENPAREN expression CLOSEPAREN')
     def printstatement(self, p):
         """Implement the <printstatement> production."""
-        return Print(p.expression)
+        return self.nodes.Print(p.expression)
 
     # <readstatement> ::= read ( <identifier> )
 
     @_('READ OPENPAREN variable CLOSEPAREN')
     def readstatement(self, p):
         """Implement the <readstatement> production."""
-        return Read(p.variable)
+        return self.nodes.Read(p.variable)
 
     # <returnstatement> ::= return <expression>
 
     @_('RETURN expression')
     def returnstatement(self, p):
         """Implement the <returnstatement> production."""
-        return Return(p.expression)
+        return self.nodes.Return(p.expression)
 
     # <expression> ::= <expression> <addingop> <term>
     #                | <term> | <addingop> <term>
@@ -286,12 +310,12 @@ class DLParser(Parser):
     @_('expression PLUSOP expression')
     def expression(self, p):
         """Implement the <expression> production alternate for <expression> + <expression>."""
-        return BinOp("PLUSOP", p.expression0, p.expression1)
+        return self.nodes.BinOp("PLUSOP", p.expression0, p.expression1)
 
     @_('expression MINUSOP expression')
     def expression(self, p):
         """Implement the <expression> production alternate for <expression> - <expression>."""
-        return BinOp("MINUSOP", p.expression0, p.expression1)
+        return self.nodes.BinOp("MINUSOP", p.expression0, p.expression1)
 
     # <term> ::= <term> <multop> <factor> | <factor>
     # <multop> ::= * | /
@@ -303,7 +327,7 @@ class DLParser(Parser):
         Because precedence for the operators is defined, we don't need
         a separate <term> rule.
         """
-        return BinOp("MULTIPLYOP", p.expression0, p.expression1)
+        return self.nodes.BinOp("MULTIPLYOP", p.expression0, p.expression1)
 
     @_('expression DIVIDEOP expression')
     def expression(self, p):
@@ -312,7 +336,7 @@ class DLParser(Parser):
         Because precedence for the operators is defined, we don't need
         a separate <term> rule.
         """
-        return BinOp("DIVIDEOP", p.expression0, p.expression1)
+        return self.nodes.BinOp("DIVIDEOP", p.expression0, p.expression1)
 
 
     # <factor> ::= <constant> | <identifier>
@@ -333,7 +357,7 @@ class DLParser(Parser):
     @_('INTCONSTANT')
     def constant(self, p):
         """Implement the <constant> production for integer constants."""
-        return Integer(int(p.INTCONSTANT))
+        return self.nodes.Integer(int(p.INTCONSTANT))
 
     @_('variable')
     def expression(self, p):
@@ -347,12 +371,12 @@ class DLParser(Parser):
     @_('IDENTIFIER')
     def variable(self, p):
         """Implement a <variable> production, because we keep reusing it."""
-        return Variable(p.IDENTIFIER)
+        return self.nodes.Variable(p.IDENTIFIER)
 
     @_('variable OPENSQUARE expression CLOSESQUARE')
     def expression(self, p):
         """Implement the <expression> production alternate for array element read."""
-        return ArrayIndex(p.variable, p.expression)
+        return self.nodes.ArrayIndex(p.variable, p.expression)
 
     @_('OPENPAREN expression CLOSEPAREN')
     def expression(self, p):
@@ -366,12 +390,12 @@ class DLParser(Parser):
     @_('IDENTIFIER OPENPAREN arguments CLOSEPAREN')
     def expression(self, p):
         """Implement the <expression> production alternate for a function call with arguments."""
-        return FunctionCall(p.IDENTIFIER, p.arguments)
+        return self.nodes.FunctionCall(p.IDENTIFIER, p.arguments)
 
     @_('IDENTIFIER OPENPAREN CLOSEPAREN')
     def expression(self, p):
         """Implement the <expression> production alternate for a function call without arguments."""
-        return FunctionCall(p.IDENTIFIER)
+        return self.nodes.FunctionCall(p.IDENTIFIER)
 
 
     # <bexpression> ::= <expression> <relop> <expression>
@@ -380,47 +404,47 @@ class DLParser(Parser):
     @_('expression LEOP expression')
     def bexpression(self, p):
         """Implement the <bexpression> alternate for <expression> <= <expression>."""
-        return RelOp("LEOP", p.expression0, p.expression1)
+        return self.nodes.RelOp("LEOP", p.expression0, p.expression1)
 
     @_('expression LTOP expression')
     def bexpression(self, p):
         """Implement the <bexpression> alternate for <expression> < <expression>."""
-        return RelOp("LTOP", p.expression0, p.expression1)
+        return self.nodes.RelOp("LTOP", p.expression0, p.expression1)
 
     @_('expression GEOP expression')
     def bexpression(self, p):
         """Implement the <bexpression> alternate for <expression> >= <expression>."""
-        return RelOp("GEOP", p.expression0, p.expression1)
+        return self.nodes.RelOp("GEOP", p.expression0, p.expression1)
 
     @_('expression GTOP expression')
     def bexpression(self, p):
         """Implement the <bexpression> alternate for <expression> < <expression>."""
-        return RelOp("GTOP", p.expression0, p.expression1)
+        return self.nodes.RelOp("GTOP", p.expression0, p.expression1)
 
     @_('expression EQOP expression')
     def bexpression(self, p):
         """Implement the <bexpression> alternate for <expression> == <expression>."""
-        return RelOp("EQOP", p.expression0, p.expression1)
+        return self.nodes.RelOp("EQOP", p.expression0, p.expression1)
 
     @_('expression NEOP expression')
     def bexpression(self, p):
         """Implement the <bexpression> alternate for <expression> != <expression>."""
-        return RelOp("NEOP", p.expression0, p.expression1)
+        return self.nodes.RelOp("NEOP", p.expression0, p.expression1)
 
-    # <arguments> ::= <expression> | <expression> , <arguments>
+    # <arguments> ::= <expression> | <arguments> , <expression>
 
     @_('expression')
     def arguments(self, p):
         """Implement the <arguments> production alternate for a single argument."""
-        return Arguments(p.expression)
+        return self.nodes.Arguments(p.expression)
 
-    @_('expression COMMA arguments')
+    @_('arguments COMMA expression')
     def arguments(self, p):
         """Implement the <arguments> production alternate for a sequence of arguments."""
         node = p.arguments
 
         if p.expression:
-            node.prepend(p.expression)
+            node.append(p.expression)
 
         return node
 
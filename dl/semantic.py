@@ -5,15 +5,22 @@ from dl.ast import Variable, ArrayIndex
 class DLSemanticAnalyzer(ASTVisitor):
     """Run semantic analysis on an AST.
 
-    Traverse an abstract syntax tree (AST) with recursive descent, and
-    analyze each node to check that all symbols are declared, and
-    types are checked.
+    Traverse an abstract syntax tree (AST) depth first, and analyze
+    each node to check that all symbols are declared, and types are
+    checked. Handlers yield the child nodes to analyze (see ASTVisitor).
+
+    Each Variable, ArrayIndex and FunctionCall node, each declared
+    variable and array, and each function argument, is bound to the
+    symbol it refers to in node.symbol, so later passes need no name
+    lookups: DLGenerator keeps the value of each local by its symbol.
+    Symbol.binding gives the (scope depth, slot) pair of the symbol.
 
     Attributes:
         st -- symbol table for the program
     """
-    def __init__(self):
-        self.st = SymbolTable()
+    def __init__(self, names=None):
+        # names is the NameTable the lexer interned identifiers in
+        self.st = SymbolTable(names)
 
     def analyze(self, program):
         """Begin semantic analysis on the top-level node."""
@@ -32,25 +39,35 @@ class DLSemanticAnalyzer(ASTVisitor):
         if symbol and (isinstance(symbol, VariableSymbol) or isinstance(symbol, ArgumentSymbol)):
             # set inferred type of the node to the symbol.type
             node.set_itype('int')
+            node.symbol = symbol
         else:
             raise UndeclaredVariableError("Symbol not found or just isn't a VariableSymbol or ArgumentSymbol")
 
     def visit_ArrayIndex(self, node):
         """Call the semantic analyzer for ArrayIndex AST nodes."""
+        self.find_ArrayIndex(node)
+        yield node.index
+
+    def find_ArrayIndex(self, node):
+        """Look up the array indexed by an ArrayIndex node."""
         # lookup the node.var.name in the symbol table
         symbol = self.st.find_symbol(node.var.name)
         # if the symbol is found and its an array symbol
         if symbol and isinstance(symbol, ArraySymbol):
             node.set_itype(symbol.type)
+            node.symbol = symbol
         else:
             raise UndeclaredVariableError("Symbol not found or just isn't an ArraySymbol")
 
     # same as visit_assignOp
     def visit_BinOp(self, node):
         """Call the semantic analyzer for BinOp AST nodes."""
-        self.visit(node.left)
-        self.visit(node.right)
+        yield node.left
+        yield node.right
+        self.check_BinOp(node)
 
+    def check_BinOp(self, node):
+        """Check the types of the arguments of a BinOp node."""
         # Check the types of the two arguments.
         if (node.left.itype == 'int') and (node.right.itype == 'int'):
             node.set_itype('int')
@@ -59,9 +76,12 @@ class DLSemanticAnalyzer(ASTVisitor):
 
     def visit_RelOp(self, node):
         """Call the semantic analyzer for RelOp AST nodes."""
-        self.visit(node.left)
-        self.visit(node.right)
+        yield node.left
+        yield node.right
+        self.check_RelOp(node)
 
+    def check_RelOp(self, node):
+        """Check the types of the arguments of a RelOp node."""
         # Check the types of the two arguments.
         valid_types = ['int', 'bool']
         if (node.left.itype in valid_types) and (node.right.itype in valid_types):
@@ -71,31 +91,44 @@ class DLSemanticAnalyzer(ASTVisitor):
 
     def visit_FunctionCall(self, node):
         """Call the semantic analyzer for FunctionCall AST nodes."""
+        self.find_FunctionCall(node)
+        if node.args:
+            yield node.args
+        self.check_FunctionCall(node)
+
+    def find_FunctionCall(self, node):
+        """Look up the function called by a FunctionCall node."""
         # look up the node.name in the symbol table
         nodeName = self.st.find_symbol(node.name)
         # if the symbol is found
         if nodeName and isinstance(nodeName, FunctionSymbol):
             node.set_itype('int')
+            node.symbol = nodeName
         else:
             raise UndeclaredFunctionError("Symbol not found, or the symbol isn't a FunctionSymbol")
+
+    def check_FunctionCall(self, node):
+        """Check the number of arguments of a FunctionCall node."""
         # node.args might be undefined so first instantiate a count variable to zero and compare
         count = 0
         if node.args:
             count = node.args.count()
-            self.visit(node.args)
-        if count != nodeName.args:
+        if count != node.symbol.args:
             raise UndeclaredFunctionError("Number of arguments in the function call isn't the same ")
 
     def visit_Arguments(self, node):
         """Call the semantic analyzer for Arguments AST nodes."""
         for argument in node.arguments:
-            self.visit(argument)
+            yield argument
 
     def visit_Assign(self, node):
         """Call the semantic analyzer for Assign AST nodes."""
-        self.visit(node.left)
-        self.visit(node.right)
+        yield node.left
+        yield node.right
+        self.check_Assign(node)
 
+    def check_Assign(self, node):
+        """Check the types of the arguments of an Assign node."""
         # Check the types of the two arguments.
         if node.left.itype == 'int' and node.right.itype == 'int':
             node.set_itype('int')
@@ -104,36 +137,37 @@ class DLSemanticAnalyzer(ASTVisitor):
 
     def visit_Print(self, node):
         """Call the semantic analyzer for Print AST nodes."""
-        self.visit(node.arg)
+        yield node.arg
 
     def visit_Read(self, node):
         """Call the semantic analyzer for Read AST nodes."""
-        self.visit(node.result)
+        yield node.result
 
     def visit_Return(self, node):
         """Call the semantic analyzer for Return AST nodes."""
-        self.visit(node.result)
+        yield node.result
 
     def visit_If(self, node):
         """Call the semantic analyzer for If AST nodes."""
-        self.visit(node.condition)
-        self.visit(node.body_true)
-        self.visit(node.body_else)
+        yield node.condition
+        yield node.body_true
+        if node.body_else:
+            yield node.body_else
 
     def visit_While(self, node):
         """Call the semantic analyzer for While AST nodes."""
-        self.visit(node.condition)
-        self.visit(node.body)
+        yield node.condition
+        yield node.body
 
     def visit_Block(self, node):
         """Call the semantic analyzer for Block AST nodes."""
         for statement in node.statements:
-            self.visit(statement)
+            yield statement
 
     def visit_Declarations(self, node):
         """Call the semantic analyzer for Declarations AST nodes."""
         for declaration in node.declarations:
-            self.visit(declaration)
+            yield declaration
 
     def visit_VariableDeclarations(self, node):
         """Call the semantic analyzer for VariableDeclarations AST nodes."""
@@ -143,16 +177,26 @@ class DLSemanticAnalyzer(ASTVisitor):
             # check if the type of each declaration is 'variable' or 'arrayindex'
             if isinstance(variable, Variable):
                 # if the declaration is a variable, add symbol to the symbol table
-                self.st.add_var_symbol(variable.name, 'int')
+                variable.symbol = self.st.add_var_symbol(variable.name, 'int')
             elif isinstance(variable, ArrayIndex):
                 # if the declaration is an ArrayIndex, add a symbol to the symbol table
-                self.st.add_array_symbol(variable.var.name, 'int', variable.index)
+                variable.symbol = self.st.add_array_symbol(variable.var.name, 'int', variable.index)
             else:
                 raise TypeCheckError("declaration isn't a variable or array index")
 
     def visit_FunctionDeclaration(self, node):
         """Call the semantic analyzer for FunctionDeclaration AST nodes."""
+        self.enter_FunctionDeclaration(node)
+        # if there are any variable declarations for the function
+        if node.vars:
+            yield node.vars
+        yield node.body
+        # exit the scope for the function
+        self.st.exit_scope()
 
+    def enter_FunctionDeclaration(self, node):
+        """Declare the function of a FunctionDeclaration node, and enter
+        its scope with the arguments declared."""
         arg_count = 0
         if node.args:
             arg_count = node.args.count()
@@ -163,20 +207,14 @@ class DLSemanticAnalyzer(ASTVisitor):
         # iterate through the args, and add each one to the symbol table
         if node.args: # ensure node.args exists
             for argument in node.args.arguments:
-                self.st.add_arg_symbol(argument.name, ArgumentSymbol)
-        # if there are any variable declarations for the function
-        if node.vars:
-            self.visit(node.vars)
-        self.visit(node.body)
-        # exit the scope for the function
-        self.st.exit_scope()
+                argument.symbol = self.st.add_arg_symbol(argument.name, ArgumentSymbol)
 
     def visit_Program(self, node):
         """Call the semantic analyzer for Program AST nodes."""
         self.st.enter_scope()
         if node.declarations:
-            self.visit(node.declarations)
-        self.visit(node.body)
+            yield node.declarations
+        yield node.body
         self.st.exit_scope()
 
 class SemanticError(Exception):
@@ -1,18 +1,34 @@
+from dl.names import Name, NameTable
+
 class SymbolTable:
     """Class for managing program symbols
 
+    Symbol names are interned in a NameTable. When it is the table
+    DLLexer interned the identifiers in, every use of a name is the
+    same Name object as its declaration, so lookups hash nothing and
+    compare by identity. Scopes key their symbols by name ID.
+
+    Besides the scopes, the table keeps the innermost visible symbol of
+    each name in a single dict, so a symbol is found with one lookup
+    however deep the scope it is declared in. Symbols shadowed by a
+    declaration are restored when its scope is left.
+
     Attributes:
         scopes -- a tree of nested scopes
         current -- the current scope object
+        names -- the NameTable of the symbol names
+        visible -- the symbol each name refers to in the current scope
     """
-    def __init__(self):
+    def __init__(self, names=None):
         self.current = None
         self.scopes = None
+        self.names = NameTable() if names is None else names
+        self.visible = {}
 
     def enter_scope(self):
         """Start a new scope"""
         parent = self.current
-        new_scope = Scope(parent)
+        new_scope = Scope(parent, self.names)
         self.current = new_scope
 
         # Store the top node of the nested scopes
@@ -21,28 +37,40 @@ class SymbolTable:
 
     def exit_scope(self):
         """Leave current scope"""
+        visible = self.visible
+        for name, symbol in reversed(self.current.shadowed):
+            if symbol:
+                visible[name] = symbol
+            else:
+                del visible[name]
         parent = self.current.parent
         self.current = parent
 
+    def declare(self, symbol):
+        """Add symbol to the current scope, and make it visible"""
+        name = symbol.name
+        if name.__class__ is not Name or name.table is not self.names:
+            name = self.names.intern(name)
+        self.current.shadowed.append((name, self.visible.get(name)))
+        self.current.add_symbol(symbol, name.id)
+        self.visible[name] = symbol
+        return symbol
+
     def add_var_symbol(self, symbol_name, symbol_type):
-        """Add a variable symbol to the current scope"""
-        symbol = VariableSymbol(symbol_name, symbol_type)
-        self.current.add_symbol(symbol)
+        """Add a variable symbol to the current scope, and return it"""
+        return self.declare(VariableSymbol(symbol_name, symbol_type))
 
     def add_arg_symbol(self, symbol_name, symbol_type):
-        """Add an argument symbol to the current scope"""
-        symbol = ArgumentSymbol(symbol_name, symbol_type)
-        self.current.add_symbol(symbol)
+        """Add an argument symbol to the current scope, and return it"""
+        return self.declare(ArgumentSymbol(symbol_name, symbol_type))
 
     def add_array_symbol(self, symbol_name, symbol_type, size):
-        """Add an array symbol to the current scope"""
-        symbol = ArraySymbol(symbol_name, symbol_type, size)
-        self.current.add_symbol(symbol)
+        """Add an array symbol to the current scope, and return it"""
+        return self.declare(ArraySymbol(symbol_name, symbol_type, size))
 
     def add_func_symbol(self, symbol_name, size):
-        """Add a function symbol to the current scope"""
-        symbol = FunctionSymbol(symbol_name, size)
-        self.current.add_symbol(symbol)
+        """Add a function symbol to the current scope, and return it"""
+        return self.declare(FunctionSymbol(symbol_name, size))
 
     def find_symbol(self, symbol_name):
         """Search for symbol
@@ -50,7 +78,7 @@ class SymbolTable:
 	Search current scope first, then outer scopes. Return the
         first symbol found, or false if the symbol is not found.
         """
-        return self.current.find_symbol(symbol_name)
+        return self.visible.get(symbol_name, False)
 
     def check_local(self, symbol_name):
         """Check if symbol is defined in the current scope"""
@@ -63,23 +91,41 @@ class SymbolTable:
 class Scope:
     """A single scope in the symbol table.
 
+    Each symbol added to a scope is bound to a (depth, slot) pair: the
+    depth of the scope, 0 for the outermost one, and the index of the
+    symbol in the scope's slots.
+
     Attributes:
-        symbols -- storage for symbols, indexed by name
+        symbols -- storage for symbols, indexed by name ID
+        slots -- the symbols in the order they were added
         parent -- the parent scope of the current scope, if any
-        scopes -- any nested scopes within the current scope
+        names -- the NameTable of the symbol names
+        depth -- the number of enclosing scopes
+        shadowed -- the symbols visible before each declaration in the
+                    scope, as (name, symbol or None) pairs
     """
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, names=None):
         self.parent = parent
+        self.names = NameTable() if names is None else names
+        self.depth = parent.depth + 1 if parent else 0
         self.symbols = {}
-
-    def add_symbol(self, symbol):
-        """Add a symbol to the scope"""
-        self.symbols[symbol.name] = symbol
+        self.slots = []
+        self.shadowed = []
+
+    def add_symbol(self, symbol, name_id=None):
+        """Add a symbol to the scope, and bind it to its slot"""
+        if name_id is None:
+            name_id = self.names.intern(symbol.name).id
+        symbol.depth = self.depth
+        symbol.slot = len(self.slots)
+        self.slots.append(symbol)
+        self.symbols[name_id] = symbol
 
     def get_symbol(self, symbol_name):
         """Retrieve a symbol from the scope"""
-        if symbol_name in self.symbols:
-            return self.symbols[symbol_name]
+        name = self.names.by_text.get(symbol_name)
+        if name is not None and name.id in self.symbols:
+            return self.symbols[name.id]
         else:
             return False
 
@@ -103,7 +149,22 @@ class Scope:
         # No symbol was found in any parent scope.
         return False
 
-class VariableSymbol:
+class Symbol:
+    """Base class for the symbols in the symbol table.
+
+    Attributes:
+        depth -- the depth of the scope the symbol was added to
+        slot -- the index of the symbol in the slots of that scope
+    """
+    depth = None
+    slot = None
+
+    @property
+    def binding(self):
+        """The (depth, slot) pair of the symbol."""
+        return (self.depth, self.slot)
+
+class VariableSymbol(Symbol):
     """A variable symbol in the symbol table.
 
     Attributes:
@@ -114,7 +175,7 @@ class VariableSymbol:
         self.name = name
         self.type = symbol_type
 
-class ArgumentSymbol:
+class ArgumentSymbol(Symbol):
     """An argument symbol in the symbol table.
 
     Attributes:
@@ -125,7 +186,7 @@ class ArgumentSymbol:
         self.name = name
         self.type = symbol_type
 
-class ArraySymbol:
+class ArraySymbol(Symbol):
     """An array symbol in the symbol table.
 
     Attributes:
@@ -138,7 +199,7 @@ class ArraySymbol:
         self.type = element_type
         self.size = size
 
-class FunctionSymbol:
+class FunctionSymbol(Symbol):
     """A function symbol in the symbol table.
 
     Attributes:
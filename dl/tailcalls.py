@@ -0,0 +1,206 @@
+import gc
+
+from dl.ir import Constant, BasicBlock, Alloca, BinaryOperator, Call, Phi, Branch, Return
+from dl.deadcode import is_pure
+
+# The operations a recursive call can be accumulated with, as they are
+# associative and commutative, with the value that changes nothing
+ACCUMULATORS = {'add': 0, 'mul': 1}
+
+class TailCallElimination:
+    """Turn the recursive calls of functions that return their value,
+    or their value added to or multiplied by another, into loops.
+
+    DL has no for statement, so loops are often written as recursive
+    functions, and every level of the recursion takes a stack frame:
+
+        fact(n); { if (n < 2) { return 1 }; return n * fact(n - 1) }
+
+    This pass finds the calls of a function by itself whose value is
+    returned, directly or as the other operand of an add or mul, and
+    replaces each with a branch back to the top of the function. The
+    arguments become phis of the old entry block, with the values
+    passed by the calls. For calls whose value is added or multiplied
+    by, an accumulator phi starts with 0 or 1 and is added to or
+    multiplied by the other operand instead, and every other return
+    returns the accumulated value with its own. Allocas are moved to a
+    new entry block, so the loop takes no stack, and the function runs
+    in constant stack space if all its recursive calls are replaced.
+
+    The pass is best run after Mem2Reg, when a value stored in a
+    variable and returned, as in r = n * fact(n - 1); return r, is a
+    phi of the block that returns it: the return is copied into the
+    blocks that compute the value from a recursive call, where the
+    call is then found:
+
+        module = DLGenerator().build(checked)
+        Mem2Reg().run(module)
+        TailCallElimination().run(module)
+
+    Between the call and the return there may only be the add or mul,
+    and code that does not use the value of the call, like loads. The
+    calls with another operation than the first call with an
+    accumulator in the function stay calls.
+
+    Attributes:
+        tail_calls -- the number of calls returned directly replaced
+        accumulator_calls -- the number of calls accumulated replaced
+        functions -- the names of the functions turned into loops
+    """
+    def __init__(self):
+        self.tail_calls = 0
+        self.accumulator_calls = 0
+        self.functions = []
+
+    def run(self, module):
+        """Eliminate the recursive tail calls of every function of
+        module, and return it.
+
+        The garbage collector is paused meanwhile, as in DLGenerator.build.
+        """
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for function in module.functions:
+                if function.blocks:
+                    self.run_on_function(function)
+        finally:
+            if enabled:
+                gc.enable()
+        return module
+
+    def run_on_function(self, function):
+        """Turn the recursive tail calls of a function into a loop."""
+        self.duplicate_returns(function)
+        sites = []
+        opcode = None
+        for block in function.blocks:
+            site = self.tail_call(function, block)
+            if site is None:
+                continue
+            operation = site[1]
+            if operation is not None:
+                if opcode is None:
+                    opcode = operation.opcode
+                elif operation.opcode != opcode:
+                    continue
+            sites.append(site)
+        if not sites:
+            return
+
+        # The old entry block is the top of the loop, and a new one
+        # allocates the variables, once
+        header = function.entry
+        header.name = "tailrecurse"
+        entry = BasicBlock("entry")
+        entry.function = function
+        function.blocks.insert(0, entry)
+        for instruction in [instruction for instruction in header.instructions
+                            if instruction.__class__ is Alloca]:
+            header.instructions.remove(instruction)
+            entry.append(instruction)
+        entry.append(Branch(header))
+
+        phis = []
+        for index, argument in enumerate(function.args):
+            phi = header.insert(index, Phi(argument.type, argument.name + ".tr"))
+            argument.replace_all_uses_with(phi)
+            phi.add_incoming(argument, entry)
+            phis.append(phi)
+        accumulator = None
+        if opcode is not None:
+            accumulator = header.insert(len(phis), Phi(function.type, "accumulator.tr"))
+            accumulator.add_incoming(function.module.constant(ACCUMULATORS[opcode]), entry)
+            # The other returns return what was accumulated with their value
+            for block in function.blocks:
+                terminator = block.terminator
+                if terminator.__class__ is not Return or any(site[2] is terminator for site in sites):
+                    continue
+                value = terminator.operands[0]
+                if value.__class__ is Constant and value.value == ACCUMULATORS[opcode]:
+                    result = accumulator
+                else:
+                    result = block.insert(len(block.instructions) - 1,
+                                          BinaryOperator(opcode, accumulator, value,
+                                                         "accumulated.tr.%d" % len(accumulator.uses)))
+                terminator.set_operand(0, result)
+
+        for call, operation, ret in sites:
+            block = call.block
+            for phi, value in zip(phis, call.operands[1:]):
+                phi.add_incoming(value, block)
+            if operation is None:
+                self.tail_calls += 1
+                if accumulator is not None:
+                    accumulator.add_incoming(accumulator, block)
+            else:
+                self.accumulator_calls += 1
+                other = operation.operands[1] if operation.operands[0] is call else operation.operands[0]
+                accumulated = block.insert(block.instructions.index(operation),
+                                           BinaryOperator(opcode, accumulator, other, operation.name + ".tr"))
+                accumulator.add_incoming(accumulated, block)
+            ret.erase()
+            if operation is not None:
+                operation.erase()
+            call.erase()
+            block.append(Branch(header))
+        self.functions.append(function.name)
+
+    def duplicate_returns(self, function):
+        """Return from the blocks that branch to a block returning a phi
+        of the value of a recursive call they compute, instead."""
+        for block in list(function.blocks):
+            ret = block.terminator
+            if ret.__class__ is not Return:
+                continue
+            phi = ret.operands[0]
+            if block.instructions != [phi, ret] or phi.__class__ is not Phi or len(phi.uses) != 1:
+                continue
+            for value, predecessor in list(zip(phi.operands, phi.blocks)):
+                branch = predecessor.terminator
+                if len(branch.operands) != 1 or not self.is_recursive(function, value, predecessor):
+                    continue
+                branch.erase()
+                predecessor.append(Return(value))
+                phi.remove_incoming(predecessor)
+            if not phi.operands:
+                ret.erase()
+                phi.erase()
+                function.blocks.remove(block)
+
+    def is_recursive(self, function, value, block):
+        """Check if value is a call of function in block, or an add or
+        mul in block of one."""
+        if value.__class__ is BinaryOperator and value.opcode in ACCUMULATORS and value.block is block:
+            return any(self.is_recursive(function, operand, block) for operand in value.operands)
+        return value.__class__ is Call and value.operands[0] is function and value.block is block
+
+    def tail_call(self, function, block):
+        """Return the recursive call of a block whose value the block
+        returns, the add or mul returned with it or None, and the
+        return, or None if the block has no such call."""
+        ret = block.terminator
+        if ret.__class__ is not Return:
+            return None
+        value = ret.operands[0]
+        operation = None
+        if (value.__class__ is BinaryOperator and value.opcode in ACCUMULATORS and value.block is block
+                and len(value.uses) == 1):
+            operation = value
+            # With two calls, as in fib(n - 1) + fib(n - 2), the later one
+            # is accumulated, and the other computed before it
+            calls = [operand for operand in value.operands
+                     if operand.__class__ is Call and self.is_recursive(function, operand, block)]
+            if not calls:
+                return None
+            value = max(calls, key=block.instructions.index)
+        if (value.__class__ is not Call or value.operands[0] is not function or value.block is not block
+                or len(value.uses) != 1):
+            return None
+        instructions = block.instructions
+        for instruction in instructions[instructions.index(value) + 1:-1]:
+            if instruction is operation:
+                continue
+            if not is_pure(instruction) or value in instruction.operands:
+                return None
+        return value, operation, ret
@@ -0,0 +1,151 @@
+import gc
+
+from dl.ir import Constant, Load, Store, GetElementPtr, BinaryOperator, ICmp, Call, drop_all
+
+# Operations that give the same value with their operands swapped
+COMMUTATIVE = {'add', 'mul', 'eq', 'ne'}
+
+def base_object(pointer):
+    """Return the alloca or other value a pointer points into."""
+    while pointer.__class__ is GetElementPtr:
+        pointer = pointer.operands[0]
+    return pointer
+
+def may_alias(first, second):
+    """Check if two pointers may point to the same memory.
+
+    Pointers into different objects never do, and neither do element
+    pointers of the same array with different constant indices.
+    """
+    if first is second:
+        return True
+    if base_object(first) is not base_object(second):
+        return False
+    if first.__class__ is GetElementPtr and second.__class__ is GetElementPtr:
+        for index, other in zip(first.operands[1:], second.operands[1:]):
+            if (index.__class__ is Constant and other.__class__ is Constant
+                    and index.value != other.value):
+                return False
+    return True
+
+class LocalValueNumbering:
+    """Remove the redundant computations in each basic block.
+
+    DLGenerator emits a new load for every use of a variable, and a new
+    getelementptr and load for every use of an array element, so in
+    a = b + b * b, %b is loaded three times. This pass numbers the
+    values computed in a block by the operation and its operands, and
+    replaces an instruction computing a value already available by that
+    value:
+
+        module = DLGenerator().build(checked)
+        LocalValueNumbering().run(module)
+
+    Arithmetic, comparisons and element pointers are reused for the rest
+    of the block. Loads are reused, and a store makes the value stored
+    available to the loads after it, until a store to memory that may
+    be the same, or a call, as to a function or to scanf for read,
+    makes them stale. The analysis starts afresh in every block.
+
+    Attributes:
+        removed -- count of the instructions removed, by opcode
+        counts -- map from the name of each function to the number of
+                  its instructions, before and after the pass
+    """
+    def __init__(self):
+        self.removed = {}
+        self.counts = {}
+
+    def run(self, module):
+        """Number the values of every function of module, and return it.
+
+        The garbage collector is paused meanwhile, as in DLGenerator.build.
+        """
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for function in module.functions:
+                if function.blocks:
+                    self.run_on_function(function)
+        finally:
+            if enabled:
+                gc.enable()
+        return module
+
+    def removed_count(self):
+        """Return the total number of instructions removed."""
+        return sum(self.removed.values())
+
+    def count_removed(self, opcode, count=1):
+        """Count removed instructions with the given opcode."""
+        self.removed[opcode] = self.removed.get(opcode, 0) + count
+
+    def run_on_function(self, function):
+        """Number the values of each block of a function."""
+        before = 0
+        removed = set()
+        for block in function.blocks:
+            before += len(block.instructions)
+            self.run_on_block(block, removed)
+
+        drop_all(removed)
+        self.counts[function.name] = (before, before - len(removed))
+
+    def run_on_block(self, block, removed):
+        """Replace the instructions of a block that compute a value
+        computed before in the block, adding them to removed."""
+        values = {}
+        # The value in memory at each pointer, by the object pointed into
+        memory = {}
+        kept = []
+        for instruction in block.instructions:
+            instruction_class = instruction.__class__
+            if instruction_class is Load:
+                pointer = instruction.operands[0]
+                known = memory.setdefault(base_object(pointer), {})
+                value = known.get(pointer)
+                if value is None:
+                    known[pointer] = instruction
+                else:
+                    self.replace(instruction, value, "load", removed)
+                    continue
+            elif instruction_class is Store:
+                value, pointer = instruction.operands
+                known = memory.setdefault(base_object(pointer), {})
+                for other in [other for other in known if may_alias(other, pointer)]:
+                    del known[other]
+                known[pointer] = value
+            elif instruction_class is Call:
+                memory.clear()
+            elif instruction_class in (BinaryOperator, ICmp, GetElementPtr):
+                key = self.key(instruction)
+                value = values.get(key)
+                if value is None:
+                    values[key] = instruction
+                else:
+                    self.replace(instruction, value, instruction.opcode, removed)
+                    continue
+            kept.append(instruction)
+        if len(kept) != len(block.instructions):
+            block.instructions = kept
+
+    def key(self, instruction):
+        """Return the operation and operands an instruction computes its
+        value from, the same for instructions computing the same value."""
+        instruction_class = instruction.__class__
+        if instruction_class is BinaryOperator:
+            operation = instruction.opcode
+        elif instruction_class is ICmp:
+            operation = instruction.predicate
+        else:
+            operation = "getelementptr"
+        operands = instruction.operands
+        if operation in COMMUTATIVE and id(operands[0]) > id(operands[1]):
+            operands = operands[::-1]
+        return (instruction_class, operation) + tuple(operands)
+
+    def replace(self, instruction, value, opcode, removed):
+        """Replace an instruction by the value it computes again."""
+        instruction.replace_all_uses_with(value)
+        removed.add(instruction)
+        self.count_removed(opcode)
@@ -1,13 +1,134 @@
+from types import GeneratorType
+
+from dl.ast import ASTNode
+
 class ASTVisitor:
     """Generic base class for visitor pattern.
 
-    Classes that traverse the AST inherit from this base class.
+    Classes that traverse the AST inherit from this base class, and
+    define a visit_<class name> handler for each kind of node. A handler
+    is either a plain method that returns its result, or a generator
+    that yields each child node it wants visited and receives the
+    child's result back from the yield:
+
+        def visit_BinOp(self, node):
+            left = yield node.left
+            right = yield node.right
+            return left + right
+
+    Code before the first yield runs in pre-order, code between yields
+    in-order, and code after the last yield in post-order.
+
+    visit() keeps suspended handlers on an explicit stack instead of
+    nesting Python calls, so deep trees, like a long chain of additions
+    or deeply nested if statements, do not hit the recursion limit.
+    An exception raised while visiting a child is thrown into the
+    handler that yielded it, as if the child had been visited with a
+    call.
+
+    Each visitor class gets a dispatch table from node class to handler
+    function when it is created, so nodes are dispatched with a dict
+    lookup instead of building and looking up the handler name. Node
+    classes dispatch on their own name, so a subclass like RelOp(BinOp)
+    goes to visit_RelOp, and to missing() if there is none. Node
+    classes created after the visitor class are added to the table the
+    first time they are visited; handlers must be defined in the class
+    body.
+
+    Attributes:
+        handlers -- map from node class to handler function, per class
     """
+    handlers = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.handlers = {}
+        node_classes = [ASTNode]
+        while node_classes:
+            node_class = node_classes.pop()
+            cls.add_handler(node_class)
+            node_classes.extend(node_class.__subclasses__())
+
+    @classmethod
+    def add_handler(cls, node_class):
+        """Add the handler for nodes of node_class to the dispatch table."""
+        handler = getattr(cls, 'visit_' + node_class.__name__, cls.missing)
+        cls.handlers[node_class] = handler
+        return handler
+
     def visit(self, node):
-        """Call the generator for the node."""
-        method = 'visit_' + node.__class__.__name__
-        visitor = getattr(self, method, self.missing)
-        return visitor(node)
+        """Visit node and return the result of its handler."""
+        result = self.dispatch(node)
+        if type(result) is not GeneratorType:
+            return result
+
+        handlers = self.handlers
+        stack = [result]
+        push = stack.append
+        pop = stack.pop
+        handler = result
+        value = None
+        error = None
+        while True:
+            try:
+                if error is None:
+                    child = handler.send(value)
+                else:
+                    error, exc = None, error
+                    child = handler.throw(exc)
+            except StopIteration as stop:
+                pop()
+                if not stack:
+                    return stop.value
+                handler = stack[-1]
+                value = stop.value
+                continue
+            except Exception as exc:
+                pop()
+                if not stack:
+                    raise
+                handler = stack[-1]
+                error = exc
+                continue
+
+            try:
+                node_class = child.__class__
+                if node_class in handlers:
+                    result = handlers[node_class](self, child)
+                else:
+                    result = self.add_handler(node_class)(self, child)
+            except Exception as exc:
+                error = exc
+                continue
+            if type(result) is GeneratorType:
+                push(result)
+                handler = result
+                value = None
+            else:
+                value = result
+
+    def visit_recursive(self, node):
+        """Visit node like visit(), with a Python call for each child.
+
+        This is the traditional recursive traversal, limited by the
+        recursion limit. It is kept for comparison and debugging.
+        """
+        result = self.dispatch(node)
+        if type(result) is not GeneratorType:
+            return result
+        try:
+            child = next(result)
+            while True:
+                child = result.send(self.visit_recursive(child))
+        except StopIteration as stop:
+            return stop.value
+
+    def dispatch(self, node):
+        """Call the handler for node, without visiting its children."""
+        handler = self.handlers.get(node.__class__)
+        if handler is None:
+            handler = self.add_handler(node.__class__)
+        return handler(self, node)
 
     def missing(self, node):
         """Called if no explicit generator exists for a node."""
@@ -1,32 +1,156 @@
+import os
 import sys
+import argparse
 
 from dl.lexer import DLLexer
 from dl.parser import DLParser
 from dl.semantic import DLSemanticAnalyzer
 from dl.generator import DLGenerator
+from dl.fused import DLFusedGenerator
+from dl.folding import DLConstantFolder
+from dl.mem2reg import Mem2Reg
+from dl.valuenumbering import LocalValueNumbering
+from dl.deadcode import DeadCodeElimination
+from dl.bounds import BoundsCheckElimination
+from dl.inline import Inliner, DEFAULT_THRESHOLD
+from dl.licm import LoopInvariantCodeMotion
+from dl.induction import StrengthReduction
+from dl.tailcalls import TailCallElimination
 
-if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        sys.exit("usage: generator.py <filename>")
-    filename = sys.argv[1]
+# Parse loops of DLParser that can be selected with --parser
+PARSE_METHODS = {
+    'table': 'parse',
+    'dense': 'parse_dense',
+    'direct': 'parse_direct',
+    }
+
+def format_counts(counts):
+    """Format a map from opcode to instruction count for a report."""
+    return ", ".join("%s %d" % item for item in sorted(counts.items())) or "none"
 
-    infile = open(filename, "r")
-    text = infile.read()
-    infile.close()
-    text.rstrip()
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(prog='generator.py')
+    argparser.add_argument('filename')
+    argparser.add_argument('--parser', choices=sorted(PARSE_METHODS), default='table',
+                           help='parse loop to use (default: table)')
+    argparser.add_argument('--fused', action='store_true',
+                           help='run semantic analysis and code generation in a single pass')
+    argparser.add_argument('--fold', action='store_true',
+                           help='fold constant expressions before generating code')
+    argparser.add_argument('--inline', action='store_true',
+                           help='replace the calls of small functions by their code')
+    argparser.add_argument('--inline-threshold', type=int, default=DEFAULT_THRESHOLD, metavar='COST',
+                           help='the largest cost of a call --inline inlines (default: %d)' % DEFAULT_THRESHOLD)
+    argparser.add_argument('--mem2reg', action='store_true',
+                           help='promote scalar variables from memory to SSA registers')
+    argparser.add_argument('--tail-calls', action='store_true',
+                           help='turn recursive calls whose value is returned into loops'
+                           ' (best after --mem2reg)')
+    argparser.add_argument('--licm', action='store_true',
+                           help='move the code of loops that does not change in them before the loops')
+    argparser.add_argument('--strength-reduce', action='store_true',
+                           help='replace multiplications by induction variables of loops with additions'
+                           ' (after --mem2reg)')
+    argparser.add_argument('--lvn', action='store_true',
+                           help='reuse values computed before in the same basic block')
+    argparser.add_argument('--dce', action='store_true',
+                           help='remove unreachable code, unused values and uncalled functions')
+    argparser.add_argument('--check-bounds', action='store_true',
+                           help='check array indices at run time')
+    argparser.add_argument('--eliminate-checks', action='store_true',
+                           help='remove the bounds checks that cannot fail (best after --mem2reg)')
+    args = argparser.parse_args()
+    if args.fold and args.fused:
+        argparser.error('--fold needs the separate analysis pass, and cannot be used with --fused')
+    filename = args.filename
 
-    if text:
+    # The source is memory mapped and lexed as bytes, so it is never
+    # held in memory as a whole
+    if os.path.getsize(filename):
         lexer = DLLexer()
         parser = DLParser()
-        semantic = DLSemanticAnalyzer()
-        generator = DLGenerator()
-        tokens = lexer.tokenize(text)
-        ast = parser.parse(tokens)
-        checked = semantic.analyze(ast)
-        ir = generator.generate(checked)
-        if ir:
-            outname = filename.replace(".dl", ".ll")
-            outfile = open(outname, "w")
-            outfile.write(ir)
-            outfile.close()
-            print("Wrote output file:", outname)
+        tokens = lexer.tokenize_file(filename)
+        ast = getattr(parser, PARSE_METHODS[args.parser])(tokens)
+        if args.fused:
+            def new_generator(output=None):
+                return DLFusedGenerator(lexer.names, output, check_bounds=args.check_bounds)
+        else:
+            ast = DLSemanticAnalyzer(lexer.names).analyze(ast)
+            if args.fold:
+                folder = DLConstantFolder()
+                folder.fold(ast)
+                print("Folded constants, removed %d instructions: %s" %
+                      (folder.removed_count(), format_counts(folder.removed)))
+            def new_generator(output=None):
+                return DLGenerator(output, check_bounds=args.check_bounds)
+
+        # Without passes to run on the module, it is streamed to the
+        # output file a function at a time, instead of being built whole
+        module = None
+        if (args.inline or args.mem2reg or args.tail_calls or args.eliminate_checks or args.licm or
+                args.strength_reduce or args.lvn or args.dce):
+            module = new_generator().build(ast)
+        if args.inline:
+            inliner = Inliner(args.inline_threshold)
+            inliner.run(module)
+            print("Inlined %d calls: %s" % (inliner.inlined_count(), format_counts(inliner.inlined)))
+            if inliner.refused:
+                print("  not inlined: " + format_counts(inliner.refused))
+        if args.mem2reg:
+            promoter = Mem2Reg()
+            promoter.run(module)
+            print("Promoted %d variables to registers, with %d phis, removed instructions: %s" %
+                  (promoter.promoted, promoter.phis, format_counts(promoter.removed)))
+        if args.tail_calls:
+            eliminator = TailCallElimination()
+            eliminator.run(module)
+            print("Eliminated %d tail calls and %d accumulator calls" %
+                  (eliminator.tail_calls, eliminator.accumulator_calls))
+            if eliminator.functions:
+                print("  turned into loops: " + ", ".join(eliminator.functions))
+        if args.eliminate_checks:
+            eliminator = BoundsCheckElimination()
+            eliminator.run(module)
+            print("Eliminated %d of %d bounds checks" % (eliminator.eliminated, eliminator.checks))
+        if args.licm:
+            mover = LoopInvariantCodeMotion()
+            mover.run(module)
+            print("Found %d loops, hoisted %d instructions: %s" %
+                  (mover.loops, mover.hoisted_count(), format_counts(mover.hoisted)))
+            if mover.preheaders:
+                print("  added %d preheaders" % mover.preheaders)
+        if args.strength_reduce:
+            reducer = StrengthReduction()
+            reducer.run(module)
+            print("Reduced %d multiplications, with %d phis" % (reducer.reduced, reducer.phis))
+            for function_name, header_name, count in reducer.trip_counts:
+                print("  %s: %s runs %d times" % (function_name, header_name, count))
+        if args.lvn:
+            numbering = LocalValueNumbering()
+            numbering.run(module)
+            print("Numbered values, removed %d instructions: %s" %
+                  (numbering.removed_count(), format_counts(numbering.removed)))
+            for name, (before, after) in numbering.counts.items():
+                print("  %s: %d -> %d instructions" % (name, before, after))
+        if args.dce:
+            eliminator = DeadCodeElimination()
+            eliminator.run(module)
+            print("Removed dead code, %d blocks, %d instructions: %s" %
+                  (eliminator.blocks, eliminator.removed_count(), format_counts(eliminator.removed)))
+            if eliminator.functions:
+                print("  uncalled functions: " + ", ".join(eliminator.functions))
+
+        # The IR is printed to the output file piece by piece, so its
+        # text is never held in memory as a whole
+        outname = filename.replace(".dl", ".ll")
+        try:
+            with open(outname, "w") as outfile:
+                if module is None:
+                    new_generator(outfile).generate(ast)
+                else:
+                    module.write(outfile.write)
+        except BaseException:
+            # Do not leave a partly written file behind
+            os.remove(outname)
+            raise
+        print("Wrote output file:", outname)
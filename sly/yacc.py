@@ -31,9 +31,15 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 # -----------------------------------------------------------------------------
 
+import os
 import sys
 import inspect
+import hashlib
+import importlib
+import pickle
+from array import array
 from collections import OrderedDict, defaultdict
+from operator import itemgetter
 
 __all__        = [ 'Parser' ]
 
@@ -52,6 +58,7 @@ class YaccError(Exception):
 
 ERROR_COUNT = 3                # Number of symbols that must be shifted to leave recovery mode
 MAXINT = sys.maxsize
+TABLE_VERSION = 1              # Bump whenever the layout of cached tables changes
 
 # This object is a stand-in for a logging object created by the
 # logging module.   SLY will use this by default to create things
@@ -264,6 +271,33 @@ class Production(object):
             p.lr_before = None
         return p
 
+# -----------------------------------------------------------------------------
+# class MiniProduction:
+#
+# A stripped down Production used when the parsing tables are restored from
+# a cache instead of being built from the grammar.  Only the attributes that
+# the parsing runtime needs are kept.
+#
+#       name     - Name of the production
+#       len      - Length of the production (number of symbols on right hand side)
+#       namemap  - Dict mapping symbol names to indices in the right hand side
+#       func     - Function that executes on reduce
+# -----------------------------------------------------------------------------
+
+class MiniProduction(object):
+    __slots__ = ('name', 'len', 'namemap', 'func')
+    def __init__(self, name, length, namemap, func):
+        self.name    = name
+        self.len     = length
+        self.namemap = namemap
+        self.func    = func
+
+    def __str__(self):
+        return f'{self.name} ({self.len} symbols)'
+
+    def __repr__(self):
+        return f'MiniProduction({self})'
+
 # -----------------------------------------------------------------------------
 # class LRItem
 #
@@ -1541,6 +1575,427 @@ class LRTable(object):
 
         return '\n'.join(out)
 
+# -----------------------------------------------------------------------------
+#                             == CachedLRTable ==
+#
+# LR parsing tables restored from an on-disk cache.  It provides the same
+# attributes that the parsing runtime uses from LRTable (lr_action, lr_goto,
+# lr_productions and defaulted_states), but none of the diagnostic data.
+# -----------------------------------------------------------------------------
+
+class CachedLRTable(object):
+    def __init__(self, action, goto, defaulted_states, productions):
+        self.lr_action        = action
+        self.lr_goto          = goto
+        self.defaulted_states = defaulted_states
+        self.lr_productions   = productions
+
+    @classmethod
+    def from_data(cls, data, funcs):
+        '''
+        Rebuild the tables from the plain data produced by table_data().
+        funcs is the list of reduce functions, in production order.
+        '''
+        productions = [ MiniProduction(name, plen, namemap, func)
+                        for (name, plen, namemap), func in zip(data['productions'], funcs) ]
+        return cls(data['action'], data['goto'], data['defaulted_states'], productions)
+
+    @classmethod
+    def from_module(cls, module, funcs):
+        '''
+        Rebuild the tables from a module written by write_table_module().
+        Symbols are stored there as integer codes into module._symbols.
+        '''
+        symbols = module._symbols
+        action = { state: { symbols[row[n]]: row[n+1] for n in range(0, len(row), 2) }
+                   for state, row in enumerate(module._action) }
+        goto = { state: { symbols[row[n]]: row[n+1] for n in range(0, len(row), 2) }
+                 for state, row in enumerate(module._goto) }
+        productions = [ MiniProduction(symbols[name], plen, namemap, func)
+                        for (name, plen, namemap), func in zip(module._productions, funcs) ]
+        return cls(action, goto, dict(module._defaulted_states), productions)
+
+def table_data(lrtable, signature):
+    '''
+    Return the parsing tables of lrtable as plain, picklable data.
+    '''
+    return {
+        'version': TABLE_VERSION,
+        'signature': signature,
+        'action': lrtable.lr_action,
+        'goto': lrtable.lr_goto,
+        'defaulted_states': lrtable.defaulted_states,
+        'productions': [ (p.name, p.len, p.namemap) for p in lrtable.lr_productions ],
+        }
+
+def write_table_module(lrtable, signature, filename, parsername=''):
+    '''
+    Write the parsing tables of lrtable as a standalone Python module.
+    Every grammar symbol is coded as an index into _symbols.  Each action
+    and goto row is a flat tuple of (symbol, target) pairs, and each
+    production is (name, length, namemap) where the production number
+    selects the reduce function.
+    '''
+    data = table_data(lrtable, signature)
+    nstates = len(data['action'])
+
+    terminals = set()
+    for row in data['action'].values():
+        terminals.update(row)
+    nonterminals = set()
+    for row in data['goto'].values():
+        nonterminals.update(row)
+    nonterminals.update(name for name, plen, namemap in data['productions'])
+    symbols = sorted(terminals) + sorted(nonterminals - terminals)
+    code = { sym: n for n, sym in enumerate(symbols) }
+
+    def flatten(row):
+        return tuple(value for sym in sorted(row, key=code.get)
+                     for value in (code[sym], row[sym]))
+
+    lines = [
+        '# ' + os.path.basename(filename),
+        '# This file is automatically generated by sly. Do not edit.',
+        f'# Parsing tables for {parsername}' if parsername else '# Parsing tables',
+        '',
+        f'_tabversion = {data["version"]!r}',
+        f'_signature = {data["signature"]!r}',
+        '',
+        f'_symbols = {symbols!r}',
+        '',
+        '_action = (',
+        ]
+    lines.extend(f'    {flatten(data["action"].get(state, {}))!r},' for state in range(nstates))
+    lines.append(')')
+    lines.append('')
+    lines.append('_goto = (')
+    lines.extend(f'    {flatten(data["goto"].get(state, {}))!r},' for state in range(nstates))
+    lines.append(')')
+    lines.append('')
+    lines.append(f'_defaulted_states = {sorted(data["defaulted_states"].items())!r}')
+    lines.append('')
+    lines.append('_productions = (')
+    lines.extend(f'    ({code[name]!r}, {plen!r}, {namemap!r}),  # {number}: {name}'
+                 for number, (name, plen, namemap) in enumerate(data['productions']))
+    lines.append(')')
+
+    tmpname = f'{filename}.{os.getpid()}.tmp'
+    with open(tmpname, 'w') as f:
+        f.write('\n'.join(lines))
+        f.write('\n')
+    os.replace(tmpname, filename)
+
+# -----------------------------------------------------------------------------
+#                              == DenseLRTable ==
+#
+# The parsing tables recoded with integer symbol codes in compressed dense
+# arrays, for use by Parser.parse_dense().  Terminals are coded first and
+# nonterminals after them.  Each state's action row is stored by row
+# displacement: the entry for terminal t in state s is
+#
+#       action_value[action_base[s] + t]   if action_check[...] == s
+#       action_default[s]                  otherwise
+#
+# where action_default[s] is the most common reduction of the state (its
+# default reduction) or DENSE_ERROR.  A state whose only action is its
+# default reduction has action_base[s] == -1 and never needs a lookahead.
+# Goto rows are displaced the same way by nonterminal code.  A goto is only
+# consulted right after a reduction, where the entry is known to exist, so
+# the goto table needs no check array.
+#
+# Action values keep the encoding of LRTable: > 0 shift to that state,
+# < 0 reduce by that production, 0 accept.
+# -----------------------------------------------------------------------------
+
+DENSE_ERROR = 0x7fffffff
+
+def _displace_rows(rows, width, fill):
+    '''
+    Pack sparse rows (dicts of column -> value) into one array by row
+    displacement.  Returns (base, check, value) arrays.  Rows without
+    entries get a base of -1.  Dense rows are placed first, as they are
+    the hardest to fit.  The arrays are padded so that any column below
+    width can be looked up from any base.
+    '''
+    base = array('i', [-1]) * len(rows)
+    check = array('i')
+    value = array('i')
+    used = set()
+    for n in sorted(range(len(rows)), key=lambda n: -len(rows[n])):
+        row = rows[n]
+        if not row:
+            continue
+        offset = 0
+        while offset in used or any(offset + col < len(check) and check[offset + col] >= 0
+                                    for col in row):
+            offset += 1
+        used.add(offset)
+        end = offset + max(row) + 1
+        if end > len(check):
+            check.extend([-1] * (end - len(check)))
+            value.extend([fill] * (end - len(value)))
+        for col, target in row.items():
+            check[offset + col] = n
+            value[offset + col] = target
+        base[n] = offset
+    end = max(base) + width
+    check.extend([-1] * (end - len(check)))
+    value.extend([fill] * (end - len(value)))
+    return base, check, value
+
+class DenseLRTable(object):
+    '''
+    Integer coded parsing tables built from an LRTable or CachedLRTable.
+
+    Attributes:
+    symbols -- list of grammar symbols; the index of each is its code
+    terminals -- dict mapping terminal names to codes
+    unknown -- code used for token types that are not terminals
+    action_base, action_check, action_value, action_default -- action table
+    goto_base, goto_value -- goto table
+    prod_lhs -- code of the left hand side of each production
+    prod_len -- length of the right hand side of each production
+    rules -- (func, name, len, lhs code, namemap) for each production
+    '''
+    def __init__(self, lrtable):
+        actions = lrtable.lr_action
+        gotos = lrtable.lr_goto
+        productions = lrtable.lr_productions
+        nstates = len(actions)
+
+        terminals = set()
+        for row in actions.values():
+            terminals.update(row)
+        nonterminals = { p.name for p in productions }
+        for row in gotos.values():
+            nonterminals.update(row)
+        self.symbols = sorted(terminals) + sorted(nonterminals - terminals)
+        code = { sym: n for n, sym in enumerate(self.symbols) }
+        self.terminals = { sym: code[sym] for sym in terminals }
+        self.unknown = len(terminals)
+
+        action_rows = []
+        self.action_default = array('i', [DENSE_ERROR]) * nstates
+        for state in range(nstates):
+            row = { code[sym]: t for sym, t in actions.get(state, {}).items() if t is not None }
+            reductions = [ t for t in row.values() if t < 0 ]
+            if reductions:
+                default = max(set(reductions), key=reductions.count)
+                row = { sym: t for sym, t in row.items() if t != default }
+                self.action_default[state] = default
+            action_rows.append(row)
+        # Unknown token types are given the first nonterminal code, which
+        # no action row has an entry for
+        self.action_base, self.action_check, self.action_value = \
+            _displace_rows(action_rows, len(terminals) + 1, DENSE_ERROR)
+
+        goto_rows = [ { code[sym]: target for sym, target in gotos.get(state, {}).items() }
+                      for state in range(nstates) ]
+        self.goto_base, _, self.goto_value = _displace_rows(goto_rows, len(self.symbols), DENSE_ERROR)
+
+        self.prod_lhs = array('i', (code[p.name] for p in productions))
+        self.prod_len = array('i', (p.len for p in productions))
+        self.rules = [ (p.func, p.name, p.len, code[p.name], p.namemap) for p in productions ]
+
+    def nbytes(self):
+        '''
+        Return the number of bytes held by the table arrays.
+        '''
+        return sum(a.itemsize * len(a) for a in (
+            self.action_base, self.action_check, self.action_value, self.action_default,
+            self.goto_base, self.goto_value, self.prod_lhs, self.prod_len))
+
+# -----------------------------------------------------------------------------
+#                           == Direct coded parsers ==
+#
+# direct_source() turns the dense tables into the Python source of a
+# parse(parser, tokens) function with one handler per LR state.  A handler
+# tests the lookahead type against the state's own terminals and either
+# shifts, returns an accept (-1) or error (-2) code, or makes a reduction
+# inline: the values of the right hand side are wrapped positionally in a
+# tuple subclass made by production_class() and passed straight to the
+# production function.  Reductions not explicitly listed for a state are
+# its default reduction, exactly as in DenseLRTable, so the direct parser
+# reduces in the same order as Parser.parse_dense().
+#
+# The parse stacks hold states and plain values.  On a syntax error they
+# are rebuilt as parse_dense() stacks of YaccSymbols, using the accessing
+# symbol of each state, and parse_dense() takes over error recovery.
+# -----------------------------------------------------------------------------
+
+DIRECT_SHIFT_CHAIN = 4         # Longest if/elif chain before a state uses a dict for shifts
+
+def production_class(name, namemap):
+    '''
+    Return a tuple subclass for the right hand side of a production, with
+    a read-only property for each name in namemap.
+    '''
+    attrs = { '__slots__': () }
+    for sym, n in namemap.items():
+        attrs[sym] = property(itemgetter(n))
+    return type(f'p_{name}', (tuple,), attrs)
+
+def direct_source(lrtable, dense, signature, parsername=''):
+    '''
+    Return the source of a direct coded parser module for the tables of
+    lrtable, as coded by dense.  The module expects the production
+    functions to be supplied as the globals _f<n> by the code that
+    executes it.
+    '''
+    symbols = dense.symbols
+    nstates = len(dense.action_base)
+    productions = lrtable.lr_productions
+
+    # The symbol that every state is entered on
+    accessing = [ '$end' ] * nstates
+    for state, row in lrtable.lr_action.items():
+        for sym, t in row.items():
+            if t is not None and t > 0:
+                accessing[t] = sym
+    for state, row in lrtable.lr_goto.items():
+        for sym, target in row.items():
+            accessing[target] = sym
+
+    # Goto rows by nonterminal code
+    codes = { sym: n for n, sym in enumerate(symbols) }
+    gotos = defaultdict(dict)
+    for state, row in lrtable.lr_goto.items():
+        for sym, target in row.items():
+            gotos[codes[sym]][state] = target
+
+    lines = [
+        '# This file is automatically generated by sly. Do not edit.',
+        f'# Direct coded LR parser for {parsername}' if parsername else '# Direct coded LR parser',
+        '',
+        'from sly.yacc import YaccSymbol as _YaccSymbol, production_class as _production_class',
+        '',
+        f'_signature = {signature!r}',
+        f'_accessing = {tuple(accessing)!r}',
+        '_new = tuple.__new__',
+        '',
+        ]
+    for number, p in enumerate(productions):
+        if number:
+            lines.append(f'_P{number} = _production_class({p.name!r}, {p.namemap!r})')
+    lines.append('')
+    for code, row in sorted(gotos.items()):
+        targets = set(row.values())
+        if len(targets) > 1:
+            table = [ row.get(state) for state in range(nstates) ]
+            lines.append(f'_G{code} = {tuple(table)!r}  # {symbols[code]}')
+
+    def reduce_code(number, indent):
+        p = productions[number]
+        code = codes[p.name]
+        plen = p.len
+        pad = ' ' * indent
+        out = [ f'# {p.name} -> {" ".join(sorted(p.namemap, key=p.namemap.get))}' ]
+        if plen:
+            out.append(f'p = _new(_P{number}, values[-{plen}:])')
+        else:
+            out.append(f'p = _new(_P{number}, ())')
+        out.append(f'v = _f{number}(parser, p)')
+        out.append(f'if v is p: v = ({p.name!r}, *p)')
+        # Replace the top of the stacks in place wherever possible
+        if plen > 1:
+            out.append(f'del values[-{plen - 1}:]')
+            out.append(f'del states[-{plen - 1}:]')
+        if plen:
+            out.append('values[-1] = v')
+            below = 'states[-2]'
+        else:
+            out.append('values.append(v)')
+            below = 'states[-1]'
+        targets = set(gotos[code].values())
+        if len(targets) == 1:
+            target = targets.pop()
+        else:
+            out.append(f'g = _G{code}[{below}]')
+            target = 'g'
+        if plen:
+            out.append(f'states[-1] = {target}')
+        else:
+            out.append(f'states.append({target})')
+        out.append(f'return {target}')
+        return [ pad + line for line in out ]
+
+    shift_tables = []
+    lines.append('')
+    lines.append('def parse(parser, tokens):')
+    lines.append('    states = [0]')
+    lines.append('    values = []')
+    lines.append('    la = None')
+    lines.append('    lt = None')
+    lines.append('    end = _YaccSymbol()')
+    lines.append('    end.type = \'$end\'')
+    lines.append('    parser.tokens = tokens')
+    lines.append('    parser.statestack = states')
+    lines.append('')
+    for state in range(nstates):
+        base = dense.action_base[state]
+        default = dense.action_default[state]
+        shifts = {}
+        reductions = defaultdict(list)
+        accept = []
+        if base >= 0:
+            for sym, code in dense.terminals.items():
+                if dense.action_check[base + code] == state:
+                    t = dense.action_value[base + code]
+                    if t > 0:
+                        shifts[sym] = t
+                    elif t < 0:
+                        reductions[-t].append(sym)
+                    else:
+                        accept.append(sym)
+
+        lines.append(f'    def state{state}():')
+        lines.append(f'        # Entered on {accessing[state]}')
+        if base >= 0:
+            lines.append('        nonlocal la, lt')
+            lines.append('        if la is None:')
+            lines.append('            la = next(tokens, None) or end')
+            lines.append('            lt = la.type')
+            if len(shifts) > DIRECT_SHIFT_CHAIN:
+                shift_tables.append(f'_S{state} = {dict(sorted(shifts.items()))!r}')
+                lines.append(f'        t = _S{state}.get(lt)')
+                lines.append('        if t is not None:')
+                lines.append('            values.append(la.value)')
+                lines.append('            states.append(t)')
+                lines.append('            la = None')
+                lines.append('            return t')
+            else:
+                for sym, t in sorted(shifts.items()):
+                    lines.append(f'        if lt == {sym!r}:')
+                    lines.append('            values.append(la.value)')
+                    lines.append(f'            states.append({t})')
+                    lines.append('            la = None')
+                    lines.append(f'            return {t}')
+            for number, syms in sorted(reductions.items()):
+                if len(syms) == 1:
+                    lines.append(f'        if lt == {syms[0]!r}:')
+                else:
+                    lines.append(f'        if lt in {{{", ".join(map(repr, sorted(syms)))}}}:')
+                lines.extend(reduce_code(number, 12))
+            for sym in accept:
+                lines.append(f'        if lt == {sym!r}:')
+                lines.append('            return -1')
+        if default < 0:
+            lines.extend(reduce_code(-default, 8))
+        else:
+            lines.append('        return -2')
+        lines.append('')
+
+    lines.append(f'    handlers = ({", ".join(f"state{state}" for state in range(nstates))},)')
+    lines.append('    state = 0')
+    lines.append('    while state >= 0:')
+    lines.append('        state = handlers[state]()')
+    lines.append('    if state == -1:')
+    lines.append('        return values[-1]')
+    lines.append('    return parser._recover_direct(tokens, states, values, la, _accessing)')
+    lines.append('')
+    lines.extend(shift_tables)
+    return '\n'.join(lines) + '\n'
+
 # Collect grammar rules from a function
 def _collect_grammar_rules(func):
     grammar = []
@@ -1602,6 +2057,13 @@ class Parser(metaclass=ParserMeta):
     # Debugging filename where parsetab.out data can be written
     debugfile = None
 
+    # Filename where the LALR tables are cached between runs
+    cachefile = None
+
+    # Dotted name of a module written by write_tables().  If it can be
+    # imported and matches the grammar, no tables are built at all.
+    tablemodule = None
+
     @classmethod
     def __validate_tokens(cls):
         if not hasattr(cls, 'tokens'):
@@ -1759,6 +2221,89 @@ class Parser(metaclass=ParserMeta):
         cls._lrtable = lrtable
         return True
 
+    @classmethod
+    def __grammar_signature(cls, rules):
+        '''
+        Compute a hash of everything the LALR tables depend on: the tokens,
+        the precedence table, the start symbol and the grammar rules.  Also
+        return the reduce functions in the order the productions are numbered.
+        '''
+        funcs = [ None ]
+        productions = []
+        for name, func in rules:
+            for pfunc, rulefile, ruleline, prodname, syms in _collect_grammar_rules(func):
+                funcs.append(pfunc)
+                productions.append((prodname, syms))
+
+        start = getattr(cls, 'start', None)
+        if callable(start):
+            start = start.__name__
+
+        spec = repr((TABLE_VERSION,
+                     sorted(getattr(cls, 'tokens', ())),
+                     getattr(cls, 'precedence', ()),
+                     start,
+                     productions))
+        return hashlib.sha256(spec.encode('utf-8')).hexdigest(), funcs
+
+    @classmethod
+    def __read_cache(cls, signature, funcs):
+        '''
+        Restore the LR tables from cls.cachefile if it matches signature
+        '''
+        try:
+            with open(cls.cachefile, 'rb') as f:
+                data = pickle.load(f)
+        except Exception:
+            # Missing or unreadable cache.  Just rebuild the tables.
+            return False
+
+        if not isinstance(data, dict) or data.get('signature') != signature:
+            return False
+        if len(data['productions']) != len(funcs):
+            return False
+
+        cls._lrtable = CachedLRTable.from_data(data, funcs)
+        return True
+
+    @classmethod
+    def __read_module(cls, signature, funcs):
+        '''
+        Restore the LR tables from cls.tablemodule if it matches signature
+        '''
+        try:
+            module = importlib.import_module(cls.tablemodule)
+        except ImportError:
+            return False
+
+        if getattr(module, '_tabversion', None) != TABLE_VERSION or \
+           getattr(module, '_signature', None) != signature:
+            cls.log.warning('Parsing tables in %s are out of date. Rebuilding them.', cls.tablemodule)
+            return False
+        if len(module._productions) != len(funcs):
+            return False
+
+        cls._lrtable = CachedLRTable.from_module(module, funcs)
+        return True
+
+    @classmethod
+    def __write_cache(cls, signature):
+        '''
+        Write the LR tables to cls.cachefile.  Failures are not fatal.
+        '''
+        tmpname = f'{cls.cachefile}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(cls.cachefile)), exist_ok=True)
+            with open(tmpname, 'wb') as f:
+                pickle.dump(table_data(cls._lrtable, signature), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmpname, cls.cachefile)
+        except OSError as e:
+            cls.log.warning('Unable to write parser cache %s: %s', cls.cachefile, e)
+            try:
+                os.remove(tmpname)
+            except OSError:
+                pass
+
     @classmethod
     def __collect_rules(cls, definitions):
         '''
@@ -1781,6 +2326,15 @@ class Parser(metaclass=ParserMeta):
         # Collect all of the grammar rules from the class definition
         rules = cls.__collect_rules(definitions)
 
+        # Reuse previously built tables if the grammar hasn't changed
+        signature, funcs = cls.__grammar_signature(rules)
+        cls._signature = signature
+        if not cls.debugfile:
+            if cls.tablemodule and cls.__read_module(signature, funcs):
+                return
+            if cls.cachefile and cls.__read_cache(signature, funcs):
+                return
+
         # Validate other parts of the grammar specification
         if not cls.__validate_specification():
             raise YaccError('Invalid parser specification')
@@ -1799,6 +2353,73 @@ class Parser(metaclass=ParserMeta):
                 f.write(str(cls._lrtable))
             cls.log.info('Parser debugging for %s written to %s', cls.__qualname__, cls.debugfile)
 
+        if cls.cachefile and not cls.debugfile:
+            cls.__write_cache(signature)
+
+    @classmethod
+    def write_tables(cls, filename):
+        '''
+        Write the parsing tables to filename as a standalone Python module
+        that can be named by the tablemodule attribute.
+        '''
+        write_table_module(cls._lrtable, cls._signature, filename, cls.__qualname__)
+
+    @classmethod
+    def tables_current(cls):
+        '''
+        Return True if cls.tablemodule exists and matches the grammar.
+        '''
+        if not cls.tablemodule:
+            return False
+        try:
+            module = importlib.import_module(cls.tablemodule)
+        except ImportError:
+            return False
+        return getattr(module, '_tabversion', None) == TABLE_VERSION and \
+               getattr(module, '_signature', None) == cls._signature
+
+    @classmethod
+    def dense_tables(cls):
+        '''
+        Return the parsing tables as a DenseLRTable, building it on first use.
+        '''
+        table = vars(cls).get('_dense_lrtable')
+        if table is None:
+            table = cls._dense_lrtable = DenseLRTable(cls._lrtable)
+        return table
+
+    @classmethod
+    def direct_source(cls):
+        '''
+        Return the source of a direct coded parser for the grammar.
+        '''
+        return direct_source(cls._lrtable, cls.dense_tables(), cls._signature, cls.__qualname__)
+
+    @classmethod
+    def write_direct(cls, filename):
+        '''
+        Write the source of the direct coded parser to filename, for
+        inspection.  parse_direct() does not read it.
+        '''
+        with open(filename, 'w') as f:
+            f.write(cls.direct_source())
+
+    @classmethod
+    def direct_parser(cls):
+        '''
+        Return the parse(parser, tokens) function of the direct coded
+        parser, compiling it on first use.
+        '''
+        parse = vars(cls).get('_direct_parse')
+        if parse is None:
+            namespace = { '__name__': f'{cls.__module__}.{cls.__qualname__}.direct' }
+            for number, p in enumerate(cls._lrtable.lr_productions):
+                namespace[f'_f{number}'] = p.func
+            code = compile(cls.direct_source(), f'<direct {cls.__qualname__}>', 'exec')
+            exec(code, namespace)
+            parse = cls._direct_parse = namespace['parse']
+        return parse
+
     # ----------------------------------------------------------------------
     # Parsing Support.  This is the parsing runtime that users use to
     # ----------------------------------------------------------------------
@@ -1841,7 +2462,7 @@ class Parser(metaclass=ParserMeta):
         lookaheadstack = []                               # Stack of lookahead symbols
         actions = self._lrtable.lr_action                 # Local reference to action table (to avoid lookup on self.)
         goto    = self._lrtable.lr_goto                   # Local reference to goto table (to avoid lookup on self.)
-        prod    = self._grammar.Productions               # Local reference to production list (to avoid lookup on self.)
+        prod    = self._lrtable.lr_productions            # Local reference to production list (to avoid lookup on self.)
         defaulted_states = self._lrtable.defaulted_states # Local reference to defaulted states
         pslice  = YaccProduction(None)                    # Production object passed to grammar rules
         errorcount = 0                                    # Used during error recovery
@@ -1999,3 +2620,195 @@ class Parser(metaclass=ParserMeta):
 
             # Call an error function here
             raise RuntimeError('sly: internal parser error!!!\n')
+
+    def parse_dense(self, tokens):
+        '''
+        Parse the given input tokens with the integer coded tables returned
+        by dense_tables().  The result is the same as parse(), but states
+        and symbols are array indices instead of dictionary keys.  Default
+        reductions are made without looking at the lookahead, so a syntax
+        error may be reported after a few more reductions than parse()
+        would make, on the same token.
+        '''
+        self.tokens = tokens
+        self.statestack = []
+        self.symstack = []
+        self.restart()
+        return self._parse_dense(tokens, None)
+
+    def parse_direct(self, tokens):
+        '''
+        Parse the given input tokens with the direct coded parser returned
+        by direct_parser().  Valid input gives the same result as parse().
+        Production functions receive p as a tuple of the right hand side
+        values, so they may use p.name and p[n] for n >= 0, but not
+        p.lineno, p.index, assignment or negative indices.  Syntax errors
+        are handed over to parse_dense() for error recovery.
+        '''
+        return self.direct_parser()(self, tokens)
+
+    def _recover_direct(self, tokens, states, values, lookahead, accessing):
+        '''
+        Continue a direct coded parse that failed on lookahead with
+        parse_dense(), which takes care of error recovery.  The value
+        stack is rebuilt as symbols from the accessing symbol of each state.
+        '''
+        self.symstack = symstack = []
+        sym = YaccSymbol()
+        sym.type = '$end'
+        symstack.append(sym)
+        for state, value in zip(states[1:], values):
+            sym = YaccSymbol()
+            sym.type = accessing[state]
+            sym.value = value
+            symstack.append(sym)
+        self.statestack = states
+        self.state = states[-1]
+        return self._parse_dense(tokens, lookahead)
+
+    def _parse_dense(self, tokens, lookahead):
+        '''
+        Run the parse_dense() loop from the current contents of
+        self.statestack and self.symstack, with an optional lookahead
+        symbol that has already been read.
+        '''
+        table = self.dense_tables()
+        terminals = table.terminals
+        unknown = table.unknown
+        # Lists index faster than arrays, which box every item they return
+        abase = table.action_base.tolist()
+        acheck = table.action_check.tolist()
+        avalue = table.action_value.tolist()
+        adefault = table.action_default.tolist()
+        gbase = table.goto_base.tolist()
+        gvalue = table.goto_value.tolist()
+        rules = table.rules
+        end_code = terminals['$end']
+        error_code = terminals.get('error', unknown)
+        pslice = YaccProduction(None)
+        # Set the slots of pslice directly, bypassing __setattr__
+        set_slice = YaccProduction._slice.__set__
+        set_namemap = YaccProduction._namemap.__set__
+        errorcount = 0
+
+        statestack = self.statestack
+        symstack = self.symstack
+        pslice._stack = symstack
+        state = statestack[-1]
+
+        lookaheadstack = []
+        lcode = terminals.get(lookahead.type, unknown) if lookahead is not None else 0
+        errtoken = None
+        while True:
+            base = abase[state]
+            if base >= 0:
+                if lookahead is None:
+                    if lookaheadstack:
+                        lookahead = lookaheadstack.pop()
+                    else:
+                        lookahead = next(tokens, None)
+                    if not lookahead:
+                        lookahead = YaccSymbol()
+                        lookahead.type = '$end'
+                    lcode = terminals.get(lookahead.type, unknown)
+                if acheck[base + lcode] == state:
+                    t = avalue[base + lcode]
+                elif lcode != error_code:
+                    t = adefault[state]
+                else:
+                    # No default reductions on the error token, or
+                    # recovery would undo its own stack pops
+                    t = DENSE_ERROR
+            else:
+                t = adefault[state]
+
+            if t < 0:
+                # reduce a symbol on the stack, emit a production
+                func, pname, plen, lhs, namemap = rules[-t]
+                set_namemap(pslice, namemap)
+                if plen:
+                    set_slice(pslice, symstack[-plen:])
+                else:
+                    set_slice(pslice, [])
+
+                sym = YaccSymbol()
+                sym.type = pname
+                value = func(self, pslice)
+                if value is pslice:
+                    value = (pname, *(s.value for s in pslice._slice))
+                sym.value = value
+                if plen:
+                    del symstack[-plen:]
+                    del statestack[-plen:]
+
+                symstack.append(sym)
+                state = gvalue[gbase[statestack[-1]] + lhs]
+                statestack.append(state)
+                continue
+
+            if 0 < t < DENSE_ERROR:
+                # shift a symbol on the stack
+                statestack.append(t)
+                state = t
+                symstack.append(lookahead)
+                lookahead = None
+                if errorcount:
+                    errorcount -= 1
+                continue
+
+            if t == 0:
+                self.state = state
+                return getattr(symstack[-1], 'value', None)
+
+            # Syntax error.  Recovery follows parse() step for step, with
+            # the lookahead code kept in step with the lookahead symbol.
+            self.state = state
+            if errorcount == 0 or self.errorok:
+                errorcount = ERROR_COUNT
+                self.errorok = False
+                if lcode == end_code:
+                    errtoken = None
+                else:
+                    errtoken = lookahead
+
+                tok = self.error(errtoken)
+                if tok:
+                    lookahead = tok
+                    lcode = terminals.get(tok.type, unknown)
+                    self.errorok = True
+                    state = self.state
+                    continue
+                else:
+                    if not errtoken:
+                        return
+            else:
+                errorcount = ERROR_COUNT
+
+            if len(statestack) <= 1 and lcode != end_code:
+                lookahead = None
+                state = self.state = 0
+                del lookaheadstack[:]
+                continue
+
+            if lcode == end_code:
+                return
+
+            if lcode != error_code:
+                if symstack[-1].type == 'error':
+                    lookahead = None
+                    continue
+
+                t = YaccSymbol()
+                t.type = 'error'
+                if hasattr(lookahead, 'lineno'):
+                    t.lineno = lookahead.lineno
+                if hasattr(lookahead, 'index'):
+                    t.index = lookahead.index
+                t.value = lookahead
+                lookaheadstack.append(lookahead)
+                lookahead = t
+                lcode = error_code
+            else:
+                symstack.pop()
+                statestack.pop()
+                state = self.state = statestack[-1]
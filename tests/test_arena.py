@@ -0,0 +1,123 @@
+import unittest
+
+import gc
+import sys
+sys.path.append('.')
+
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.generator import DLGenerator
+from dl.arena import ASTArena, ArenaNode
+from dl.ast import Integer, Variable, Block
+
+class TestArena(unittest.TestCase):
+
+    def test_arena_matches_objects(self):
+        source_file = open("tests/simple2.dl", 'r')
+        source_string = source_file.read()
+        source_file.close()
+
+        for parse in (DLParser.parse, DLParser.parse_direct):
+            expected, result, arena = self.parse_both(source_string, parse)
+            self.assertEqual(str(result), str(expected))
+
+    def test_arena_list_order(self):
+        expected, result, arena = self.parse_both("""
+            int a, b[3], c;
+            f(x, y, z);
+            { return g(x, y, z) }
+            { ; print(f(1, 2, 3)); ; }
+        """)
+        self.assertEqual(str(result), str(expected))
+
+    def test_arena_nodes_are_views(self):
+        expected, result, arena = self.parse_both("{ x = 1; print(x) }")
+
+        assign = result.body.statements[0]
+        self.assertIsInstance(assign.right, Integer)
+        self.assertIsInstance(assign.right, ArenaNode)
+        self.assertEqual(type(assign.left).__name__, 'Variable')
+        # Views are created on demand, and equal when they refer to the same node
+        self.assertIsNot(result.body, result.body)
+        self.assertEqual(result.body, result.body)
+        self.assertEqual(len(result.body.statements), 2)
+        self.assertEqual(str(result.body.statements[-1]), "Print(Variable(x))")
+
+        assign.right.itype = 'int'
+        assign.symbol = 'marker'
+        self.assertEqual(result.body.statements[0].right.itype, 'int')
+        self.assertEqual(result.body.statements[0].symbol, 'marker')
+        self.assertIsNone(result.body.statements[1].itype)
+
+    def test_arena_storage(self):
+        expected, result, arena = self.parse_both("{ x = 1; y = x + 1; print(y) }")
+
+        # Names are interned, and only the views still referenced exist
+        # as objects
+        self.assertEqual(arena.names.count('x'), 1)
+        self.assertEqual(len(arena), 12)
+        self.assertEqual(arena.nbytes(), len(arena) * 22)
+        views = [obj for obj in gc.get_objects() if isinstance(obj, ArenaNode)]
+        self.assertEqual(views, [result])
+
+    def test_arena_list_operations(self):
+        arena = ASTArena()
+        block = arena.Block(arena.Integer(2))
+        block.append(arena.Integer(3))
+        block.prepend(arena.Integer(1))
+        block.statements = [arena.Integer(n) for n in range(4)] + [block.statements[2]]
+
+        self.assertIsInstance(block, Block)
+        self.assertEqual(str(block), "Block(Integer(0), Integer(1), Integer(2), Integer(3), Integer(3))")
+        self.assertEqual(str(arena.Block()), "Block()")
+
+    def test_arena_list_indexing(self):
+        arena = ASTArena()
+        block = arena.Block()
+        statements = block.statements
+        for n in range(20000):
+            block.append(arena.Integer(n))
+        # len() and indexing do not walk the list each time
+        self.assertEqual(sum(statements[n].value for n in range(len(statements))), 199990000)
+        self.assertEqual(statements[-1].value, 19999)
+
+        # Indexing follows changes made through other views
+        block.prepend(arena.Integer(-1))
+        self.assertEqual((len(statements), statements[0].value, statements[1].value), (20001, -1, 0))
+        block.statements = [statements[5]]
+        self.assertEqual((len(statements), statements[0].value), (1, 4))
+        with self.assertRaises(IndexError):
+            statements[1]
+
+    def test_arena_wide_integer(self):
+        arena = ASTArena()
+        node = arena.Integer(2**40)
+        self.assertEqual(node.value, 2**40)
+        node.value = -7
+        self.assertEqual(node.value, -7)
+        self.assertEqual(arena.wide, {})
+
+    def test_arena_generator(self):
+        source_string = """
+            f();
+            { print(1) }
+            {
+                if (f() < 2) { print(3 * 4) } else { print(5) };
+                while (1 == 2) { print(6 - 7) }
+            }
+        """
+        expected, result, arena = self.parse_both(source_string)
+        self.assertEqual(DLGenerator().generate(result), DLGenerator().generate(expected))
+
+    def parse_both(self, source, parse=DLParser.parse):
+        """Parse source into an object AST and into an arena."""
+        lexer = DLLexer()
+        arena = ASTArena()
+        expected = parse(DLParser(), lexer.tokenize(source))
+        result = parse(DLParser(nodes=arena), lexer.tokenize(source))
+        return expected, result, arena
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+
+import sys
+sys.path.append('.')
+
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+from dl.mem2reg import Mem2Reg
+from dl.bounds import BoundsCheckElimination, ValueRanges, FULL_RANGE, bounds_check
+from dl.ir import Phi
+
+class TestBounds(unittest.TestCase):
+
+    def test_computed_index(self):
+        module = self.build("int h[4], i; { read(i); h[i + 1] = 2; print(h[i]) }", check_bounds=False)
+        ir = str(module)
+        self.assertIn("getelementptr [4 x i32], [4 x i32]* %h, i32 0, i32 %tmp.", ir)
+        self.assertNotIn("icmp ult", ir)
+
+    def test_checks_generated(self):
+        module = self.build("int h[4], i; { read(i); h[i + 1] = 2; print(h[i]) }")
+        main = module.get_function("main")
+        self.assertEqual(len(self.checks(main)), 2)
+        # The failed checks share a block, at the end of the function
+        self.assertEqual(main.blocks[-1].name, "bounds.fail.1")
+        self.assertEqual([instruction.opcode for instruction in main.blocks[-1].instructions],
+                         ["call", "unreachable"])
+        self.assertIn("declare void @llvm.trap() noreturn nounwind", str(module))
+
+    def test_eliminate_loop_checks(self):
+        source = "int h[10], i; { i = 0; while (i < 10) { h[i] = i; i = i + 1 }; i = 9; while (i >= 0) { print(h[i]); i = i - 1 } }"
+        module, eliminator = self.eliminate(source)
+        main = module.get_function("main")
+        self.assertEqual((eliminator.checks, eliminator.eliminated), (2, 2))
+        self.assertEqual(self.checks(main), [])
+        # The code is the same as without checks, but for the names
+        unchecked = self.build(source, check_bounds=False)
+        Mem2Reg().run(unchecked)
+        self.assertEqual(self.opcodes(main), self.opcodes(unchecked.get_function("main")))
+        self.assertEqual([block.name for block in main.blocks if block.name.startswith("bounds")], [])
+
+    def test_eliminate_offsets_and_steps(self):
+        source = """int h[10], i, j; {
+            i = 0; while (i < 9) { h[i + 1] = h[i]; i = i + 1 };
+            i = 1; while (i < 10) { h[i - 1] = 2 * i; i = i + 3 };
+            i = 0; while (i < 10) { j = 0; while (j < i) { h[j] = h[i] + h[9 - j]; j = j + 1 }; i = i + 1 }
+            }"""
+        module, eliminator = self.eliminate(source)
+        self.assertEqual((eliminator.checks, eliminator.eliminated), (6, 6))
+
+    def test_keep_checks_that_may_fail(self):
+        source = """int h[10], i; f(n); int a[5], k; { k = 0; while (k < n) { a[k] = k; k = k + 1 }; return a[2] } {
+            i = 0; while (i <= 10) { h[i] = i; i = i + 1 };
+            i = 0; while (i < 10) { h[i + 1] = i; i = i + 1 };
+            i = 0; while (i < 10) { h[i] = i; i = i - 1 };
+            read(i); print(h[i]); print(f(i))
+            }"""
+        module, eliminator = self.eliminate(source)
+        self.assertEqual(eliminator.checks, 6)
+        # Only a[2] is known to be in range
+        self.assertEqual(eliminator.eliminated, 1)
+        self.assertEqual(len(self.checks(module.get_function("f"))), 1)
+
+    def test_eliminate_repeated_checks(self):
+        source = "f(i); int h[10]; { h[i] = 1; h[i] = h[i] + 1; return h[i] } { print(f(3)) }"
+        module, eliminator = self.eliminate(source)
+        self.assertEqual((eliminator.checks, eliminator.eliminated), (4, 3))
+        self.assertEqual(len(self.checks(module.get_function("f"))), 1)
+
+    def test_constant_indices(self):
+        module, eliminator = self.eliminate("int h[3]; { h[2] = 1; print(h[0]); print(h[3]) }")
+        self.assertEqual((eliminator.checks, eliminator.eliminated), (3, 2))
+
+    def test_counter_ranges(self):
+        module = self.build("int i, s; { i = 3; s = 0; while (i < 100) { s = s + i; i = i + 2 }; print(s) }")
+        Mem2Reg().run(module)
+        main = module.get_function("main")
+        ranges = ValueRanges(main)
+        counter, total = sorted([instruction for instruction in main.instructions() if instruction.__class__ is Phi],
+                                key=lambda phi: phi.name)
+        body = main.blocks[2]
+        self.assertEqual(ranges.range(counter, main.blocks[1]), (3, 101))
+        self.assertEqual(ranges.range(counter, body), (3, 99))
+        # s grows by a value, not a constant, and could wrap around
+        self.assertEqual(ranges.range(total, body), FULL_RANGE)
+
+    def build(self, source, check_bounds=True):
+        ast = DLSemanticAnalyzer().analyze(DLParser().parse(DLLexer().tokenize(source)))
+        return DLGenerator(check_bounds=check_bounds).build(ast)
+
+    def eliminate(self, source):
+        module = self.build(source)
+        Mem2Reg().run(module)
+        eliminator = BoundsCheckElimination()
+        return eliminator.run(module), eliminator
+
+    def checks(self, function):
+        return [block.terminator for block in function.blocks
+                if block.terminator is not None and bounds_check(block.terminator) is not None]
+
+    def opcodes(self, function):
+        return [instruction.opcode for instruction in function.instructions()]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import subprocess
+
+import sys
+sys.path.append('.')
+
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+from dl.mem2reg import Mem2Reg
+from dl.valuenumbering import LocalValueNumbering
+from dl.deadcode import DeadCodeElimination
+from dl.ir import Module, Function, BasicBlock, Branch, Return, Phi
+
+class TestDeadCode(unittest.TestCase):
+
+    def test_code_after_return(self):
+        module, eliminator = self.eliminate("f(a); { return a; print(a); return 2 } { print(f(1)) }")
+        f = module.get_function("f")
+        self.assertEqual(len(f.blocks), 1)
+        self.assertEqual([instruction.opcode for instruction in f.instructions()], ["ret"])
+        self.assertEqual(eliminator.removed, {'call': 1, 'ret': 1})
+        self.assertEqual(eliminator.blocks, 1)
+
+    def test_if_both_return(self):
+        with open('tests/simple.dl') as file:
+            source = file.read()
+        module, eliminator = self.eliminate(source)
+        factorial = module.get_function("factorial")
+        self.assertEqual([block.name for block in factorial.blocks], ["entry", "if.true.2", "if.false.3"])
+        for block in factorial.blocks:
+            self.assertTrue(block.terminator is not None)
+        self.assertEqual(eliminator.removed, {'br': 2})
+
+    def test_instructions_after_terminator(self):
+        module = Module()
+        function = module.add_function(Function("main"))
+        block = function.add_block(BasicBlock("entry"))
+        end = function.add_block(BasicBlock("end"))
+        block.append(Branch(end))
+        block.append(Return(module.constant(1)))
+        end.append(Return(module.constant(0)))
+        eliminator = DeadCodeElimination()
+        eliminator.run(module)
+        self.assertEqual(len(block.instructions), 1)
+        self.assertEqual(eliminator.removed, {'ret': 1})
+
+    def test_unused_values(self):
+        source = "int x, y; { read(x); y = x * 2 + x * 2; y = x + 1; print(y) }"
+        module = DLGenerator().build(self.checked(source))
+        Mem2Reg().run(module)
+        LocalValueNumbering().run(module)
+        eliminator = DeadCodeElimination()
+        eliminator.run(module)
+        main = module.get_function("main")
+        self.assertEqual([instruction.opcode for instruction in main.instructions()],
+                         ["alloca", "store", "call", "load", "add", "call", "ret"])
+        self.assertEqual(eliminator.removed, {'add': 1, 'mul': 1})
+
+    def test_keep_division(self):
+        # a / b may divide by zero, and stays though t is never read
+        module = DLGenerator().build(self.checked("f(a, b); int t; { t = a / b; t = a / 2; return 0 } { print(f(1, 0)) }"))
+        Mem2Reg().run(module)
+        DeadCodeElimination().run(module)
+        self.assertEqual(str(module.get_function("f")).count("udiv"), 1)
+
+    def test_unreachable_phi_incoming(self):
+        module = Module()
+        function = module.add_function(Function("main"))
+        entry = function.add_block(BasicBlock("entry"))
+        dead = function.add_block(BasicBlock("dead"))
+        join = function.add_block(BasicBlock("join"))
+        entry.append(Branch(join))
+        dead.append(Branch(join))
+        phi = join.append(Phi("i32", "x"))
+        phi.add_incoming(module.constant(1), entry)
+        phi.add_incoming(module.constant(2), dead)
+        join.append(Return(phi))
+        eliminator = DeadCodeElimination()
+        eliminator.run(module)
+        self.assertEqual(function.blocks, [entry, join])
+        self.assertEqual(phi.blocks, [entry])
+        self.assertEqual(join.predecessors, [entry])
+        self.assertEqual(eliminator.blocks, 1)
+
+    def test_uncalled_functions(self):
+        source = "a(x); { return x } b(x); { return a(x) } c(x); { return c(x) } d(x); { return b(x) } { print(d(1)) }"
+        module, eliminator = self.eliminate(source)
+        self.assertEqual([function.name for function in module.functions], ["a", "b", "d", "printf", "scanf", "main"])
+        self.assertEqual(eliminator.functions, ["c"])
+        self.assertEqual(eliminator.removed, {'call': 1, 'ret': 1})
+        self.assertIsNone(module.get_function("c"))
+
+    def test_valid_ir(self):
+        with open('tests/simple.dl') as file:
+            source = file.read()
+        module, eliminator = self.eliminate(source)
+        try:
+            process = subprocess.run(["llvm-as", "-o", "/dev/null"], input=str(module), text=True,
+                                     capture_output=True)
+        except OSError:
+            self.skipTest("llvm-as is not installed")
+        self.assertEqual(process.returncode, 0, process.stderr)
+
+    def checked(self, source):
+        return DLSemanticAnalyzer().analyze(DLParser().parse(DLLexer().tokenize(source)))
+
+    def eliminate(self, source):
+        module = DLGenerator().build(self.checked(source))
+        eliminator = DeadCodeElimination()
+        return eliminator.run(module), eliminator
+
+
+if __name__ == '__main__':
+    unittest.main()
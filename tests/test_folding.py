@@ -0,0 +1,100 @@
+import unittest
+
+import sys
+sys.path.append('.')
+
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+from dl.folding import DLConstantFolder, fold_BinOp
+from dl.arena import ASTArena
+from dl.ast import Integer
+
+class TestFolding(unittest.TestCase):
+
+    def test_fold_constants(self):
+        ast, folder = self.fold("{ print(5 + 7 * (4 - 1) / 2) }")
+        self.assertEqual(self.printed(ast), [15])
+        self.assertEqual(folder.removed, {'add': 1, 'mul': 1, 'sub': 1, 'udiv': 1})
+
+    def test_fold_wraparound(self):
+        ast, folder = self.fold("{ print(2147483647 + 1); print(0 - 1); print(65536 * 65536) }")
+        self.assertEqual(self.printed(ast), [-2147483648, -1, 0])
+
+    def test_fold_unsigned_division(self):
+        # -1 is 4294967295 to udiv
+        ast, folder = self.fold("{ print((0 - 1) / 2); print((0 - 6) / (0 - 3)) }")
+        self.assertEqual(self.printed(ast), [2147483647, 0])
+        self.assertEqual(fold_BinOp('DIVIDEOP', 7, 0), None)
+
+    def test_fold_division_by_zero(self):
+        ast, folder = self.fold("{ print(7 / 0) }")
+        self.assertNotIsInstance(ast.body.statements[0].arg, Integer)
+        self.assertEqual(folder.removed, {})
+
+    def test_fold_identities(self):
+        ast, folder = self.fold("int x; { print(x * 1 + 0); print(1 * (0 + x) - 0); print(x / 1) }")
+        for statement in ast.body.statements:
+            self.assertEqual(str(statement.arg), "Variable(x)")
+        self.assertEqual(folder.removed, {'add': 2, 'mul': 2, 'sub': 1, 'udiv': 1})
+
+    def test_fold_annihilators(self):
+        ast, folder = self.fold("f(a); { return a - a } int x, h[2]; { print(0 * (x + h[1])); print(x - x) }")
+        self.assertEqual(self.printed(ast), [0, 0])
+        self.assertEqual(folder.removed, {'mul': 1, 'add': 1, 'load': 4, 'getelementptr': 1, 'sub': 2})
+
+    def test_fold_keeps_calls(self):
+        ast, folder = self.fold("f(a); { print(a); return a } { print(f(1) * 0); print(f(2 + 3)) }")
+        self.assertNotIsInstance(ast.body.statements[0].arg, Integer)
+        self.assertEqual(str(ast.body.statements[1].arg.args.arguments[0]), "Integer(5)")
+
+    def test_fold_comparisons(self):
+        ast, folder = self.fold("int x; { if (1 < 2) { print(x) }; while (x != x) { print(x) } }")
+        ir = DLGenerator().generate(ast)
+        self.assertIn("br i1 true, label %if.true.2", ir)
+        self.assertIn("br i1 false, label %while.body.5", ir)
+        self.assertNotIn("icmp", ir)
+        self.assertEqual(folder.removed, {'icmp': 2, 'load': 2})
+
+    def test_fold_array_index(self):
+        ast, folder = self.fold("int h[4]; { h[1 + 2] = 3; print(h[6 / 2]) }")
+        ir = DLGenerator().generate(ast)
+        self.assertEqual(ir.count("[4 x i32]* %h, i32 0, i32 3"), 2)
+
+    def test_fold_removed_instructions(self):
+        source = "int x, y; { x = 2 * 3 + y * 0; y = x - x + (1 + 2) * y; print(x * 1) }"
+        before = self.count_instructions(DLGenerator().build(self.build_ast(source)))
+        ast, folder = self.fold(source)
+        after = self.count_instructions(DLGenerator().build(ast))
+        self.assertEqual(before - after, folder.removed_count())
+
+    def test_fold_arena(self):
+        source = "int x; { print(5 + 7); print(x * 1 + 0); if (x == x) { print(3 - 1) } }"
+        arena = ASTArena()
+        ast = DLSemanticAnalyzer().analyze(DLParser(nodes=arena).parse(DLLexer().tokenize(source)))
+        folder = DLConstantFolder(arena)
+        folder.fold(ast)
+        expected, expected_folder = self.fold(source)
+        self.assertEqual(DLGenerator().generate(ast), DLGenerator().generate(expected))
+        self.assertEqual(folder.removed, expected_folder.removed)
+
+    def build_ast(self, source):
+        ast = DLParser().parse(DLLexer().tokenize(source))
+        return DLSemanticAnalyzer().analyze(ast)
+
+    def fold(self, source):
+        folder = DLConstantFolder()
+        return folder.fold(self.build_ast(source)), folder
+
+    def printed(self, ast):
+        """Return the folded values printed by the main block."""
+        return [statement.arg.value for statement in ast.body.statements]
+
+    def count_instructions(self, module):
+        return sum(len(block.instructions) for function in module.functions for block in function.blocks)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+
+import io
+import sys
+sys.path.append('.')
+
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer, UndeclaredVariableError, UndeclaredFunctionError, TypeCheckError
+from dl.generator import DLGenerator
+from dl.fused import DLFusedGenerator
+from dl.arena import ASTArena
+from dl.ast import Program, Block, Print, BinOp, RelOp, Integer
+
+PROGRAMS = [
+    "{ print(1) }",
+    "{ print(2 + 3 * (4 - 1) / 2) }",
+    "int x, y; { x = 4; y = x * 2; print(x + y) }",
+    "int h[10], i; { h[1] = 5; i = h[1]; print(i) }",
+    "int n; { read(n); print(n); return n }",
+    "int q, r, s; { if (q == 1) { print(r) } else { print(s) }; if (r >= q) { print(q) } }",
+    "int i; { i = 0; while (i < 10) { print(i); i = i + 1 } }",
+    "int h[10], i; { i = 0; while (i < 10) { h[i] = i * i; i = i + 1 }; print(h[h[2] + i / 4]) }",
+    """
+        f(a, b);
+        int c;
+        { c = a - b; return c * 2 }
+        g();
+        { return f(2, 1) }
+        int k;
+        { k = f(g(), 3); print(k) }
+    """,
+    ]
+
+ERRORS = [
+    ("{ print(a) }", UndeclaredVariableError),
+    ("int i; { i = j[1] }", UndeclaredVariableError),
+    ("int h[2]; { h[i] = 1 }", UndeclaredVariableError),
+    ("int r; { if (q == 1) { print(r) } }", UndeclaredVariableError),
+    ("int q, r; { if (q == 1) { print(r) } else { print(s) } }", UndeclaredVariableError),
+    ("int x; { read(y) }", UndeclaredVariableError),
+    ("int x; { y = x }", UndeclaredVariableError),
+    ("{ print(f(1)) }", UndeclaredFunctionError),
+    ("f(a); { return a } { print(f(1, 2)) }", UndeclaredFunctionError),
+    ("f(a); { return b } { print(f(1)) }", UndeclaredVariableError),
+    # The first error found is reported, and it is the same for both
+    ("{ print(f(a)) }", UndeclaredFunctionError),
+    ("int x; { x = y + f(1) }", UndeclaredVariableError),
+    ("int a[3]; { a[x] = f() }", UndeclaredVariableError),
+    ("int a[3]; { a[f()] = x }", UndeclaredFunctionError),
+    ]
+
+class TestFusedGenerator(unittest.TestCase):
+
+    def test_fused_programs(self):
+        for source in PROGRAMS:
+            with self.subTest(source=source):
+                self.assertEqual(self.generate_fused(source), self.generate(source))
+
+    def test_fused_example_files(self):
+        for filename in ("tests/simple.dl", "tests/simple2.dl"):
+            with open(filename) as source_file:
+                source = source_file.read()
+            self.assertEqual(self.generate_fused(source), self.generate(source))
+
+    def test_fused_arena(self):
+        for source in PROGRAMS:
+            ast = DLParser(nodes=ASTArena()).parse(DLLexer().tokenize(source))
+            self.assertEqual(DLFusedGenerator().generate(ast), self.generate(source))
+
+    def test_fused_streamed(self):
+        for source in PROGRAMS:
+            output = io.StringIO()
+            DLFusedGenerator(output=output).generate(self.build_ast(source))
+            self.assertEqual(output.getvalue(), self.generate(source))
+
+    def test_fused_bounds_checks(self):
+        for source in PROGRAMS:
+            with self.subTest(source=source):
+                ast = self.build_ast(source)
+                checked = DLSemanticAnalyzer().analyze(self.build_ast(source))
+                self.assertEqual(DLFusedGenerator(check_bounds=True).generate(ast),
+                                 DLGenerator(check_bounds=True).generate(checked))
+
+    def test_fused_annotates_nodes(self):
+        ast = self.build_ast("int x; { x = 1 + 2; print(x) }")
+        DLFusedGenerator().generate(ast)
+        assign = ast.body.statements[0]
+        self.assertEqual(assign.itype, 'int')
+        self.assertEqual(assign.right.itype, 'int')
+        self.assertEqual(ast.body.statements[1].arg.symbol.name, 'x')
+
+    def test_fused_errors(self):
+        for source, error in ERRORS:
+            with self.subTest(source=source):
+                with self.assertRaises(error) as expected:
+                    self.generate(source)
+                with self.assertRaises(error) as result:
+                    self.generate_fused(source)
+                self.assertEqual(result.exception.message, expected.exception.message)
+
+    def test_fused_type_error(self):
+        # The grammar has no way to use a comparison as an operand
+        for fused in (False, True):
+            ast = Program(Block(Print(BinOp('PLUSOP', Integer(1), RelOp('LTOP', Integer(2), Integer(3))))))
+            with self.assertRaises(TypeCheckError):
+                if fused:
+                    DLFusedGenerator().generate(ast)
+                else:
+                    DLSemanticAnalyzer().analyze(ast)
+
+    def build_ast(self, source):
+        lexer = DLLexer()
+        parser = DLParser()
+        return parser.parse(lexer.tokenize(source))
+
+    def generate(self, source):
+        """Analyze and generate code in two passes."""
+        checked = DLSemanticAnalyzer().analyze(self.build_ast(source))
+        return DLGenerator().generate(checked)
+
+    def generate_fused(self, source):
+        """Analyze and generate code in one pass."""
+        return DLFusedGenerator().generate(self.build_ast(source))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,10 @@
 import unittest
 
 import subprocess
+import shutil
+import tempfile
 import os
+import io
 import sys
 sys.path.append('.')
 
@@ -10,9 +13,28 @@ from dl.lexer import DLLexer
 from dl.parser import DLParser
 from dl.semantic import DLSemanticAnalyzer
 from dl.generator import DLGenerator
-
+from dl.mem2reg import Mem2Reg
+from dl.valuenumbering import LocalValueNumbering
+from dl.deadcode import DeadCodeElimination
+from dl.bounds import BoundsCheckElimination
+from dl.licm import LoopInvariantCodeMotion
+from dl.induction import StrengthReduction
+from dl.inline import Inliner
+from dl.tailcalls import TailCallElimination
+
+# The LLVM interpreter the generated code is run with
+LLI = os.environ.get('LLI') or shutil.which('lli')
+
+# Runs lli with unbuffered output, where coreutils is installed
+STDBUF = shutil.which('stdbuf')
+
+@unittest.skipIf(LLI is None, "lli was not found; set LLI to its path")
 class TestGenerator(unittest.TestCase):
 
+    # Passes run on the module before it is printed (see PIPELINES)
+    passes = ()
+    check_bounds = False
+
     def test_generate_integer_constant(self):
         ir = self.generate('{ print(3) }')
         result = self.execute_llvm(ir)
@@ -87,6 +109,23 @@ class TestGenerator(unittest.TestCase):
         result = self.execute_llvm(ir)
         self.assertEqual(result, "7")
 
+    def test_generate_computed_array_index(self):
+        source_string = """
+            int h[10], i, s;
+            {
+                i = 0;
+                while (i < 10) { h[i] = i * i; i = i + 1 };
+                i = 9;
+                s = 0;
+                while (i >= 0) { s = s + h[i]; i = i - 1 };
+                h[h[2] - 1] = s;
+                print(h[3])
+            }
+        """
+        ir = self.generate(source_string)
+        result = self.execute_llvm(ir)
+        self.assertEqual(result, "285")
+
     def test_generate_read_statement(self):
         source_string = """
             int f;
@@ -264,41 +303,153 @@ class TestGenerator(unittest.TestCase):
         expected = "1\n2\n6\n24\n120\n720\n5040\n40320\n362880\n3628800"
         self.assertEqual(result, expected)
 
+    def test_generate_streamed(self):
+        source_file = open("tests/simple2.dl",'r')
+        source_string = source_file.read()
+        source_file.close()
 
-    def generate(self, source):
-        lexer = DLLexer()
-        parser = DLParser()
-        semantic = DLSemanticAnalyzer()
-        generator = DLGenerator()
+        ast = DLParser().parse(DLLexer().tokenize(source_string))
+        checked = DLSemanticAnalyzer().analyze(ast)
+        output = io.StringIO()
+        written = []
+
+        class ProbeGenerator(DLGenerator):
+            def emit_main_header(self):
+                # What was written before main is generated
+                written.append(output.getvalue())
+                super().emit_main_header()
+
+        generator = ProbeGenerator(output)
+        self.assertIsNone(generator.generate(checked))
+        self.assertEqual(output.getvalue(), DLGenerator().generate(checked))
 
-        tokens = lexer.tokenize(source)
-        ast = parser.parse(tokens)
-        checked = semantic.analyze(ast)
-        ir = generator.generate(checked)
-        return ir
+        # factorial was written, and dropped, before main was generated
+        self.assertIn("define i32 @factorial(i32 %n) {", written[0])
+        self.assertNotIn("@main", written[0])
+        self.assertEqual(generator.module.functions, [])
+        self.assertEqual(generator.module.get_function("factorial").blocks, [])
+
+    def generate(self, source):
+        return generate(source, self.passes, self.check_bounds)
 
     def execute_llvm(self, ir):
-        if ir:
-            outfile = open('test_tmp.ll', "w")
-            outfile.write(ir)
-            outfile.close()
-            runner = os.popen('/usr/local/opt/llvm/bin/lli test_tmp.ll')
-            result = runner.read()
-            runner.close()
-            os.remove('test_tmp.ll')
-            result = result.rstrip()
-        return result
+        return run_llvm(ir).stdout.decode('utf-8').rstrip()
 
     def execute_llvm_read(self, ir, content):
         read_input = (content + '\nEOF').encode('utf-8')
-        if ir:
-            outfile = open('test_tmp.ll', "w")
+        return run_llvm(ir, read_input).stdout.decode('utf-8').rstrip()
+
+
+# The pass pipelines the generator tests run again with: the passes run
+# on the module, in order, and whether array indices are checked. Each
+# program must print the same as without them.
+PIPELINES = {
+    'Mem2Reg': ((Mem2Reg,), False),
+    'ValueNumbering': ((LocalValueNumbering,), False),
+    'DeadCode': ((Mem2Reg, LocalValueNumbering, DeadCodeElimination), False),
+    'BoundsChecks': ((Mem2Reg, BoundsCheckElimination), True),
+    'LoopInvariants': ((LoopInvariantCodeMotion,), False),
+    'StrengthReduction': ((Mem2Reg, LoopInvariantCodeMotion, StrengthReduction, DeadCodeElimination), False),
+    'Inliner': ((Inliner, Mem2Reg, DeadCodeElimination), False),
+    'TailCalls': ((Mem2Reg, TailCallElimination, DeadCodeElimination), False),
+    }
+
+for name, (passes, check_bounds) in PIPELINES.items():
+    globals()['TestGenerator' + name] = type('TestGenerator' + name, (TestGenerator,), {
+        'passes': passes,
+        'check_bounds': check_bounds,
+        '__doc__': "Run the generator tests again, after %s." % ", ".join(
+            pass_class.__name__ for pass_class in passes),
+        })
+
+
+@unittest.skipIf(LLI is None, "lli was not found; set LLI to its path")
+class TestGeneratorPipelines(unittest.TestCase):
+    """Test what the passes of single pipelines do to the programs."""
+
+    def test_generate_index_out_of_range(self):
+        source_string = """
+            int h[10], i;
+            {
+                i = 0;
+                while (i <= 10) { h[i] = i; i = i + 1 };
+                print(i)
+            }
+        """
+        ir = generate(source_string, *PIPELINES['BoundsChecks'])
+        self.assertIn("call void @llvm.trap()", ir)
+        # The program traps at h[10], before it prints
+        result = run_llvm(ir)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertEqual(result.stdout, b"")
+
+    @unittest.skipIf(STDBUF is None, "stdbuf was not found")
+    def test_generate_fault_after_print(self):
+        source_string = """
+            f(k); int i, s; { i = 0; s = 0; while (i < 3) { print(i); s = s + 100 / k; i = i + 1 }; return s }
+            { print(f(0)) }
+        """
+        expected = run_llvm(generate(source_string, (Mem2Reg,)), unbuffered=True)
+        ir = generate(source_string, (Mem2Reg, LoopInvariantCodeMotion))
+        # The loop runs three times, but the division is not moved
+        # above the print before it
+        result = run_llvm(ir, unbuffered=True)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertEqual(result.stdout, b"0\n")
+        self.assertEqual(result.stdout, expected.stdout)
+
+    def test_generate_inlined_returns_of_merged_locals(self):
+        source_string = """
+            f(a); int q; { if (a < 1) { return 7 }; if (a < 5) { q = 1 } else { q = 2 }; return q }
+            g(n); int s, i; { if (n > 9) { return 0 - 1 }; i = 0; s = 0; while (i < n) { s = s + i; i = i + 1 }; return s }
+            { print(f(0)); print(f(3)); print(f(8)); print(g(4)); print(g(12)) }
+        """
+        ir = generate(source_string, *PIPELINES['Inliner'])
+        # Both functions are inlined, and each result phi merges a
+        # return of a constant with the phi of a promoted local
+        self.assertNotIn("call i32 @f", ir)
+        self.assertNotIn("call i32 @g", ir)
+        self.assertIn("%f.1.result = phi i32 [ 7, ", ir)
+        result = run_llvm(ir)
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.stdout.decode('utf-8').rstrip(), "7\n1\n2\n6\n-1")
+
+    def test_generate_deep_recursion(self):
+        source_string = """
+            sum(n, acc); { if (n == 0) { return acc }; return sum(n - 1, acc + n) }
+            count(n); int r; { if (n == 0) { r = 0 } else { r = count(n - 1) + 1 }; return r }
+            { print(sum(1000000, 0)); print(count(10000000)) }
+        """
+        ir = generate(source_string, *PIPELINES['TailCalls'])
+        # Ten million calls would overflow the stack
+        result = run_llvm(ir).stdout.decode('utf-8').rstrip()
+        self.assertEqual(result, "1784293664\n10000000")
+
+
+def generate(source, passes=(), check_bounds=False):
+    """Generate the code of source, running passes on the module."""
+    ast = DLParser().parse(DLLexer().tokenize(source))
+    checked = DLSemanticAnalyzer().analyze(ast)
+    if not passes and not check_bounds:
+        return DLGenerator().generate(checked)
+    module = DLGenerator(check_bounds=check_bounds).build(checked)
+    for pass_class in passes:
+        pass_class().run(module)
+    return str(module)
+
+def run_llvm(ir, read_input=b"", unbuffered=False):
+    """Run the code ir with lli, and return the completed process.
+    With unbuffered set, the output is not buffered, so what is printed
+    before a fault is kept."""
+    command = [LLI]
+    if unbuffered:
+        command = [STDBUF, '-o0'] + command
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, 'test_tmp.ll')
+        with open(filename, "w") as outfile:
             outfile.write(ir)
-            outfile.close()
-            result = subprocess.run(["/usr/local/opt/llvm/bin/lli", "test_tmp.ll"], input=read_input, stdout=subprocess.PIPE)
-            os.remove('test_tmp.ll')
-            output = result.stdout.decode('utf-8').rstrip()
-        return output
+        return subprocess.run(command + [filename], input=read_input, stdout=subprocess.PIPE)
+
 
 if __name__ == '__main__':
     unittest.main()
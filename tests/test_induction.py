@@ -0,0 +1,92 @@
+import unittest
+
+import sys
+sys.path.append('.')
+
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+from dl.mem2reg import Mem2Reg
+from dl.induction import trip_count, induction_variables, StrengthReduction
+from dl.ir import BinaryOperator, Phi
+
+class TestInductionVariables(unittest.TestCase):
+
+    def test_trip_count(self):
+        self.assertEqual(trip_count('slt', 0, 1, 10), 10)
+        self.assertEqual(trip_count('slt', 0, 3, 10), 4)
+        self.assertEqual(trip_count('sle', 0, 3, 9), 4)
+        self.assertEqual(trip_count('sgt', 10, -1, 0), 10)
+        self.assertEqual(trip_count('sge', 10, -2, 0), 6)
+        self.assertEqual(trip_count('ne', 0, 2, 10), 5)
+        self.assertEqual(trip_count('eq', 0, 1, 0), 1)
+        self.assertEqual(trip_count('slt', 10, 1, 0), 0)
+        # Counting the wrong way, past the bound, or wrapping around
+        self.assertIsNone(trip_count('slt', 0, -1, 10))
+        self.assertIsNone(trip_count('ne', 0, 2, 9))
+        self.assertIsNone(trip_count('ne', 0, -1, 10))
+        self.assertIsNone(trip_count('ne', 0, 1, -10))
+        self.assertIsNone(trip_count('slt', 0, 2**30, 2**31 - 1))
+
+    def test_basic_and_derived(self):
+        source = "f(k); int i, j, s; { while (i < 10) { s = s + (i + 1) * k + i * i + j; j = s; i = i + 1 }; return s } { print(f(2)) }"
+        variables, = induction_variables(self.promote(source).get_function("f"))
+        i, = variables.basic
+        self.assertEqual(i.name, "i.phi.0")
+        start, update = variables.basic[i]
+        self.assertEqual(start.value, 0)
+        self.assertEqual(update.opcode, "add")
+        multiplies = [instruction for instruction in variables.loop.header.successors[0].instructions
+                      if instruction.__class__ is BinaryOperator and instruction.opcode == "mul"]
+        self.assertEqual([variables.linear(multiply) for multiply in multiplies], [i, None])
+        self.assertEqual(variables.trip_count, 10)
+
+    def test_unknown_trip_count(self):
+        source = """f(n); int i; { while (i < n) { i = i + 1 }; while (i < 10) { if (i == n) { return i }; i = i + 1 }; return 0 }
+                    { print(f(3)) }"""
+        loops = induction_variables(self.promote(source).get_function("f"))
+        self.assertEqual([variables.trip_count for variables in loops], [None, None])
+
+    def test_reduce(self):
+        module, reducer = self.reduce("f(k); int i, s; { while (i < 10) { s = s + i * k; i = i + 1 }; return s } { print(f(2)) }")
+        f = module.get_function("f")
+        self.assertNotIn("mul", str(f))
+        phi = f.blocks[1].instructions[0]
+        self.assertEqual(phi.__class__, Phi)
+        # i * k starts at 0, and has k added on every iteration
+        self.assertEqual(phi.operands[0].value, 0)
+        self.assertEqual(phi.operands[1].format(), "%s.next = add i32 %s, %s" % (phi.ref, phi.ref, "%k"))
+        self.assertEqual((reducer.reduced, reducer.phis), (1, 1))
+        self.assertEqual(reducer.trip_counts, [("f", "while.loop.1", 10)])
+
+    def test_reduce_nested(self):
+        source = "int i, j, s, h[100]; { while (i < 10) { j = 0; while (j < 10) { h[i * 10 + j] = i * j; j = j + 1 }; i = i + 1 }; print(h[99]) }"
+        module, reducer = self.reduce(source)
+        self.assertNotIn("mul", str(module))
+        self.assertEqual(reducer.reduced, 2)
+        # i * 10 in the outer loop, and i * j in the inner one, where i
+        # does not change
+        main = str(module.get_function("main"))
+        self.assertIn("%tmp.9.iv.next = add i32 %tmp.9.iv, 10", main)
+        self.assertIn("%tmp.5.iv.next = add i32 %tmp.5.iv, %i.phi.0", main)
+
+    def test_keep_nonlinear(self):
+        module, reducer = self.reduce("f(n); int i, s; { while (i < n) { s = s + i * i + n * n; i = i + 1 }; return s } { print(f(3)) }")
+        self.assertEqual(str(module.get_function("f")).count("mul"), 2)
+        self.assertEqual(reducer.reduced, 0)
+
+    def checked(self, source):
+        return DLSemanticAnalyzer().analyze(DLParser().parse(DLLexer().tokenize(source)))
+
+    def promote(self, source):
+        return Mem2Reg().run(DLGenerator().build(self.checked(source)))
+
+    def reduce(self, source):
+        reducer = StrengthReduction()
+        return reducer.run(self.promote(source)), reducer
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+
+import sys
+sys.path.append('.')
+
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+from dl.mem2reg import Mem2Reg
+from dl.inline import Inliner, call_graph, strongly_connected
+from dl.ir import Alloca, Call, Phi
+
+class TestInliner(unittest.TestCase):
+
+    def test_inline_in_loop(self):
+        source = "sq(x); { return x * x } int i, s; { while (i < 10) { s = s + sq(i); i = i + 1 }; print(s) }"
+        module, inliner = self.inline(source)
+        main = module.get_function("main")
+        self.assertEqual(self.calls(main), ["printf"])
+        self.assertIn("%sq.1.tmp.1 = mul i32 %tmp.", str(main))
+        self.assertEqual(inliner.inlined, {'sq': 1})
+        self.assertEqual(inliner.inlined_count(), 1)
+
+    def test_several_returns(self):
+        source = "ab(x); { if (x < 0) { return 0 - x }; return x } int a; { read(a); print(ab(a)) }"
+        module, inliner = self.inline(source)
+        main = module.get_function("main")
+        result, = [instruction for instruction in main.instructions() if instruction.__class__ is Phi]
+        self.assertEqual(result.name, "ab.1.result")
+        self.assertEqual([block.name for block in result.blocks], ["ab.1.if.true.2", "ab.1.if.end.1"])
+        self.assertEqual(self.calls(main), ["scanf", "printf"])
+
+    def test_rename_locals(self):
+        source = "f(x); int t; { t = x + 1; return t } g(x); int t; { t = f(x) + f(t); return t } { print(g(1)) }"
+        module, inliner = self.inline(source)
+        main = module.get_function("main")
+        # f is inlined twice into g, and g with them into main
+        allocas = [instruction.name for instruction in main.entry.instructions if instruction.__class__ is Alloca]
+        self.assertEqual(allocas, ["g.3.t", "g.3.f.1.t", "g.3.f.2.t"])
+        self.assertEqual(inliner.inlined, {'f': 2, 'g': 1})
+        names = [instruction.name for instruction in main.instructions() if instruction.name]
+        self.assertEqual(len(names), len(set(names)))
+
+    def test_refuse_recursion(self):
+        source = """f(n); { if (n < 1) { return 0 }; return f(n - 1) + 1 }
+                    g(n); { return f(n) + 1 }
+                    { print(g(3)); print(f(2)) }"""
+        module, inliner = self.inline(source)
+        # The calls of f in f, g, main, and in g inlined into main
+        self.assertEqual(inliner.refused, {'recursive': 4})
+        self.assertEqual(inliner.inlined, {'g': 1})
+
+    def test_threshold(self):
+        source = "f(x); { return x * x * x + x * x + x } { print(f(1)); print(f(2)) }"
+        module, inliner = self.inline(source, 0)
+        self.assertEqual(inliner.refused, {'too costly': 2})
+        module, inliner = self.inline(source)
+        self.assertEqual(inliner.inlined, {'f': 2})
+
+    def test_variables_of_main(self):
+        source = "int a; f(x); { return x + a } g(x); { return f(x) } { a = 2; print(f(1)); print(g(1)) }"
+        module, inliner = self.inline(source)
+        main = module.get_function("main")
+        a = main.entry.instructions[0]
+        self.assertEqual(a.name, "a")
+        # f is not inlined into g, which has no variable a, but both
+        # calls are inlined into main, where f uses a of main
+        self.assertEqual(len([user for user in a.uses if user.block.function is main]), 4)
+        self.assertEqual(inliner.refused, {'variables of main': 1})
+        self.assertEqual(self.calls(main), ["printf", "printf"])
+
+    def test_strongly_connected(self):
+        source = "h(n); { return n } g(n); { return h(n) } f(n); { return f(g(n)) } { print(f(1)) }"
+        module = DLGenerator().build(self.checked(source))
+        graph = call_graph(module)
+        components = [[function.name for function in component] for component in strongly_connected(graph)]
+        self.assertEqual(components, [["h"], ["g"], ["f"], ["main"]])
+
+    def test_promote_after(self):
+        source = "f(x); int t; { t = x * 2; return t } { print(f(3)) }"
+        module, inliner = self.inline(source)
+        Mem2Reg().run(module)
+        self.assertNotIn("alloca", str(module.get_function("main")))
+
+    def checked(self, source):
+        return DLSemanticAnalyzer().analyze(DLParser().parse(DLLexer().tokenize(source)))
+
+    def inline(self, source, *args):
+        module = DLGenerator().build(self.checked(source))
+        inliner = Inliner(*args)
+        return inliner.run(module), inliner
+
+    def calls(self, function):
+        return [instruction.operands[0].name for instruction in function.instructions()
+                if instruction.__class__ is Call]
+
+
+if __name__ == '__main__':
+    unittest.main()
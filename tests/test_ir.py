@@ -0,0 +1,118 @@
+import unittest
+
+import sys
+sys.path.append('.')
+
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+from dl.ir import (Module, Function, BasicBlock, Alloca, Load, Store, BinaryOperator,
+                   ICmp, Call, Phi, Branch, Return)
+
+class TestIR(unittest.TestCase):
+
+    def test_ir_print_function(self):
+        module = Module()
+        function = module.add_function(Function("f", ["a", "b"]))
+        entry = function.add_block(BasicBlock("entry"))
+        a, b = function.args
+        total = entry.append(BinaryOperator("add", a, b, "tmp.1"))
+        entry.append(Return(total))
+        self.assertEqual(str(module),
+                         "define i32 @f(i32 %a, i32 %b) {\n"
+                         "entry:\n"
+                         "  %tmp.1 = add i32 %a, %b\n"
+                         "  ret i32 %tmp.1\n"
+                         "}\n")
+
+    def test_ir_use_def_chains(self):
+        module = Module()
+        function = module.add_function(Function("f", ["a"]))
+        entry = function.add_block(BasicBlock("entry"))
+        a = function.args[0]
+        one = module.constant(1)
+        self.assertIs(module.constant(1), one)
+
+        variable = entry.append(Alloca("i32", "x"))
+        store = entry.append(Store(a, variable))
+        load = entry.append(Load(variable, "tmp.1"))
+        total = entry.append(BinaryOperator("add", load, one, "tmp.2"))
+        entry.append(Return(total))
+        self.assertEqual(variable.uses, [store, load])
+        self.assertEqual(a.uses, [store])
+        self.assertEqual(load.type, "i32")
+
+        # Forward the stored value to the use of the load
+        load.replace_all_uses_with(a)
+        self.assertEqual(total.operands, [a, one])
+        self.assertEqual(load.uses, [])
+        load.erase()
+        self.assertEqual(variable.uses, [store])
+        self.assertNotIn(load, entry.instructions)
+
+        # Constants are shared, and do not record their uses
+        total.set_operand(1, module.constant(2))
+        self.assertIs(total.operands[1], module.constant(2))
+        self.assertEqual(len(one.uses), 0)
+        self.assertEqual(total.format(), "%tmp.2 = add i32 %a, 2")
+
+    def test_ir_control_flow(self):
+        module = Module()
+        function = module.add_function(Function("f", ["a"]))
+        entry = function.add_block(BasicBlock("entry"))
+        true_block = function.add_block(BasicBlock("if.true.1"))
+        end_block = function.add_block(BasicBlock("if.end.2"))
+        a = function.args[0]
+
+        condition = entry.append(ICmp("eq", a, module.constant(0), "tmp.1"))
+        entry.append(Branch(condition, true_block, end_block))
+        true_block.append(Branch(end_block))
+        phi = end_block.append(Phi("i32", "tmp.2"))
+        phi.add_incoming(module.constant(1), entry)
+        phi.add_incoming(a, true_block)
+        end_block.append(Return(phi))
+
+        self.assertEqual(entry.successors, [true_block, end_block])
+        self.assertEqual(end_block.predecessors, [entry, true_block])
+        self.assertIsNone(BasicBlock().terminator)
+        self.assertEqual(phi.format(), "%tmp.2 = phi i32 [ 1, %entry ], [ %a, %if.true.1 ]")
+        self.assertEqual(entry.instructions[-1].format(),
+                         "br i1 %tmp.1, label %if.true.1, label %if.end.2")
+
+    def test_ir_declarations(self):
+        module = Module()
+        printf = module.add_function(Function("printf", param_types=["i8*"], varargs=True,
+                                              attributes="nounwind"))
+        self.assertTrue(printf.is_declaration)
+        self.assertEqual(str(module), "declare i32 @printf(i8*, ...) nounwind\n")
+        call = Call(printf, [module.constant(1)])
+        self.assertEqual(call.format(), "call i32 (i8*, ...) @printf(i32 1)")
+        self.assertEqual(printf.uses, [call])
+
+    def test_ir_generated_module(self):
+        source = """
+            f(a);
+            { return a * 2 }
+            int x, h[3];
+            { x = f(4); h[1] = x; print(h[1]) }
+        """
+        ast = DLParser().parse(DLLexer().tokenize(source))
+        generator = DLGenerator()
+        module = generator.build(DLSemanticAnalyzer().analyze(ast))
+        f = module.get_function("f")
+        main = module.get_function("main")
+        self.assertEqual([function.name for function in module.functions],
+                         ["f", "printf", "scanf", "main"])
+        self.assertEqual(len(f.uses), 1)
+        self.assertIs(f.uses[0].block, main.entry)
+        opcodes = [instruction.__class__.__name__ for instruction in main.instructions()]
+        self.assertEqual(opcodes, ["Alloca", "Store", "Alloca", "Call", "Store", "Load",
+                                   "GetElementPtr", "Store", "GetElementPtr", "Load", "Call",
+                                   "Return"])
+        self.assertEqual(str(module), DLGenerator().generate(ast))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,13 @@
 import unittest
 
+import os
 import sys
+import tempfile
 sys.path.append('.')
 
 
 from dl.lexer import DLLexer
+from dl.names import Name, NameTable
 
 class TestLexer(unittest.TestCase):
 
@@ -216,6 +219,106 @@ class TestLexer(unittest.TestCase):
         self.assertEqual(tokens[58].value, '}')
         self.assertEqual(tokens[58].type, 'CLOSECURLY')
 
+    def test_token_arrays_match_tokenize(self):
+        source_file = open("tests/simple.dl",'r')
+        source_string = source_file.read()
+        source_file.close()
+        source_string += "iffy int1 while9 if else\n\n/* two\nlines */ x = 12 >= y != z"
+
+        lexer = DLLexer()
+        expected = [(tok.type, tok.value, tok.lineno, tok.index) for tok in lexer.tokenize(source_string)]
+
+        bulk = DLLexer()
+        arrays = bulk.tokenize_arrays(source_string)
+        result = [(tok.type, tok.value, tok.lineno, tok.index) for tok in arrays.tokens()]
+
+        self.assertEqual(result, expected)
+        self.assertEqual(bulk.lineno, lexer.lineno)
+        self.assertEqual(len(arrays), len(expected))
+
+    def test_token_arrays_codes(self):
+        lexer = DLLexer()
+        arrays = lexer.tokenize_arrays('int count;\n  count = 42')
+
+        self.assertEqual([arrays.type(n) for n in range(len(arrays))],
+                         ['INT', 'IDENTIFIER', 'SEMICOLON', 'IDENTIFIER', 'ASSIGNOP', 'INTCONSTANT'])
+        self.assertEqual(arrays.types[0], DLLexer.token_names.index('INT'))
+        self.assertEqual(list(arrays.starts), [0, 4, 9, 13, 19, 21])
+        self.assertEqual(list(arrays.ends), [3, 9, 10, 18, 20, 23])
+        self.assertEqual(list(arrays.linenos), [1, 1, 1, 2, 2, 2])
+        self.assertEqual(arrays.value(5), '42')
+
+    def test_token_arrays_trailing_spacing(self):
+        lexer = DLLexer()
+        errors = []
+        lexer.error = lambda tok: errors.append(tok.value)
+        arrays = lexer.tokenize_arrays('x\n\n  \n')
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(arrays), 1)
+        self.assertEqual(lexer.lineno, 4)
+
+    def test_token_arrays_illegal_character(self):
+        lexer = DLLexer()
+        errors = []
+        lexer.error = lambda tok: errors.append((tok.value, tok.index, tok.lineno))
+        arrays = lexer.tokenize_arrays('a\n $ b')
+
+        self.assertEqual(errors, [('$', 3, 2)])
+        self.assertEqual([arrays.value(n) for n in range(len(arrays))], ['a', 'b'])
+
+    def test_tokenize_file_matches_tokenize(self):
+        source_file = open("tests/simple.dl",'r')
+        source_string = source_file.read()
+        source_file.close()
+        source_string += "iffy int1 while9 if else\n\n/* two\nlines */ x = 12 >= y != z"
+
+        lexer = DLLexer()
+        expected = [(tok.type, tok.value, tok.lineno, tok.index) for tok in lexer.tokenize(source_string)]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'source.dl')
+            with open(filename, 'w') as f:
+                f.write(source_string)
+            mapped = DLLexer()
+            result = [(tok.type, tok.value, tok.lineno, tok.index) for tok in mapped.tokenize_file(filename)]
+
+        self.assertEqual(result, expected)
+        self.assertEqual(mapped.lineno, lexer.lineno)
+
+    def test_tokenize_bytes_illegal_character(self):
+        lexer = DLLexer()
+        errors = []
+        lexer.error = lambda tok: errors.append((tok.value, tok.index, tok.lineno))
+        result = [(tok.type, tok.value) for tok in lexer.tokenize_bytes(b'a\n $ b')]
+
+        self.assertEqual(errors, [('$', 3, 2)])
+        self.assertEqual(result, [('IDENTIFIER', 'a'), ('IDENTIFIER', 'b')])
+
+    def test_identifiers_interned(self):
+        source = "int ab, c; { ab = c + 1; print(ab) }"
+        for tokenize in (DLLexer.tokenize, DLLexer.tokenize_bytes, lambda lexer, text: lexer.tokenize_arrays(text).tokens()):
+            lexer = DLLexer()
+            text = source.encode('ascii') if tokenize is DLLexer.tokenize_bytes else source
+            values = [tok.value for tok in tokenize(lexer, text) if tok.type == 'IDENTIFIER']
+
+            # Every occurrence of an identifier is the same Name, with a dense ID
+            self.assertEqual(values, ['ab', 'c', 'ab', 'c', 'ab'])
+            self.assertIsInstance(values[0], Name)
+            self.assertIs(values[0], values[2])
+            self.assertIs(values[0], values[4])
+            self.assertEqual([value.id for value in values], [0, 1, 0, 1, 0])
+            self.assertEqual(lexer.names.names, ['ab', 'c'])
+            self.assertEqual(values[0].local, '%ab')
+
+    def test_identifiers_shared_table(self):
+        names = NameTable()
+        first = list(DLLexer(names).tokenize("x"))[0].value
+        second = list(DLLexer(names).tokenize_bytes(b"y x"))[1].value
+        self.assertIs(first, second)
+        self.assertIs(first.table, names)
+        self.assertEqual(len(names), 2)
+
 
 
 if __name__ == '__main__':
@@ -0,0 +1,145 @@
+import unittest
+
+import sys
+sys.path.append('.')
+
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+from dl.mem2reg import Mem2Reg
+from dl.licm import LoopInvariantCodeMotion
+from dl.cfg import immediate_dominators, natural_loops
+from dl.ir import Module, Function, BasicBlock, Branch, Return, Phi, BinaryOperator, ICmp, Load
+
+NESTED = """
+int a, b, i, j, s, h[4];
+{
+    a = 3; b = 4; h[1] = 7; i = 0;
+    while (i < 10) {
+        j = 0;
+        while (j < 10) { s = s + a * b + h[1] + i * 2; j = j + 1 };
+        i = i + 1
+    };
+    print(s)
+}
+"""
+
+class TestLoopInvariantCodeMotion(unittest.TestCase):
+
+    def test_natural_loops(self):
+        module = DLGenerator().build(self.checked(NESTED))
+        loops = natural_loops(immediate_dominators(module.get_function("main")))
+        self.assertEqual([loop.header.name for loop in loops], ["while.loop.4", "while.loop.1"])
+        inner, outer = loops
+        self.assertTrue(inner.blocks < outer.blocks)
+        self.assertEqual([block.name for block in inner.latches], ["while.body.5"])
+        self.assertEqual([block.name for block in inner.exits()], ["while.end.6"])
+        self.assertEqual([block.name for block in outer.outside_predecessors()], ["entry"])
+
+    def test_hoist_out_of_nested_loops(self):
+        module, mover = self.move(NESTED, promote=True)
+        main = module.get_function("main")
+        # a * b and h[1] move out of both loops, i * 2 out of the inner one
+        self.assertEqual(self.opcodes(self.block(main, "entry"))[-4:], ["mul", "getelementptr", "load", "br"])
+        self.assertEqual(self.opcodes(self.block(main, "while.body.2")), ["mul", "br"])
+        self.assertEqual(self.opcodes(self.block(main, "while.body.5")), ["add", "add", "add", "add", "br"])
+        self.assertEqual(mover.loops, 2)
+        self.assertEqual(mover.hoisted, {'mul': 3, 'getelementptr': 2, 'load': 2})
+        self.assertEqual(mover.hoisted_count(), 7)
+
+    def test_hoist_loads_of_variables(self):
+        module, mover = self.move("int a, i, s; { a = 2; while (i < 3) { s = s + a; i = i + 1 }; print(s) }")
+        main = module.get_function("main")
+        loads = [load.operands[0].name for load in self.instructions(self.block(main, "entry"), Load)]
+        self.assertEqual(loads, ["a"])
+        # s and i are stored in the loop, and are loaded in it
+        self.assertEqual(mover.hoisted, {'load': 1})
+
+    def test_read_writes_variable(self):
+        source = "int a, b, i, s; { read(a); while (i < 3) { s = s + a + b; read(a); i = i + 1 }; print(s) }"
+        module, mover = self.move(source)
+        self.assertEqual(mover.hoisted, {'load': 1})
+        load, = self.instructions(self.block(module.get_function("main"), "entry"), Load)
+        self.assertEqual(load.operands[0].name, "b")
+
+    def test_print_writes_nothing(self):
+        module, mover = self.move("int a, i; { a = 2; while (i < 3) { print(a); i = i + 1 } }")
+        self.assertEqual(mover.hoisted, {'load': 1})
+
+    def test_calls_write_anything(self):
+        source = "int a, i, s; f(x); { return x } { a = 2; while (i < 3) { s = s + a + f(i); i = i + 1 }; print(s) }"
+        module, mover = self.move(source)
+        self.assertEqual(mover.hoisted, {})
+
+    def test_keep_code_that_may_fault(self):
+        source = "f(n, d); int h[4], i, s; { while (i < n) { s = s + n / d + n / 2 + h[d]; i = i + 1 }; return s } { print(f(3, 1)) }"
+        module, mover = self.move(source, promote=True)
+        # n / d may divide by zero, and h[d] be out of range, if the loop
+        # never runs, but its address may be computed
+        self.assertEqual(mover.hoisted, {'udiv': 1, 'getelementptr': 1})
+        self.assertEqual(self.opcodes(module.get_function("f").blocks[0])[-3:], ["udiv", "getelementptr", "br"])
+
+    def test_hoist_code_that_runs_anyway(self):
+        source = "f(n, d); int h[4], i, s; { while (i < 3) { s = s + n / d + h[d]; i = i + 1 }; return s } { print(f(3, 1)) }"
+        module, mover = self.move(source, promote=True)
+        # The loop runs three times, so n / d and h[d] are computed
+        # at least once
+        self.assertEqual(mover.hoisted, {'udiv': 1, 'getelementptr': 1, 'load': 1})
+
+    def test_keep_code_that_may_fault_after_calls(self):
+        source = "f(n, d); int h[4], i, s; { while (i < 3) { print(i); s = s + n / d + h[d]; i = i + 1 }; return s } { print(f(3, 1)) }"
+        module, mover = self.move(source, promote=True)
+        # The loop runs three times, but n / d and h[d] would be
+        # computed before the print
+        self.assertEqual(mover.hoisted, {'getelementptr': 1})
+
+    def test_add_preheader(self):
+        module = Module()
+        function = module.add_function(Function("f", ["n"]))
+        n, = function.args
+        entry = function.add_block(BasicBlock("entry"))
+        loop = function.add_block(BasicBlock("loop"))
+        end = function.add_block(BasicBlock("end"))
+        entry.append(Branch(entry.append(ICmp("slt", n, module.constant(10), "small")), loop, end))
+        phi = loop.append(Phi("i32", "i"))
+        twice = loop.append(BinaryOperator("mul", n, module.constant(2), "twice"))
+        step = loop.append(BinaryOperator("add", phi, twice, "step"))
+        loop.append(Branch(loop.append(ICmp("slt", step, module.constant(100), "test")), loop, end))
+        end.append(Return(module.constant(0)))
+        phi.add_incoming(module.constant(0), entry)
+        phi.add_incoming(step, loop)
+        mover = LoopInvariantCodeMotion()
+        mover.run(module)
+        self.assertEqual([block.name for block in function.blocks], ["entry", "loop.preheader", "loop", "end"])
+        preheader = self.block(function, "loop.preheader")
+        self.assertEqual(preheader.instructions, [twice, preheader.terminator])
+        self.assertEqual(phi.blocks, [preheader, loop])
+        self.assertEqual(entry.successors, [preheader, end])
+        self.assertEqual(mover.preheaders, 1)
+
+    def checked(self, source):
+        return DLSemanticAnalyzer().analyze(DLParser().parse(DLLexer().tokenize(source)))
+
+    def move(self, source, promote=False):
+        module = DLGenerator().build(self.checked(source))
+        if promote:
+            Mem2Reg().run(module)
+        mover = LoopInvariantCodeMotion()
+        return mover.run(module), mover
+
+    def block(self, function, name):
+        for block in function.blocks:
+            if block.name == name:
+                return block
+
+    def opcodes(self, block):
+        return [instruction.opcode for instruction in block.instructions]
+
+    def instructions(self, block, instruction_class):
+        return [instruction for instruction in block.instructions if instruction.__class__ is instruction_class]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+
+import sys
+sys.path.append('.')
+
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+from dl.mem2reg import Mem2Reg
+from dl.inline import Inliner
+from dl.ir import Alloca, Load, Store, Phi
+from dl.cfg import reverse_postorder, immediate_dominators, dominance_frontiers
+
+class TestMem2Reg(unittest.TestCase):
+
+    def test_promote_straight_line(self):
+        module, promoter = self.promote("int x; { x = 2; x = x + 3; print(x) }")
+        main = module.get_function("main")
+        self.assertEqual(self.opcodes(main, Alloca, Load, Store, Phi), [])
+        self.assertIn("add i32 2, 3", str(main))
+        self.assertEqual(promoter.promoted, 1)
+        self.assertEqual(promoter.removed, {'alloca': 1, 'load': 2, 'store': 3})
+
+    def test_promote_while(self):
+        module, promoter = self.promote("int i, s; { i = 0; s = 0; while (i < 10) { s = s + i; i = i + 1 }; print(s) }")
+        main = module.get_function("main")
+        phis = self.opcodes(main, Phi)
+        self.assertEqual(len(phis), 2)
+        self.assertEqual(promoter.phis, 2)
+        for phi in phis:
+            self.assertEqual(phi.block.name, self.loop_header(main).name)
+            self.assertEqual(phi.operands[0].value, 0)
+        self.assertEqual(self.opcodes(main, Alloca, Load, Store), [])
+
+    def test_promote_if(self):
+        module, promoter = self.promote("int x, y; { read(y); if (y < 3) { x = 1 } else { x = 2 }; print(x) }")
+        main = module.get_function("main")
+        phi, = self.opcodes(main, Phi)
+        self.assertEqual(sorted(operand.value for operand in phi.operands), [1, 2])
+        self.assertEqual(len(phi.blocks), 2)
+
+    def test_dead_phis_removed(self):
+        # x changes in both branches, but is never read after the join
+        module, promoter = self.promote("int x, y; { read(y); if (y < 3) { x = 1 } else { x = 2 } }")
+        self.assertEqual(self.opcodes(module.get_function("main"), Phi), [])
+        self.assertEqual(promoter.phis, 0)
+
+    def test_phi_used_by_existing_phi(self):
+        # After inlining, the phi of q is only used by the result phi of
+        # the inlined call, which was there before Mem2Reg ran
+        source = "f(a); int q; { if (a < 1) { return 7 }; if (a < 5) { q = 1 } else { q = 2 }; return q } { print(f(3)) }"
+        ast = DLSemanticAnalyzer().analyze(DLParser().parse(DLLexer().tokenize(source)))
+        module = Inliner().run(DLGenerator().build(ast))
+        promoter = Mem2Reg()
+        promoter.run(module)
+        main = module.get_function("main")
+        phis = self.opcodes(main, Phi)
+        result, = [phi for phi in phis if phi.name.endswith(".result")]
+        q_phi, = [operand for operand in result.operands if operand.__class__ is Phi]
+        self.assertIn(q_phi, phis)
+        self.assertEqual(sorted(operand.value for operand in q_phi.operands), [1, 2])
+
+    def test_keep_read_targets_and_arrays(self):
+        module, promoter = self.promote("int x, y, h[3]; { read(x); h[1] = x; y = h[1]; print(y) }")
+        main = module.get_function("main")
+        self.assertEqual([alloca.name for alloca in self.opcodes(main, Alloca)], ["x", "h"])
+        self.assertEqual(promoter.promoted, 1)
+
+    def test_promote_functions(self):
+        module, promoter = self.promote("int g; f(a); int t; { t = a * 2; g = t; return t + g } { print(f(3)) }")
+        f = module.get_function("f")
+        # t is promoted, but g belongs to main and stays in memory
+        self.assertEqual([instruction.operands[-1].name for instruction in self.opcodes(f, Load, Store)], ["g", "g"])
+        self.assertIn("add i32 %tmp.1, %tmp.5", str(f))
+
+    def test_unreachable_code(self):
+        module, promoter = self.promote("f(a); int t; { t = a; return t; t = t + 1; print(t) } { print(f(1)) }")
+        f = module.get_function("f")
+        self.assertEqual(self.opcodes(f, Alloca, Load, Store), [])
+        self.assertIn("add i32 undef, 1", str(f))
+
+    def test_simple_program(self):
+        with open('tests/simple.dl') as file:
+            source = file.read()
+        module, promoter = self.promote(source)
+        self.assertGreater(promoter.promoted, 0)
+        for function in module.functions:
+            if function.blocks:
+                self.assertEqual(self.opcodes(function, Load, Store),
+                                 [instruction for instruction in self.opcodes(function, Load, Store)
+                                  if instruction.operands[-1].__class__ is not Alloca
+                                  or instruction.operands[-1].allocated_type != "i32"])
+
+    def test_deep_nesting(self):
+        depth = 2000
+        source = "int x; {" + " if (x < 1) {" * depth + " x = 1 " + "}" * depth + "; print(x) }"
+        module, promoter = self.promote(source)
+        self.assertEqual(promoter.promoted, 1)
+
+    def test_dominance_frontiers(self):
+        ast = DLSemanticAnalyzer().analyze(DLParser().parse(DLLexer().tokenize(
+            "int x; { if (x < 1) { x = 1 } else { x = 2 }; print(x) }")))
+        main = DLGenerator().build(ast).get_function("main")
+        order = reverse_postorder(main)
+        idom = immediate_dominators(main, order)
+        frontiers = dominance_frontiers(idom)
+        entry = order[0]
+        self.assertIs(idom[entry], entry)
+        join = [block for block in order if len(block.predecessors) == 2][0]
+        self.assertIs(idom[join], entry)
+        for block in order:
+            if block is not entry and block is not join:
+                self.assertEqual(frontiers[block], {join})
+
+    def promote(self, source):
+        ast = DLSemanticAnalyzer().analyze(DLParser().parse(DLLexer().tokenize(source)))
+        module = DLGenerator().build(ast)
+        promoter = Mem2Reg()
+        return promoter.run(module), promoter
+
+    def opcodes(self, function, *classes):
+        """Return the instructions of a function of the given classes."""
+        return [instruction for instruction in function.instructions() if instruction.__class__ in classes]
+
+    def loop_header(self, function):
+        return [block for block in function.blocks if block.name and block.name.startswith("while.loop")][0]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,19 @@
 import unittest
 
+import os
 import sys
+import pickle
+import tempfile
+from unittest import mock
 sys.path.append('.')
 
+from sly import Parser
+from sly.yacc import LRTable, CachedLRTable, DenseLRTable, DENSE_ERROR
 
 from dl.lexer import DLLexer
+import dl.parser
 from dl.parser import DLParser
-from dl.ast import Integer, Variable, BinOp, RelOp, ArrayIndex, \
+from dl.ast import ASTNode, Integer, Variable, BinOp, RelOp, ArrayIndex, \
                    Assign, Print, Read, Return, If, While, Block, \
                    FunctionCall, Arguments, FunctionDeclaration, \
                    Declarations, VariableDeclarations, Program
@@ -488,6 +495,277 @@ class TestParser(unittest.TestCase):
         self.assertEqual(str(second.condition), "RelOp(LEOP, Variable(x), Integer(10))")
         self.assertEqual(str(second.body), "Block(Print(FunctionCall(factorial, Arguments(Variable(x)))), Assign(Variable(x), BinOp(PLUSOP, Variable(x), Integer(1))))")
 
+    def test_parse_long_statement_list(self):
+        lexer = DLLexer()
+        parser = DLParser()
+
+        source_string = "{ " + "; ".join("print(%d)" % n for n in range(2000)) + " }"
+        depth = []
+        def track(tokens):
+            for tok in tokens:
+                depth.append(len(parser.statestack))
+                yield tok
+        result = parser.parse(track(lexer.tokenize(source_string)))
+
+        statements = result.body.statements
+        self.assertEqual(len(statements), 2000)
+        self.assertEqual(str(statements[0]), "Print(Integer(0))")
+        self.assertEqual(str(statements[1999]), "Print(Integer(1999))")
+        # Left recursive lists keep the parse stack shallow
+        self.assertLess(max(depth), 10)
+
+    def test_parse_token_arrays(self):
+        lexer = DLLexer()
+        parser = DLParser()
+
+        source_file = open("tests/simple2.dl", 'r')
+        source_string = source_file.read()
+        source_file.close()
+
+        expected = parser.parse(lexer.tokenize(source_string))
+        result = parser.parse(lexer.tokenize_arrays(source_string).tokens())
+        self.assertEqual(str(result), str(expected))
+
+    def test_parse_nodes_slotted(self):
+        lexer = DLLexer()
+        parser = DLParser()
+
+        source_file = open("tests/simple2.dl", 'r')
+        source_string = source_file.read()
+        source_file.close()
+        result = parser.parse(lexer.tokenize(source_string))
+
+        nodes = [result]
+        while nodes:
+            node = nodes.pop()
+            self.assertFalse(hasattr(node, '__dict__'), type(node).__name__)
+            self.assertIsNone(node.itype)
+            self.assertIsNone(node.symbol)
+            for cls in type(node).__mro__:
+                for name in getattr(cls, '__slots__', ()):
+                    value = getattr(node, name)
+                    if isinstance(value, list):
+                        nodes.extend(value)
+                    elif isinstance(value, ASTNode):
+                        nodes.append(value)
+
+    def test_parse_list_order(self):
+        lexer = DLLexer()
+        parser = DLParser()
+
+        source_string = """
+            int a, b[3], c;
+            f(x, y, z);
+            { return g(x, y, z) }
+            { ; print(f(1, 2, 3)); ; }
+        """
+        result = parser.parse(lexer.tokenize(source_string))
+        self.assertEqual(str(result), "Program(Declarations(VariableDeclarations(INT, Variable(a), ArrayIndex(Variable(b), Integer(3)), Variable(c)), FunctionDeclaration(f, Arguments(Variable(x), Variable(y), Variable(z)), Block(Return(FunctionCall(g, Arguments(Variable(x), Variable(y), Variable(z))))))), Block(Print(FunctionCall(f, Arguments(Integer(1), Integer(2), Integer(3))))))")
+
+
+class TestDenseParser(TestParser):
+    """Run the TestParser corpus through DLParser.parse_dense()."""
+
+    def setUp(self):
+        patcher = mock.patch.object(DLParser, 'parse', DLParser.parse_dense)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_dense_tables_match(self):
+        lrtable = DLParser._lrtable
+        table = DLParser.dense_tables()
+        self.assertIsInstance(table, DenseLRTable)
+        self.assertIs(DLParser.dense_tables(), table)
+
+        code = { sym: n for n, sym in enumerate(table.symbols) }
+        for state, row in lrtable.lr_action.items():
+            base = table.action_base[state]
+            for sym in table.terminals:
+                n = base + code[sym]
+                if base >= 0 and table.action_check[n] == state:
+                    t = table.action_value[n]
+                else:
+                    t = table.action_default[state]
+                expected = row.get(sym)
+                if expected is None:
+                    # Errors may only be hidden behind a default reduction
+                    self.assertTrue(t == DENSE_ERROR or t < 0)
+                else:
+                    self.assertEqual(t, expected)
+        for state, row in lrtable.lr_goto.items():
+            for sym, target in row.items():
+                self.assertEqual(table.goto_value[table.goto_base[state] + code[sym]], target)
+
+    def test_dense_syntax_error(self):
+        lexer = DLLexer()
+        parser = DLParser()
+        errors = []
+        parser.error = lambda tok: errors.append(tok and tok.type)
+
+        self.assertIsNone(parser.parse(lexer.tokenize("{ x = = 2; print(3) }")))
+        self.assertEqual(errors, ['ASSIGNOP'])
+
+
+class TestDirectParser(TestParser):
+    """Run the TestParser corpus through DLParser.parse_direct()."""
+
+    def setUp(self):
+        patcher = mock.patch.object(DLParser, 'parse', DLParser.parse_direct)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_direct_source_stable(self):
+        self.assertEqual(DLParser.direct_source(), DLParser.direct_source())
+        self.assertIs(DLParser.direct_parser(), DLParser.direct_parser())
+
+    def test_direct_syntax_error_recovery(self):
+        lexer = DLLexer()
+        errors = []
+
+        for parse in (DLParser.parse_dense, DLParser.parse_direct):
+            parser = DLParser()
+            parser.error = lambda tok: errors.append(tok and tok.type)
+            result = parse(parser, lexer.tokenize("int ; { print(1) }"))
+            self.assertEqual(str(result), "Program(Block(Print(Integer(1))))")
+
+        self.assertEqual(errors, ['SEMICOLON', 'SEMICOLON'])
+
+    def test_direct_production_values(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            SumParser = build_sum_parser(os.path.join(tmpdir, 'sum.lrtab'))
+            lexer = DLLexer()
+            self.assertEqual(SumParser().parse_direct(lexer.tokenize("1 + 2 + 39")), 42)
+
+
+def build_sum_parser(path, module=None):
+    """Define a tiny parser that caches its tables at path."""
+    class SumParser(Parser):
+        tokens = { INTCONSTANT, PLUSOP }
+        cachefile = path
+        tablemodule = module
+
+        @_('expr PLUSOP INTCONSTANT')
+        def expr(self, p):
+            return p.expr + int(p.INTCONSTANT)
+
+        @_('INTCONSTANT')
+        def expr(self, p):
+            return int(p.INTCONSTANT)
+
+    return SumParser
+
+class TestParserTableCache(unittest.TestCase):
+
+    def test_cache_written_and_reused(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'sum.lrtab')
+
+            built = build_sum_parser(path)
+            self.assertIsInstance(built._lrtable, LRTable)
+            self.assertTrue(os.path.exists(path))
+
+            cached = build_sum_parser(path)
+            self.assertIsInstance(cached._lrtable, CachedLRTable)
+            self.assertEqual(cached._lrtable.lr_action, built._lrtable.lr_action)
+            self.assertEqual(cached._lrtable.lr_goto, built._lrtable.lr_goto)
+
+            lexer = DLLexer()
+            self.assertEqual(cached().parse(lexer.tokenize("1 + 2 + 39")), 42)
+
+    def test_stale_cache_ignored(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'sum.lrtab')
+            build_sum_parser(path)
+
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+            data['signature'] = 'stale'
+            with open(path, 'wb') as f:
+                pickle.dump(data, f)
+
+            rebuilt = build_sum_parser(path)
+            self.assertIsInstance(rebuilt._lrtable, LRTable)
+
+            lexer = DLLexer()
+            self.assertEqual(rebuilt().parse(lexer.tokenize("4 + 5")), 9)
+
+    def test_corrupt_cache_ignored(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'sum.lrtab')
+            with open(path, 'wb') as f:
+                f.write(b'not a table')
+
+            rebuilt = build_sum_parser(path)
+            self.assertIsInstance(rebuilt._lrtable, LRTable)
+
+    def test_cache_directory_created(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'cache', 'dl', 'sum.lrtab')
+            build_sum_parser(path)
+            self.assertTrue(os.path.exists(path))
+
+    def test_unwritable_cache_not_fatal(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # A file where the cache directory should be cannot be written under
+            blocker = os.path.join(tmpdir, 'blocker')
+            open(blocker, 'w').close()
+            path = os.path.join(blocker, 'sum.lrtab')
+
+            built = build_sum_parser(path)
+            self.assertIsInstance(built._lrtable, LRTable)
+            self.assertFalse(os.path.exists(path))
+
+            lexer = DLLexer()
+            self.assertEqual(built().parse(lexer.tokenize("4 + 5")), 9)
+
+    def test_dl_parser_cache_outside_package(self):
+        package_dir = os.path.dirname(os.path.abspath(dl.parser.__file__))
+        self.assertFalse(os.path.abspath(DLParser.cachefile).startswith(package_dir + os.sep))
+
+
+    def test_table_module_used(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'sum.lrtab')
+            built = build_sum_parser(path)
+            built.write_tables(os.path.join(tmpdir, 'sumtab_current.py'))
+            os.remove(path)
+
+            sys.path.insert(0, tmpdir)
+            try:
+                frozen = build_sum_parser(path, 'sumtab_current')
+            finally:
+                sys.path.remove(tmpdir)
+
+            self.assertTrue(frozen.tables_current())
+            self.assertIsInstance(frozen._lrtable, CachedLRTable)
+            self.assertEqual(frozen._lrtable.lr_action, built._lrtable.lr_action)
+            self.assertEqual(frozen._lrtable.lr_goto, built._lrtable.lr_goto)
+            self.assertEqual(frozen._lrtable.defaulted_states, built._lrtable.defaulted_states)
+            # The cache file is not needed when the table module is current
+            self.assertFalse(os.path.exists(path))
+
+            lexer = DLLexer()
+            self.assertEqual(frozen().parse(lexer.tokenize("10 + 20 + 3")), 33)
+
+    def test_stale_table_module_rebuilt(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'sum.lrtab')
+            module_file = os.path.join(tmpdir, 'sumtab_stale.py')
+            build_sum_parser(path).write_tables(module_file)
+            with open(module_file) as f:
+                source = f.read()
+            with open(module_file, 'w') as f:
+                f.write(source.replace("_signature = '", "_signature = 'stale"))
+
+            sys.path.insert(0, tmpdir)
+            try:
+                rebuilt = build_sum_parser(None, 'sumtab_stale')
+            finally:
+                sys.path.remove(tmpdir)
+
+            self.assertFalse(rebuilt.tables_current())
+            self.assertIsInstance(rebuilt._lrtable, LRTable)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -8,6 +8,7 @@ sys.path.append('.')
 from dl.lexer import DLLexer
 from dl.parser import DLParser
 from dl.semantic import DLSemanticAnalyzer, UndeclaredVariableError, UndeclaredFunctionError, TypeCheckError
+from dl.arena import ASTArena
 
 class TestGenerator(unittest.TestCase):
 
@@ -163,6 +164,18 @@ class TestGenerator(unittest.TestCase):
         assign_statement = main_body.statements[0]
         self.assertEqual(assign_statement.right.itype, "int")
 
+    def test_semantic_computed_array_index(self):
+        ast = self.build_ast("int i, h[4]; { h[i + 1] = h[i] }")
+        result = DLSemanticAnalyzer().analyze(ast)
+        assign_statement = result.body.statements[0]
+        self.assertEqual(assign_statement.left.index.itype, "int")
+        self.assertEqual(assign_statement.left.index.left.symbol.name, "i")
+        self.assertEqual(assign_statement.right.index.symbol.name, "i")
+
+    def test_semantic_undeclared_array_index(self):
+        with self.assertRaises(UndeclaredVariableError):
+            DLSemanticAnalyzer().analyze(self.build_ast("int h[4]; { print(h[j]) }"))
+
     def test_semantic_undeclared_variable_read(self):
         with self.assertRaises(UndeclaredVariableError):
             ast = self.build_ast("{ read(m) }")
@@ -483,6 +496,75 @@ class TestGenerator(unittest.TestCase):
         self.assertEqual(str(second.condition), "RelOp(LEOP, Variable(x), Integer(10))")
         self.assertEqual(str(second.body), "Block(Print(FunctionCall(factorial, Arguments(Variable(x)))), Assign(Variable(x), BinOp(PLUSOP, Variable(x), Integer(1))))")
 
+    def test_semantic_symbol_bindings(self):
+        source_string = """
+            int x, a[4];
+            f(x, y);
+            int z;
+            { z = x + y + a[1]; return z }
+            {
+                x = f(x, 2);
+                print(a[x])
+            }
+        """
+        ast = self.build_ast(source_string)
+        analyzer = DLSemanticAnalyzer()
+        result = analyzer.analyze(ast)
+
+        # Symbols are bound to (scope depth, slot) pairs in declaration order
+        function = result.declarations.declarations[1]
+        self.assertEqual([arg.symbol.binding for arg in function.args.arguments], [(1, 0), (1, 1)])
+        assign, ret = function.body.statements
+        z, x, y, a = assign.left, assign.right.left.left, assign.right.left.right, assign.right.right
+        self.assertEqual((z.symbol.name, z.symbol.binding), ('z', (1, 2)))
+        self.assertIs(x.symbol, function.args.arguments[0].symbol)
+        self.assertEqual(y.symbol.binding, (1, 1))
+        self.assertEqual((a.symbol.name, a.symbol.binding), ('a', (0, 1)))
+        self.assertIs(ret.result.symbol, z.symbol)
+
+        # Declarations are bound to the symbols they declare
+        x_decl, a_decl = result.declarations.declarations[0].variables
+        self.assertEqual((x_decl.symbol.name, x_decl.symbol.binding), ('x', (0, 0)))
+        self.assertIs(a_decl.symbol, a.symbol)
+        self.assertIs(function.vars.variables[0].symbol, z.symbol)
+
+        # The argument x shadows the global x only inside the function
+        assign, output = result.body.statements
+        self.assertEqual(assign.left.symbol.binding, (0, 0))
+        self.assertEqual(assign.right.symbol.binding, (0, 2))
+        self.assertEqual(assign.right.symbol.args, 2)
+        self.assertEqual(assign.right.args.arguments[0].symbol.binding, (0, 0))
+        self.assertIs(output.arg.symbol, a.symbol)
+        self.assertEqual(analyzer.st.visible, {})
+        self.assertEqual([symbol.name for symbol in analyzer.st.scopes.slots], ['x', 'a', 'f'])
+
+    def test_semantic_shared_name_table(self):
+        lexer = DLLexer()
+        ast = DLParser().parse(lexer.tokenize("int x, y; f(y); { return y } { x = f(x) }"))
+        analyzer = DLSemanticAnalyzer(lexer.names)
+        result = analyzer.analyze(ast)
+
+        # Symbols are indexed by the IDs the lexer gave their names
+        assign = result.body.statements[0]
+        self.assertIs(assign.left.name, lexer.names.intern('x'))
+        self.assertIs(assign.left.symbol, analyzer.st.scopes.symbols[assign.left.name.id])
+        self.assertIs(analyzer.st.names, lexer.names)
+        self.assertIs(next(iter(analyzer.st.scopes.shadowed))[0], assign.left.name)
+        self.assertEqual(len(lexer.names), 3)
+        self.assertEqual(analyzer.st.scopes.get_symbol('f').args, 1)
+        self.assertFalse(analyzer.st.scopes.get_symbol('y2'))
+
+    def test_semantic_function_scope_exit(self):
+        with self.assertRaises(UndeclaredVariableError):
+            source_string = """
+                f(n);
+                { return n }
+                { print(n) }
+            """
+            ast = self.build_ast(source_string)
+            analyzer = DLSemanticAnalyzer()
+            result = analyzer.analyze(ast)
+
     def build_ast(self, source):
         """A helper function to perform repeated test steps."""
         lexer = DLLexer()
@@ -492,6 +574,17 @@ class TestGenerator(unittest.TestCase):
         ast = parser.parse(tokens)
         return ast
 
+class TestSemanticArena(TestGenerator):
+    """Run the semantic analysis tests over an arena AST."""
+
+    def build_ast(self, source):
+        lexer = DLLexer()
+        parser = DLParser(nodes=ASTArena())
+
+        tokens = lexer.tokenize(source)
+        ast = parser.parse(tokens)
+        return ast
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+
+import sys
+sys.path.append('.')
+
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+from dl.mem2reg import Mem2Reg
+from dl.tailcalls import TailCallElimination
+from dl.ir import Alloca, Call, Phi
+
+class TestTailCallElimination(unittest.TestCase):
+
+    def test_tail_call(self):
+        source = "sum(n, acc); { if (n == 0) { return acc }; return sum(n - 1, acc + n) } { print(sum(10, 0)) }"
+        module, eliminator = self.eliminate(source)
+        f = module.get_function("sum")
+        self.assertEqual(self.calls(f), [])
+        self.assertEqual([block.name for block in f.blocks[:2]], ["entry", "tailrecurse"])
+        n, acc = f.blocks[1].instructions[:2]
+        self.assertEqual(n.format(), "%n.tr = phi i32 [ %n, %entry ], [ %tmp.3, %if.end.1 ]")
+        self.assertEqual(acc.format(), "%acc.tr = phi i32 [ %acc, %entry ], [ %tmp.4, %if.end.1 ]")
+        self.assertEqual((eliminator.tail_calls, eliminator.accumulator_calls), (1, 0))
+        self.assertEqual(eliminator.functions, ["sum"])
+
+    def test_accumulator(self):
+        source = "fact(n); { if (n < 2) { return 1 }; return n * fact(n - 1) } { print(fact(5)) }"
+        module, eliminator = self.eliminate(source)
+        f = module.get_function("fact")
+        self.assertEqual(self.calls(f), [])
+        accumulator = f.blocks[1].instructions[1]
+        self.assertEqual(accumulator.name, "accumulator.tr")
+        self.assertEqual(accumulator.operands[0].value, 1)
+        self.assertEqual(accumulator.operands[1].format(), "%tmp.2.tr = mul i32 %accumulator.tr, %n.tr")
+        # return 1 returns what was multiplied so far
+        self.assertIn("ret i32 %accumulator.tr", str(f))
+        self.assertEqual((eliminator.tail_calls, eliminator.accumulator_calls), (0, 1))
+
+    def test_other_returns_accumulated(self):
+        source = "f(n); { if (n < 1) { return 5 }; return f(n - 1) + n } { print(f(3)) }"
+        module, eliminator = self.eliminate(source)
+        f = str(module.get_function("f"))
+        self.assertIn("%accumulated.tr.0 = add i32 %accumulator.tr, 5", f)
+        self.assertIn("ret i32 %accumulated.tr.0", f)
+        self.assertIn("[ 0, %entry ]", f)
+
+    def test_variable_returned(self):
+        source = open("tests/simple2.dl").read()
+        module, eliminator = self.eliminate(source, True)
+        f = module.get_function("factorial")
+        # r = n * factorial(n - 1); return r returns a phi, and the return
+        # is copied into the block computing the product
+        self.assertEqual(self.calls(f), [])
+        self.assertEqual(eliminator.functions, ["factorial"])
+        self.assertEqual(eliminator.accumulator_calls, 1)
+
+    def test_allocas_moved(self):
+        source = "count(n); int t; { if (n == 0) { return t }; t = n; return count(n - 1) } { print(count(4)) }"
+        module, eliminator = self.eliminate(source)
+        f = module.get_function("count")
+        self.assertEqual([instruction.__class__ for instruction in f.entry.instructions[:-1]], [Alloca])
+        self.assertNotIn(Alloca, [instruction.__class__ for instruction in f.instructions()
+                                  if instruction.block is not f.entry])
+        # t is set to 0 again on every call, at the top of the loop
+        self.assertIn("store i32 0, i32* %t", str(f.blocks[1].instructions))
+
+    def test_one_of_two_calls(self):
+        source = "fib(n); { if (n < 2) { return n }; return fib(n - 1) + fib(n - 2) } { print(fib(10)) }"
+        module, eliminator = self.eliminate(source, True)
+        f = module.get_function("fib")
+        # fib(n - 2) is accumulated, and fib(n - 1) added to it
+        self.assertEqual(self.calls(f), ["fib"])
+        phis = [instruction.name for instruction in f.blocks[1].instructions if instruction.__class__ is Phi]
+        self.assertEqual(phis, ["n.tr", "accumulator.tr"])
+
+    def test_keep_calls(self):
+        source = """f(n); int t; { if (n == 0) { return 0 }; t = f(n - 1); print(t); return t }
+                    g(n); { if (n == 0) { return 1 }; return n - g(n - 1) }
+                    h(n); { if (n == 0) { return 0 }; return h(n - 1) * 2 + h(n - 1) }
+                    { print(f(3)); print(g(3)); print(h(3)) }"""
+        module, eliminator = self.eliminate(source, True)
+        # A call used before it is returned, subtracted from, and one
+        # multiplied before it is added
+        for name, calls in (("f", 1), ("g", 1), ("h", 1)):
+            self.assertEqual(len(self.calls(module.get_function(name))), calls)
+        self.assertEqual(eliminator.functions, ["h"])
+        self.assertEqual(eliminator.accumulator_calls, 1)
+
+    def checked(self, source):
+        return DLSemanticAnalyzer().analyze(DLParser().parse(DLLexer().tokenize(source)))
+
+    def eliminate(self, source, promote=False):
+        module = DLGenerator().build(self.checked(source))
+        if promote:
+            Mem2Reg().run(module)
+        eliminator = TailCallElimination()
+        return eliminator.run(module), eliminator
+
+    def calls(self, function):
+        return [instruction.operands[0].name for instruction in function.instructions()
+                if instruction.__class__ is Call and instruction.operands[0] is function]
+
+
+if __name__ == '__main__':
+    unittest.main()
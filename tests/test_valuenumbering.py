@@ -0,0 +1,101 @@
+import unittest
+
+import sys
+sys.path.append('.')
+
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer
+from dl.generator import DLGenerator
+from dl.mem2reg import Mem2Reg
+from dl.valuenumbering import LocalValueNumbering
+from dl.ir import Load, GetElementPtr, BinaryOperator, Call
+
+class TestValueNumbering(unittest.TestCase):
+
+    def test_reuse_loads(self):
+        module, numbering = self.number("int a, b; { read(b); a = b + b * b }")
+        main = module.get_function("main")
+        load, = self.instructions(main, Load)
+        self.assertEqual(load.operands[0].name, "b")
+        multiply = self.instructions(main, BinaryOperator)[0]
+        self.assertIs(multiply.operands[0], load)
+        self.assertIs(multiply.operands[1], load)
+        self.assertEqual(numbering.removed, {'load': 2})
+
+    def test_forward_stores(self):
+        module, numbering = self.number("int x; { x = 3; print(x + x) }")
+        main = module.get_function("main")
+        self.assertEqual(self.instructions(main, Load), [])
+        self.assertIn("add i32 3, 3", str(main))
+
+    def test_reuse_array_elements(self):
+        module, numbering = self.number("int h[4]; { print(h[1] * h[1] + h[2]) }")
+        main = module.get_function("main")
+        self.assertEqual(len(self.instructions(main, GetElementPtr)), 2)
+        self.assertEqual(len(self.instructions(main, Load)), 2)
+        self.assertEqual(numbering.removed, {'getelementptr': 1, 'load': 1})
+
+    def test_store_to_other_element(self):
+        source = "int h[4], x; { x = h[1] + h[1]; h[2] = 5; x = x + h[1]; h[1] = 6; x = x + h[1]; print(x) }"
+        module, numbering = self.number(source)
+        main = module.get_function("main")
+        # h[1] is loaded once, as h[2] is another element, and the value
+        # stored to it then forwarded, as are the values stored to x
+        load, = self.instructions(main, Load)
+        self.assertEqual(load.operands[0].operands[2].value, 1)
+        self.assertIn("add i32 %tmp.7, 6", str(main))
+
+    def test_calls_and_reads_invalidate(self):
+        module, numbering = self.number("int x; f(a); { return a } { read(x); print(x); read(x); print(x); print(f(1)); print(x) }")
+        loads = self.instructions(module.get_function("main"), Load)
+        self.assertEqual(len(loads), 3)
+        self.assertEqual(numbering.removed, {})
+
+    def test_reuse_arithmetic(self):
+        module, numbering = self.number("f(a, b); { print(a * b); print(b * a); print(a - b); print(b - a); return a * b } { print(f(1, 2)) }")
+        f = module.get_function("f")
+        self.assertEqual([instruction.opcode for instruction in self.instructions(f, BinaryOperator)],
+                         ["mul", "sub", "sub"])
+        self.assertEqual(numbering.removed, {'mul': 2})
+
+    def test_blocks_are_separate(self):
+        module, numbering = self.number("int x; { print(x); if (x < 1) { print(x) }; print(x) }")
+        self.assertEqual(len(self.instructions(module.get_function("main"), Load)), 3)
+
+    def test_counts(self):
+        source = "int a, b; f(x); { return x * x + x * x } { read(b); a = b + b; print(f(a + a)) }"
+        module, numbering = self.number(source)
+        expected = DLGenerator().build(self.checked(source))
+        for function in expected.functions:
+            if function.blocks:
+                before = len(list(function.instructions()))
+                after = len(list(module.get_function(function.name).instructions()))
+                self.assertEqual(numbering.counts[function.name], (before, after))
+        self.assertEqual(numbering.removed, {'load': 3, 'mul': 1})
+        self.assertEqual(numbering.removed_count(), 4)
+
+    def test_after_mem2reg(self):
+        source = "int a, b; { read(b); a = b * 2 + b * 2; print(a) }"
+        module = DLGenerator().build(self.checked(source))
+        Mem2Reg().run(module)
+        numbering = LocalValueNumbering()
+        numbering.run(module)
+        self.assertEqual(numbering.removed, {'load': 1, 'mul': 1})
+        self.assertEqual(len(self.instructions(module.get_function("main"), Call)), 2)
+
+    def checked(self, source):
+        return DLSemanticAnalyzer().analyze(DLParser().parse(DLLexer().tokenize(source)))
+
+    def number(self, source):
+        module = DLGenerator().build(self.checked(source))
+        numbering = LocalValueNumbering()
+        return numbering.run(module), numbering
+
+    def instructions(self, function, instruction_class):
+        return [instruction for instruction in function.instructions() if instruction.__class__ is instruction_class]
+
+
+if __name__ == '__main__':
+    unittest.main()
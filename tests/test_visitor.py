@@ -0,0 +1,156 @@
+import unittest
+
+import sys
+sys.path.append('.')
+
+
+from dl.lexer import DLLexer
+from dl.parser import DLParser
+from dl.semantic import DLSemanticAnalyzer, UndeclaredVariableError
+from dl.generator import DLGenerator
+from dl.visitor import ASTVisitor, VisitorDefinitionError
+from dl.ast import BinOp, RelOp, Integer, Variable
+from dl.arena import ASTArena
+
+# Nesting depth of the deep programs, well past the recursion limit
+DEPTH = 100000
+
+class OrderVisitor(ASTVisitor):
+    """Record the order in which the handlers run."""
+    def __init__(self):
+        self.events = []
+
+    def visit_Integer(self, node):
+        self.events.append(node.value)
+        return node.value
+
+    def visit_BinOp(self, node):
+        self.events.append('pre ' + node.op)
+        left = yield node.left
+        self.events.append('in ' + node.op)
+        right = yield node.right
+        self.events.append('post ' + node.op)
+        return left + right
+
+class CatchingVisitor(OrderVisitor):
+    """Recover from errors in the children of RelOp nodes."""
+    def visit_RelOp(self, node):
+        try:
+            yield node.left
+        except VisitorDefinitionError:
+            return 10
+
+class TestVisitor(unittest.TestCase):
+
+    def test_visit_order_and_results(self):
+        tree = BinOp('PLUSOP', BinOp('MINUSOP', Integer(1), Integer(2)), Integer(3))
+        for visit in (ASTVisitor.visit, ASTVisitor.visit_recursive):
+            visitor = OrderVisitor()
+            self.assertEqual(visit(visitor, tree), 6)
+            self.assertEqual(visitor.events, ['pre PLUSOP', 'pre MINUSOP', 1, 'in MINUSOP', 2,
+                                              'post MINUSOP', 'in PLUSOP', 3, 'post PLUSOP'])
+
+    def test_visit_recursive_handler_without_children(self):
+        # Handlers that are generators but yield nothing for these nodes
+        declarations = self.build_ast("int a, b[3]; { print(a) }").declarations
+        self.assertEqual(DLGenerator().visit_recursive(declarations),
+                         DLGenerator().visit(declarations))
+        self.assertEqual(len(DLGenerator().visit_recursive(declarations)), 1)
+
+        source = "f(); { return 1 } { print(f()) }"
+        recursive = self.build_ast(source)
+        explicit = self.build_ast(source)
+        self.assertEqual(DLSemanticAnalyzer().visit_recursive(recursive),
+                         DLSemanticAnalyzer().visit(explicit))
+        self.assertEqual(recursive.body.statements[0].arg.itype, 'int')
+        self.assertEqual(DLGenerator().generate(recursive), DLGenerator().generate(explicit))
+
+    def test_visit_plain_handler(self):
+        self.assertEqual(OrderVisitor().visit(Integer(4)), 4)
+
+    def test_visit_errors(self):
+        tree = BinOp('PLUSOP', Integer(1), BinOp('PLUSOP', Variable('x'), Integer(2)))
+        with self.assertRaises(VisitorDefinitionError):
+            OrderVisitor().visit(tree)
+
+        # Errors in children are thrown into the handler that yielded them
+        visitor = CatchingVisitor()
+        tree = BinOp('PLUSOP', Integer(1), RelOp('LTOP', Variable('x'), Integer(2)))
+        self.assertEqual(visitor.visit(tree), 11)
+        tree = RelOp('LTOP', BinOp('PLUSOP', Integer(1), Variable('x')), Integer(2))
+        self.assertEqual(visitor.visit(tree), 10)
+        self.assertEqual(visitor.events, [
+            'pre PLUSOP', 1, 'in PLUSOP', 'post PLUSOP', 'pre PLUSOP', 1, 'in PLUSOP'])
+
+    def test_dispatch_table(self):
+        handlers = OrderVisitor.handlers
+        self.assertIs(handlers[BinOp], OrderVisitor.visit_BinOp)
+        self.assertIs(handlers[Integer], OrderVisitor.visit_Integer)
+        # Subclasses dispatch on their own name, not their base class
+        self.assertIs(handlers[RelOp], ASTVisitor.missing)
+        self.assertIs(CatchingVisitor.handlers[RelOp], CatchingVisitor.visit_RelOp)
+        self.assertIs(CatchingVisitor.handlers[BinOp], OrderVisitor.visit_BinOp)
+        self.assertIs(DLSemanticAnalyzer.handlers[RelOp], DLSemanticAnalyzer.visit_RelOp)
+        with self.assertRaises(VisitorDefinitionError):
+            OrderVisitor().visit(RelOp('LTOP', Integer(1), Integer(2)))
+
+    def test_dispatch_new_node_class(self):
+        class Negate(BinOp):
+            __slots__ = ()
+
+        class NegateVisitor(OrderVisitor):
+            def visit_Negate(self, node):
+                value = yield node.left
+                return -value
+
+        visitor = NegateVisitor()
+        tree = BinOp('PLUSOP', Integer(5), Negate('NEG', Integer(2), None))
+        self.assertNotIn(Negate, OrderVisitor.handlers)
+        self.assertEqual(visitor.visit(tree), 3)
+        self.assertIs(NegateVisitor.handlers[Negate], NegateVisitor.visit_Negate)
+
+        # Node classes created after the visitor are added on first visit
+        with self.assertRaises(VisitorDefinitionError):
+            OrderVisitor().dispatch(Negate('NEG', Integer(2), None))
+        self.assertIs(OrderVisitor.handlers[Negate], ASTVisitor.missing)
+
+        # Arena views dispatch like the node classes they stand for
+        arena = ASTArena()
+        tree = arena.BinOp('PLUSOP', arena.Integer(1), arena.Integer(2))
+        self.assertEqual(OrderVisitor().visit(tree), 3)
+
+    def test_deep_expression(self):
+        ast = self.build_ast("{ print(" + " + ".join(["1"] * DEPTH) + ") }")
+        DLSemanticAnalyzer().analyze(ast)
+        self.assertEqual(ast.body.statements[0].arg.itype, 'int')
+        ir = DLGenerator().generate(ast)
+        self.assertEqual(ir.count(" = add i32 "), DEPTH - 1)
+        self.assertIn("i32 %tmp.1)", ir)
+
+        with self.assertRaises(RecursionError):
+            DLSemanticAnalyzer().visit_recursive(ast)
+
+    def test_deep_statements(self):
+        levels = DEPTH // 2
+        source = ("{ " + "if (1 < 2) { while (2 < 1) { " * levels + "print(1)" +
+                  " } }" * levels + " }")
+        ast = self.build_ast(source)
+        DLSemanticAnalyzer().analyze(ast)
+        ir = DLGenerator().generate(ast)
+        self.assertEqual(ir.count("br i1 "), DEPTH)
+        self.assertEqual(ir.count("@printf(i8* getelementptr"), 1)
+
+    def test_deep_undeclared_variable(self):
+        ast = self.build_ast("{ print(x + " + " + ".join(["1"] * DEPTH) + ") }")
+        with self.assertRaises(UndeclaredVariableError):
+            DLSemanticAnalyzer().analyze(ast)
+
+    def build_ast(self, source):
+        """Parse source into an AST."""
+        lexer = DLLexer()
+        parser = DLParser()
+        return parser.parse_direct(lexer.tokenize(source))
+
+
+if __name__ == '__main__':
+    unittest.main()